@@ -1,17 +1,44 @@
-from highrise import BaseBot, User, Position, AnchorPosition
-from highrise.models import SessionMetadata, Item
+from highrise import BaseBot, User, Position, AnchorPosition, ResponseError
+from highrise.models import SessionMetadata, Item, Error
 from highrise.webapi import WebAPI
 from highrise.__main__ import main, arun, BotDefinition
-from flask import Flask
-from threading import Thread
+from threading import Thread, Lock, get_ident
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque, OrderedDict
+from functools import partial, wraps
+from itertools import islice
+from bisect import bisect_left
 import time
 import random
 from importlib import import_module
 import json
+import copy
+import hashlib
+import sqlite3
 import asyncio
 import os
-import requests
+import sys
+import traceback
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import aiohttp
+import attrs
+from aiohttp import web
 from datetime import datetime
+try:
+    import fcntl
+except ImportError:  # Windows - no advisory file locks
+    fcntl = None
+
+# One logger per subsystem, all under "bot" so setup_logging() routes them together
+runtime_log = logging.getLogger("bot.runtime")
+persist_log = logging.getLogger("bot.persistence")
+api_log = logging.getLogger("bot.api")
+room_log = logging.getLogger("bot.room")
+game_log = logging.getLogger("bot.game")
+invite_log = logging.getLogger("bot.invites")
 
 def split_message(text, max_length=200):
     """Split long messages into smaller chunks"""
@@ -31,52 +58,2312 @@ def split_message(text, max_length=200):
 
     return chunks
 
+SNAPSHOT_DIR = "snapshots"
+SNAPSHOT_GENERATIONS = 3
+OUTBOUND_LANES = ("game", "chat", "bulk")  # highest priority first
+OUTBOUND_RATE = 10.0  # requests per second across all lanes
+OUTBOUND_BURST = 10
+OUTBOUND_RETRIES = 3
+CREATE_API_URL = os.getenv("HIGHRISE_CREATE_API", "https://create.highrise.game/api")
+WEB_API_URL = os.getenv("HIGHRISE_WEB_API", "https://webapi.highrise.game")
+USER_CACHE_SIZE = 5000
+USER_CACHE_TTL = 7 * 24 * 3600  # usernames can be changed, so re-check ids after a week
+USER_CACHE_MISS_TTL = 600  # remember "not found" for 10 minutes
+OUTFIT_CACHE_SIZE = 200
+OUTFIT_FRESH_SECONDS = 300  # use a cached outfit as is for 5 minutes, then revalidate
+OUTFIT_PREFETCH_CONCURRENCY = 2
+HTTP_TIMEOUT = 10  # seconds per Web API request, connect included
+STATUS_PORT = int(os.getenv("STATUS_PORT", "3000"))  # health/metrics/admin views
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_PER_HOST = 4
+INVITE_CONCURRENCY = 5  # invites in flight at once; the outbound scheduler still caps the rate
+BULK_TELEPORT_CONCURRENCY = 8  # teleports in flight at once; the outbound scheduler caps the rate
+LEDGER_BUSY_TIMEOUT = 10  # seconds a ledger write waits for another process's transaction
+LEDGER_WRITE_RETRIES = 5
+ROOMS_CONFIG = os.getenv("ROOMS_CONFIG", "rooms.json")  # multi-room runner; absent = one room from the env
+CHOOSER_TIMEOUT = 60  # seconds the chooser has to whisper a word
+STARTUP_BUDGET = 10  # seconds from building the bot to it answering in the room
+LEADERBOARD_WINDOWS = {"daily": "%Y-%m-%d", "weekly": "%G-W%V"}  # window -> strftime of its current period
+BLOCK_LOCK_TOLERANCE = 0.5  # meters a waiting player may drift off their block
+BLOCK_LOCK_SWEEP_SECONDS = 15  # reconciliation sweep in case a move event was missed
+METRIC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # latency histogram bounds, seconds
+LOOP_LAG_INTERVAL = 0.5  # seconds between event-loop lag probes
+LOOP_STALL_THRESHOLD = 0.25  # seconds a step may hold the loop before its stack is logged
+LOOP_LAG_WINDOW = 600  # recent lag samples kept for the percentiles (~5 minutes)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("LOG_FILE", "bot.log")  # JSON lines, rotated
+LOG_FILE_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+LOG_QUEUE_SIZE = 10000  # records waiting for the log thread; past this they are dropped, never waited on
+LOG_SAMPLE_RATES = {"join": 10, "whisper": 5, "dm": 5}  # event -> keep 1 in N info/debug records
+
+def _atomic_write(path, text):
+    """Write to a temp file, fsync it and rename it over the target"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    # Make the rename itself durable
+    try:
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
+
+def _generation_path(path, generation):
+    # Next to the file, so two rooms' vips.json keep separate histories
+    return os.path.join(os.path.dirname(path), SNAPSHOT_DIR, f"{os.path.basename(path)}.{generation}")
+
+def write_json_file(path, data, generations=SNAPSHOT_GENERATIONS):
+    """Crash-safe JSON save.
+
+    The file is replaced atomically, so it is always either the old or the new
+    version. The last few versions are also kept in <dir>/snapshots/<name>.<n>
+    (1 = newest), each with a header line carrying a SHA-256 of the payload.
+    """
+    write_json_text(path, json.dumps(data), generations)
+
+def write_json_text(path, payload, generations=SNAPSHOT_GENERATIONS):
+    """write_json_file for a payload already serialized - by the event loop, which owns the data"""
+    if generations > 0:
+        os.makedirs(os.path.dirname(_generation_path(path, 1)), exist_ok=True)
+        for generation in range(generations, 1, -1):
+            older = _generation_path(path, generation - 1)
+            if os.path.exists(older):
+                os.replace(older, _generation_path(path, generation))
+        header = {
+            "sha256": hashlib.sha256(payload.encode("utf-8")).hexdigest(),
+            "size": len(payload),
+            "saved_at": datetime.now().isoformat()
+        }
+        _atomic_write(_generation_path(path, 1), json.dumps(header) + "\n" + payload)
+    _atomic_write(path, payload)
+
+def _read_generation(path):
+    with open(path, "r", encoding="utf-8") as f:
+        header_line, _, payload = f.read().partition("\n")
+    header = json.loads(header_line)
+    if hashlib.sha256(payload.encode("utf-8")).hexdigest() != header.get("sha256"):
+        raise ValueError("checksum mismatch")
+    return json.loads(payload)
+
+def read_json_file(path, default=None, generations=SNAPSHOT_GENERATIONS):
+    """Load a JSON file, falling back to the newest valid snapshot generation.
+
+    An empty or unparsable file is treated as damaged rather than as empty data,
+    so a torn write can no longer silently reset everything to {}.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        if text.strip():
+            return json.loads(text)
+        persist_log.warning("⚠️ %s is empty, looking for a snapshot", path)
+    except FileNotFoundError:
+        pass
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        persist_log.warning("⚠️ %s is corrupt (%s), looking for a snapshot", path, e)
+
+    for generation in range(1, generations + 1):
+        snapshot = _generation_path(path, generation)
+        if not os.path.exists(snapshot):
+            continue
+        try:
+            data = _read_generation(snapshot)
+            persist_log.warning("♻️ Restored %s from %s", path, snapshot)
+            return data
+        except (ValueError, OSError) as e:
+            persist_log.warning("⚠️ Skipping invalid snapshot %s: %s", snapshot, e)
+    return default
+
+METRIC_HELP = {
+    "bot_handler_seconds": ("histogram", "Time spent in each SDK event handler"),
+    "bot_command_seconds": ("histogram", "Time spent running each command"),
+    "bot_sdk_call_seconds": ("histogram", "Outbound SDK calls, including time queued in the outbound scheduler"),
+    "bot_game_step_seconds": ("histogram", "Duration of the long game flow steps"),
+    "bot_save_seconds": ("histogram", "Background file and ledger writes"),
+    "bot_teleports_total": ("counter", "Teleports sent"),
+    "bot_whispers_total": ("counter", "Whispers sent"),
+    "bot_errors_total": ("counter", "Exceptions raised by handlers, commands, SDK calls and saves"),
+    "bot_outbound_queue_depth": ("gauge", "Requests waiting in each outbound scheduler lane"),
+    "bot_outbound_requests_total": ("counter", "Outbound scheduler requests by lane and outcome"),
+    "bot_loop_lag_seconds": ("histogram", "How late the event loop woke the lag probe"),
+    "bot_loop_lag_recent_seconds": ("gauge", "Event-loop lag percentiles over the recent window"),
+    "bot_loop_stalls_total": ("counter", "Times a step blocked the event loop past the stall threshold"),
+    "bot_log_dropped_total": ("counter", "Log records dropped because the log queue was full"),
+}
+
+class Metrics:
+    """Counters and latency histograms, rendered in the Prometheus text format.
+
+    A series is a metric name plus label values and is created on first use.
+    StatusServer renders on the event loop, but updates also come from the file
+    writer and loop watchdog threads and from logging on any thread, so every
+    access to the series takes the one lock.
+    Collectors add values that are only worth reading at scrape time; they are
+    keyed, so a room that registers again replaces its old collector.
+    """
+
+    def __init__(self, buckets=METRIC_BUCKETS):
+        self.buckets = buckets
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [count per bucket..., +Inf count, sum]
+        self.collectors = {}  # key -> callable returning [(name, labels dict, value)]
+        self._lock = Lock()
+
+    def register(self, key, collect):
+        self.collectors[key] = collect
+
+    def unregister(self, key):
+        self.collectors.pop(key, None)
+
+    def inc(self, metric, amount=1, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, metric, seconds, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self.histograms.get(key)
+            if series is None:
+                series = self.histograms[key] = [0] * (len(self.buckets) + 2)
+            series[bisect_left(self.buckets, seconds)] += 1
+            series[-1] += seconds
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ""
+        pairs = []
+        for name, value in labels:
+            value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            pairs.append(f'{name}="{value}"')
+        return "{" + ",".join(pairs) + "}"
+
+    def render(self) -> str:
+        samples = {}  # name -> lines
+        with self._lock:
+            counters = list(self.counters.items())
+            histograms = [(key, series[:]) for key, series in self.histograms.items()]
+        for collect in list(self.collectors.values()):
+            try:
+                for name, labels, value in collect():
+                    counters.append(((name, tuple(sorted(labels.items()))), value))
+            except Exception as e:
+                runtime_log.exception("Metrics collector failed: %s", e)
+
+        for (name, labels), value in counters:
+            samples.setdefault(name, []).append(f"{name}{self._labels(labels)} {value}")
+        for (name, labels), series in histograms:
+            lines = samples.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                lines.append(f"{name}_bucket{self._labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{self._labels(labels)} {series[-1]}")
+            lines.append(f"{name}_count{self._labels(labels)} {cumulative}")
+
+        out = []
+        for name in sorted(samples):
+            kind, text = METRIC_HELP.get(name, ("untyped", name))
+            out.append(f"# HELP {name} {text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(samples[name])
+        return "\n".join(out) + "\n"
+
+METRICS = Metrics()  # One registry per process, shared by every room and served by StatusServer
+
+class LoopWatchdog:
+    """Measures event-loop lag and catches the code that blocks the loop.
+
+    A probe task on the loop sleeps `interval` seconds at a time and records how
+    late it woke. A thread watches the probe's heartbeat; when the loop hasn't
+    come back for `threshold` seconds it logs the stack the loop thread is
+    stuck in, i.e. the handler step doing blocking work, once per stall.
+    """
+
+    def __init__(self, interval=LOOP_LAG_INTERVAL, threshold=LOOP_STALL_THRESHOLD, window=LOOP_LAG_WINDOW):
+        self.interval = interval
+        self.threshold = threshold
+        self.lags = deque(maxlen=window)
+        self.heartbeat = None  # monotonic time of the probe's last wake-up; None while no loop runs
+        self._loop_thread = None
+        self._task = None
+        self._thread = None
+        self._lock = Lock()
+
+    def start(self):
+        """Probe the running loop (once per loop) and start the watcher thread (once per process)"""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._loop_thread = get_ident()
+        self.heartbeat = time.monotonic()
+        self._task = loop.create_task(self._probe())
+        if self._thread is None:
+            self._thread = Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._thread.start()
+
+    async def _probe(self):
+        try:
+            while True:
+                expected = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                lag = max(0.0, now - expected)
+                self.heartbeat = now
+                with self._lock:
+                    self.lags.append(lag)
+                METRICS.observe("bot_loop_lag_seconds", lag)
+                if lag >= self.threshold:
+                    runtime_log.warning("🐢 Event loop lagged %.2fs", lag, extra={"lag": lag})
+        finally:
+            self.heartbeat = None  # Loop shutting down - not a stall
+
+    def _watch(self):
+        reported = None
+        while True:
+            time.sleep(self.threshold / 2)
+            heartbeat = self.heartbeat
+            if heartbeat is None:
+                continue
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled < self.threshold or reported == heartbeat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            reported = heartbeat
+            METRICS.inc("bot_loop_stalls_total")
+            stack = "".join(traceback.format_stack(frame))
+            runtime_log.warning("🐢 Event loop blocked for over %.2fs in:\n%s", stalled, stack, extra={"stalled": stalled})
+
+    def summary(self):
+        """{quantile: seconds} for p50/p90/p99/max of the recent lag samples, empty before the first one"""
+        with self._lock:
+            lags = sorted(self.lags)
+        if not lags:
+            return {}
+        summary = {quantile: lags[min(len(lags) - 1, int(quantile * len(lags)))] for quantile in (0.5, 0.9, 0.99)}
+        summary[1] = lags[-1]
+        return summary
+
+    def percentiles(self):
+        """Metrics collector for summary()"""
+        for quantile, lag in self.summary().items():
+            yield "bot_loop_lag_recent_seconds", {"quantile": quantile}, lag
+
+WATCHDOG = LoopWatchdog()  # One per process, like METRICS
+METRICS.register("loop_lag", WATCHDOG.percentiles)
+
+def timed(metric, label="handler"):
+    """Decorator recording how long an async method takes under `metric`, labelled with its name"""
+    def decorate(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                METRICS.inc("bot_errors_total", where=label, name=fn.__name__)
+                raise
+            finally:
+                METRICS.observe(metric, time.perf_counter() - started, **{label: fn.__name__})
+        return wrapper
+    return decorate
+
+class LogQueueHandler(QueueHandler):
+    """Hands records to the log thread as they are: formatting and I/O happen there.
+
+    A full queue drops the record (and counts it) instead of blocking the caller.
+    """
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            METRICS.inc("bot_log_dropped_total")
+
+class SampleFilter(logging.Filter):
+    """Keeps 1 in N info/debug records of the high-volume events tagged with extra={"event": ...}"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self.seen = {}
+
+    def filter(self, record):
+        event = getattr(record, "event", None)
+        every = self.rates.get(event)
+        if not every or record.levelno >= logging.WARNING:
+            return True
+        count = self.seen.get(event, 0)
+        self.seen[event] = count + 1
+        if count % every:
+            return False
+        record.sampled = every  # so counts read from the file can be scaled back up
+        return True
+
+_LOG_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+class JsonLineFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and any extra= fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _LOG_RECORD_FIELDS)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def setup_logging(path=LOG_FILE, level=LOG_LEVEL):
+    """Send every bot logger through one queue to a thread writing the console and a rotating JSON-lines file"""
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    handler = LogQueueHandler(log_queue)
+    handler.addFilter(SampleFilter(LOG_SAMPLE_RATES))
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s", "%H:%M:%S"))
+    log_file = RotatingFileHandler(path, maxBytes=LOG_FILE_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8")
+    log_file.setFormatter(JsonLineFormatter())
+
+    root = logging.getLogger("bot")
+    root.setLevel(level)
+    root.addHandler(handler)
+    root.propagate = False
+    listener = QueueListener(log_queue, console, log_file)
+    listener.start()
+    atexit.register(listener.stop)  # Flush what is still queued on exit
+
+def event_handler(fn):
+    """@timed for SDK event handlers that also stamps the bot's last_event_at for /health"""
+    timed_fn = timed("bot_handler_seconds")(fn)
+
+    @wraps(fn)
+    async def wrapper(self, *args, **kwargs):
+        self.last_event_at = time.time()
+        return await timed_fn(self, *args, **kwargs)
+    return wrapper
+
+class FileWriter:
+    """Background writer that keeps file I/O off the event loop.
+
+    Jobs run one at a time, in submission order, on a single worker thread. Saving
+    a key that is still waiting in the queue replaces the queued job instead of
+    adding a second write, so the queue holds at most one job per file. Outside a
+    running event loop (startup, shutdown) jobs run inline.
+    """
+
+    def __init__(self, max_jobs=64):
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-writer")
+        self._jobs = {}  # key -> (fn, args) waiting to run
+        self._order = deque()
+        self._loop = None
+        self._task = None
+        self._wakeup = None
+        self._idle = None
+        self._warned = False
+        self._closed = False
+
+    def submit(self, key, fn, *args):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop - nothing to block, just drain and write now. The last loop
+            # may have left a job running on the worker thread; let it land first.
+            self._settle()
+            self._drain()
+            self._timed(key, fn, *args)
+            return
+
+        if key in self._jobs:
+            self._jobs[key] = (fn, args)
+            return
+
+        self._jobs[key] = (fn, args)
+        self._order.append(key)
+        if len(self._order) > self.max_jobs and not self._warned:
+            self._warned = True
+            persist_log.warning("⚠️ File writer backlog: %d jobs queued", len(self._order))
+
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._start(loop)
+        self._idle.clear()  # type: ignore
+        self._wakeup.set()  # type: ignore
+
+    def _start(self, loop):
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._order:
+                self._warned = False
+                self._idle.set()  # type: ignore
+                self._wakeup.clear()  # type: ignore
+                await self._wakeup.wait()  # type: ignore
+                continue
+            key = self._order.popleft()
+            fn, args = self._jobs.pop(key)
+            try:
+                await loop.run_in_executor(self._executor, self._timed, key, fn, *args)
+            except Exception as e:
+                persist_log.error("❌ Background write failed for %s: %s", key, e)
+
+    async def flush(self):
+        """Wait until every queued write has hit the disk"""
+        if self._task is not None and not self._task.done() and self._loop is asyncio.get_running_loop():
+            await self._idle.wait()  # type: ignore
+        else:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._drain)
+
+    def _settle(self):
+        """Wait out the job in flight on the worker thread, so inline writes never race it"""
+        if not self._closed:
+            self._executor.submit(lambda: None).result()
+
+    def _drain(self):
+        while self._order:
+            key = self._order.popleft()
+            fn, args = self._jobs.pop(key)
+            try:
+                self._timed(key, fn, *args)
+            except Exception as e:
+                persist_log.error("❌ Write failed for %s: %s", key, e)
+
+    @staticmethod
+    def _timed(key, fn, *args):
+        # Keys are file paths or ("journal" | "checkpoint" | "players", n)
+        kind = key[0] if isinstance(key, tuple) else "file"
+        started = time.perf_counter()
+        try:
+            fn(*args)
+        except Exception:
+            METRICS.inc("bot_errors_total", where="save", name=kind)
+            raise
+        finally:
+            METRICS.observe("bot_save_seconds", time.perf_counter() - started, kind=kind)
+
+    def close(self):
+        """Finish the running write and every queued one - call once the event loop is gone"""
+        self._executor.shutdown(wait=True)
+        self._closed = True
+        self._drain()
+
+class DataJournal:
+    """Append-only change log for the JSON data files.
+
+    Every change is one small JSON line appended to the journal, so a write costs
+    the size of the change instead of the size of the file. The full JSON files are
+    only rewritten on checkpoint, once enough records, bytes or time have piled up.
+    On startup the journal is replayed on top of the JSON files; a torn last line
+    from a crash mid-append is ignored.
+
+    All file access goes through the FileWriter. Records are buffered per journal
+    segment; a checkpoint closes the segment, so records made after the snapshot
+    was taken land in the fresh journal and are never truncated away.
+    """
+
+    def __init__(self, writer, path="data_journal.jsonl", max_records=500, max_bytes=256 * 1024, max_age=300):
+        self.writer = writer
+        self.path = path
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.stores = {}  # filename -> callable returning the live dict/set
+        self.forwards = {}  # filename -> store that now keeps that file's data elsewhere
+        self.dirty = set()
+        self.records = 0
+        self.size = 0
+        self.last_checkpoint = time.monotonic()
+        self.segment = 0
+        self._buffer = []
+        self._lock = Lock()
+        self._file = None  # only touched from the writer thread
+
+    def register(self, filename, getter):
+        self.stores[filename] = getter
+
+    def forward(self, filename, store):
+        """Replay filename's records into store.replay_record(); store.commit() runs before the journal is dropped"""
+        self.forwards[filename] = store
+
+    def set(self, filename, key, value):
+        self._append({"f": filename, "op": "set", "k": key, "v": value})
+
+    def delete(self, filename, key):
+        self._append({"f": filename, "op": "del", "k": key})
+
+    def add(self, filename, value):
+        self._append({"f": filename, "op": "add", "v": value})
+
+    def discard(self, filename, value):
+        self._append({"f": filename, "op": "discard", "v": value})
+
+    def _append(self, record):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._buffer.append(line)
+            buffer = self._buffer
+        self.writer.submit(("journal", self.segment), self._write_buffer, buffer)
+        self.dirty.add(record["f"])
+        self.records += 1
+        self.size += len(line)
+
+    def _write_buffer(self, buffer):
+        with self._lock:
+            lines = buffer[:]
+            buffer.clear()
+        if lines:
+            self._write_lines(lines)
+
+    def _write_lines(self, lines):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write("".join(lines))
+        self._file.flush()
+        # Durable once written; the writer batches records, so this is one fsync per batch
+        os.fsync(self._file.fileno())
+
+    def _apply(self, record):
+        store = self.forwards.get(record.get("f"))
+        if store is not None:
+            store.replay_record(record)
+            return
+        getter = self.stores.get(record.get("f"))
+        if getter is None:
+            return
+        data = getter()
+        op = record.get("op")
+        if op == "set":
+            data[record["k"]] = record["v"]
+        elif op == "del":
+            data.pop(record["k"], None)
+        elif op == "add":
+            data.add(record["v"])
+        elif op == "discard":
+            data.discard(record["v"])
+
+    def replay(self):
+        """Apply journal records left over from the last run, then fold them into the files"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return 0
+
+        applied = 0
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn write from a crash - everything before it is still valid
+                persist_log.warning("⚠️ Skipping corrupt journal record: %r", line[:80])
+                continue
+            self._apply(record)
+            self.dirty.add(record.get("f"))
+            applied += 1
+
+        if applied:
+            persist_log.info("📒 Replayed %d journal records", applied)
+            for store in set(self.forwards.values()):
+                store.commit()
+            self.checkpoint()
+        return applied
+
+    def should_checkpoint(self):
+        if not self.dirty:
+            return False
+        return (self.records >= self.max_records
+                or self.size >= self.max_bytes
+                or time.monotonic() - self.last_checkpoint >= self.max_age)
+
+    def checkpoint(self):
+        """Snapshot every dirty store now and queue the rewrite + journal truncation"""
+        snapshots = {}
+        for filename in self.dirty:
+            getter = self.stores.get(filename)
+            if getter is None:
+                continue
+            data = getter()
+            # Serialized here, not on the writer thread: the loop keeps changing the nested per-user dicts
+            snapshots[filename] = json.dumps(list(data) if isinstance(data, set) else data)
+
+        # Close the current segment: whatever it still buffers belongs to this checkpoint
+        with self._lock:
+            tail = self._buffer[:]
+            self._buffer.clear()
+            self._buffer = []
+        self.segment += 1
+        self.writer.submit(("checkpoint", self.segment), self._write_checkpoint, tail, snapshots)
+
+        self.dirty.clear()
+        self.records = 0
+        self.size = 0
+        self.last_checkpoint = time.monotonic()
+
+    def _write_checkpoint(self, tail, snapshots):
+        if tail:
+            self._write_lines(tail)
+        for filename, payload in snapshots.items():
+            write_json_text(filename, payload)
+        # Only drop the journal once every file it covers is safely on disk
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.path, "w", encoding="utf-8")
+
+def _rate_limited(error):
+    text = str(getattr(error, "message", error)).lower()
+    return "rate limit" in text or "ratelimit" in text or "too many" in text
+
+class OutboundScheduler:
+    """Paces outgoing chat/whisper/message/teleport/tip requests through one token bucket.
+
+    Requests wait in per-lane queues and the dispatcher always serves the
+    highest-priority lane first, so game teleports overtake help text. A request
+    the server turns away for rate limiting is re-queued at the front of its lane
+    and the whole bucket backs off exponentially before trying again.
+    """
+
+    def __init__(self, rate=OUTBOUND_RATE, burst=OUTBOUND_BURST, retries=OUTBOUND_RETRIES):
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lanes = {lane: deque() for lane in OUTBOUND_LANES}
+        self.stats = {lane: {"depth": 0, "max_depth": 0, "sent": 0, "retried": 0, "failed": 0} for lane in OUTBOUND_LANES}
+        self._loop = None
+        self._task = None
+        self._wakeup = None
+        self._sending = set()  # in-flight _send tasks, held so they aren't garbage collected
+
+    async def submit(self, lane, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) on a lane and wait for its result"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._start(loop)
+        future = loop.create_future()
+        self._push(lane, (future, fn, args, kwargs, 0))
+        return await future
+
+    def _start(self, loop):
+        # A fresh event loop (RunBot restarts) can't serve futures from the old one
+        for lane_queue in self.lanes.values():
+            lane_queue.clear()
+        self._sending.clear()
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    def _push(self, lane, job, front=False):
+        lane_queue = self.lanes[lane]
+        if front:
+            lane_queue.appendleft(job)
+        else:
+            lane_queue.append(job)
+        stats = self.stats[lane]
+        stats["depth"] = len(lane_queue)
+        stats["max_depth"] = max(stats["max_depth"], len(lane_queue))
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            if not any(self.lanes.values()):
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            await self._take_token()
+            # Pick the lane after the wait, so anything urgent queued meanwhile goes first
+            lane = next(lane for lane in OUTBOUND_LANES if self.lanes[lane])
+            job = self.lanes[lane].popleft()
+            self.stats[lane]["depth"] = len(self.lanes[lane])
+            if not job[0].done():
+                task = asyncio.create_task(self._send(lane, *job))
+                self._sending.add(task)
+                task.add_done_callback(self._sending.discard)
+
+    async def _take_token(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    async def _send(self, lane, future, fn, args, kwargs, attempt):
+        try:
+            result = await fn(*args, **kwargs)
+            if isinstance(result, Error) and _rate_limited(result):
+                raise ResponseError(result.message)
+        except Exception as e:
+            if attempt < self.retries and _rate_limited(e):
+                delay = 0.5 * 2 ** attempt
+                api_log.warning("⏳ Rate limited on %s lane, retrying in %.1fs", lane, delay)
+                self.stats[lane]["retried"] += 1
+                self.tokens = min(self.tokens, 0) - delay * self.rate  # hold every lane back
+                self._push(lane, (future, fn, args, kwargs, attempt + 1), front=True)
+                return
+            self.stats[lane]["failed"] += 1
+            if not future.done():
+                future.set_exception(e)
+            return
+        self.stats[lane]["sent"] += 1
+        if not future.done():
+            future.set_result(result)
+
+class ScheduledHighrise:
+    """Stands in for the SDK's Highrise client, sending chat/whisper/message/teleport/tip through a scheduler.
+
+    Everything else passes straight through. Callers can pick a lane with lane=.
+    """
+
+    LANES = {"teleport": "game", "tip_user": "game", "chat": "chat", "send_whisper": "chat", "send_message": "bulk"}
+    COUNTERS = {"teleport": "bot_teleports_total", "send_whisper": "bot_whispers_total"}
+
+    def __init__(self, highrise, scheduler):
+        self._highrise = highrise
+        self._scheduler = scheduler
+
+    def __getattr__(self, name):
+        attr = getattr(self._highrise, name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+        default_lane = self.LANES.get(name)
+
+        async def call(*args, lane=default_lane, **kwargs):
+            # Every SDK round trip is timed, scheduled or not
+            started = time.perf_counter()
+            try:
+                if lane is None:
+                    result = await attr(*args, **kwargs)
+                else:
+                    result = await self._scheduler.submit(lane, attr, *args, **kwargs)
+            except Exception:
+                METRICS.inc("bot_errors_total", where="sdk", name=name)
+                raise
+            finally:
+                METRICS.observe("bot_sdk_call_seconds", time.perf_counter() - started, method=name)
+            # The SDK reports some failures by returning an Error instead of raising
+            if isinstance(result, Error):
+                METRICS.inc("bot_errors_total", where="sdk", name=name)
+            elif name in self.COUNTERS:
+                METRICS.inc(self.COUNTERS[name])
+            return result
+        return call
+
+class HttpClient:
+    """Shared aiohttp session for Web API lookups.
+
+    Connections are pooled and kept alive between calls, capped overall and per
+    host, and every request has a timeout, so a slow API only delays the handler
+    that asked instead of blocking the event loop. Point CREATE_API_URL /
+    WEB_API_URL at a local stub server to test against it.
+    """
+
+    def __init__(self, limit=HTTP_MAX_CONNECTIONS, limit_per_host=HTTP_MAX_PER_HOST, timeout=HTTP_TIMEOUT):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = None
+        self._loop = None
+
+    def _get_session(self):
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            # Sessions are bound to their loop; one left on a stopped loop is just dropped
+            if self._session is not None and not self._session.closed:
+                self._session.detach()
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._loop = loop
+        return self._session
+
+    async def get_json(self, url, params=None, headers=None):
+        """(status, parsed JSON or None, response headers); network errors and timeouts raise"""
+        async with self._get_session().get(url, params=params, headers=headers) as response:
+            data = await response.json(content_type=None) if response.status == 200 else None
+            return response.status, data, response.headers
+
+    async def close(self):
+        """Close pooled connections; call from the loop that opened them"""
+        session, self._session = self._session, None
+        if session is not None and not session.closed:
+            await session.close()
+
+class UserResolver:
+    """username -> user_id cache in front of the Web API, persisted to user_cache.json.
+
+    Entries live in an LRU capped at max_size, expire after ttl seconds, and
+    changes go through the data journal like the other JSON stores. "Not found"
+    answers are remembered in memory for miss_ttl seconds. Concurrent lookups of
+    the same name share one fetch. Ids seen for free (joins, chat) are fed in
+    with remember().
+    """
+
+    def __init__(self, journal, fetch, path="user_cache.json", max_size=USER_CACHE_SIZE,
+                 ttl=USER_CACHE_TTL, miss_ttl=USER_CACHE_MISS_TTL):
+        self.journal = journal
+        self.fetch = fetch  # async username -> user_id or None when not found; raises on API errors
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self.entries = OrderedDict()  # lowercase username -> {"id": user_id, "seen": epoch seconds}
+        self.misses = {}  # lowercase username -> monotonic expiry
+        self.pending = {}  # lowercase username -> Task fetching it
+        now = time.time()
+        for name, value in (read_json_file(path, {}) or {}).items():
+            # Older files map username -> id with no timestamp
+            entry = value if isinstance(value, dict) else {"id": value, "seen": now}
+            self.entries[name.lower()] = entry
+        journal.register(path, lambda: self.entries)
+
+    def reset_loop(self):
+        """Forget fetches that belonged to an event loop which has stopped"""
+        self.pending.clear()
+
+    def get(self, username):
+        """Cached id if still fresh, else None"""
+        key = username.lower()
+        entry = self.entries.get(key)
+        if entry is None or time.time() - entry.get("seen", 0) > self.ttl:
+            return None
+        self.entries.move_to_end(key)
+        return entry["id"]
+
+    def remember(self, username, user_id):
+        key = username.lower()
+        self.misses.pop(key, None)
+        entry = self.entries.get(key)
+        now = time.time()
+        if entry is not None and entry["id"] == user_id and now - entry.get("seen", 0) < self.ttl / 7:
+            self.entries.move_to_end(key)
+            return
+        self.entries[key] = {"id": user_id, "seen": int(now)}
+        self.entries.move_to_end(key)
+        self.journal.set(self.path, key, self.entries[key])
+        while len(self.entries) > self.max_size:
+            oldest, _ = self.entries.popitem(last=False)
+            self.journal.delete(self.path, oldest)
+
+    async def resolve(self, username):
+        """user_id for a username, from cache or one shared Web API lookup; None if unknown"""
+        key = username.lower()
+        user_id = self.get(key)
+        if user_id:
+            return user_id
+        if self.misses.get(key, 0) > time.monotonic():
+            return None
+        task = self.pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._lookup(username))
+            self.pending[key] = task
+            task.add_done_callback(lambda _: self.pending.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _lookup(self, username):
+        key = username.lower()
+        try:
+            user_id = await self.fetch(username)
+        except Exception as e:
+            # Don't cache API failures; the next lookup tries again
+            api_log.warning("API request failed: %s", e)
+            return None
+        if user_id:
+            self.remember(key, user_id)
+        else:
+            self.misses[key] = time.monotonic() + self.miss_ttl
+        return user_id
+
+def outfit_items(data):
+    """Item list from a webapi.highrise.game/users/<id> response, or None"""
+    if not (data.get("user") and data["user"].get("outfit")):
+        return None
+    api_outfit = data["user"]["outfit"]
+    items = []
+    for item in api_outfit:
+        item_id = item.get("item_id", item.get("id", ""))
+        if item_id:
+            items.append(Item(
+                type='clothing',
+                amount=1,
+                id=item_id,
+                account_bound=False,
+                active_palette=item.get("active_palette", -1)
+            ))
+    return items
+
+class OutfitCache:
+    """Outfits by user id, so repeat eq commands apply without a Web API round trip.
+
+    Entries younger than fresh_for are used as is; older ones are revalidated
+    with If-None-Match against their ETag, which costs a 304 instead of a
+    download. Past max_size the least recently used outfit is evicted. Users in
+    the room are prefetched in the background, a few at a time.
+    """
+
+    def __init__(self, http, max_size=OUTFIT_CACHE_SIZE, fresh_for=OUTFIT_FRESH_SECONDS,
+                 prefetch_concurrency=OUTFIT_PREFETCH_CONCURRENCY):
+        self.http = http
+        self.max_size = max_size
+        self.fresh_for = fresh_for
+        self.prefetch_concurrency = prefetch_concurrency
+        self.entries = OrderedDict()  # user_id -> (items, etag, monotonic fetch time)
+        self.pending = {}  # user_id -> Task fetching it
+        self._prefetch_limit = None
+        self._prefetching = {}  # user_id -> background prefetch task, queued or running
+
+    def put(self, user_id, items, etag=None):
+        self.entries[user_id] = (items, etag, time.monotonic())
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    async def get(self, user_id):
+        """Outfit items for a user, revalidating or fetching only when the cached copy is stale"""
+        entry = self.entries.get(user_id)
+        if entry and time.monotonic() - entry[2] < self.fresh_for:
+            self.entries.move_to_end(user_id)
+            return entry[0]
+        task = self.pending.get(user_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(user_id))
+            self.pending[user_id] = task
+            task.add_done_callback(lambda _: self.pending.pop(user_id, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, user_id):
+        entry = self.entries.get(user_id)
+        headers = {"If-None-Match": entry[1]} if entry and entry[1] else None
+        try:
+            status, data, response_headers = await self.http.get_json(f"{WEB_API_URL}/users/{user_id}", headers=headers)
+        except Exception:
+            if entry:
+                return entry[0]  # a stale outfit beats none
+            raise
+        if status == 304 and entry:
+            self.put(user_id, entry[0], entry[1])
+            return entry[0]
+        if status != 200 or not data:
+            api_log.warning("Web API error: %s", status)
+            return entry[0] if entry else None
+        items = outfit_items(data)
+        if items:
+            api_log.debug("Fetched %d outfit items for %s", len(items), user_id)
+            self.put(user_id, items, response_headers.get("ETag"))
+        return items
+
+    def reset_loop(self):
+        """Forget fetches that belonged to an event loop which has stopped"""
+        self.pending.clear()
+        self._prefetch_limit = None
+        self._prefetching.clear()
+
+    def prefetch(self, user_id):
+        """Warm the cache for a user in the background"""
+        if user_id in self.entries or user_id in self.pending or user_id in self._prefetching:
+            return
+        if self._prefetch_limit is None:
+            self._prefetch_limit = asyncio.Semaphore(self.prefetch_concurrency)
+        # Recorded now, not when the semaphore lets it run, so a user rejoining meanwhile isn't queued twice
+        task = self._prefetching[user_id] = asyncio.create_task(self._prefetch(user_id))
+        task.add_done_callback(lambda _: self._prefetching.pop(user_id, None))
+
+    async def _prefetch(self, user_id):
+        async with self._prefetch_limit:
+            try:
+                await self.get(user_id)
+            except Exception as e:
+                api_log.debug("Outfit prefetch failed for %s: %s", user_id, e)
+
+class ColdStore:
+    """A data file that is only parsed on first use, or by the background warm-up.
+
+    load() may be called from the warm-up thread and the event loop at once; the
+    file is read exactly once and whoever comes second waits for it. get() and
+    update() belong to the event loop: update() on a store that isn't loaded yet
+    is held back and applied by the first get() after the load.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.data = None
+        self.seconds = None  # how long the load took
+        self._lock = Lock()
+        self._pending = []  # changes made before the load
+
+    @property
+    def loaded(self):
+        return self.data is not None
+
+    def load(self):
+        if self.data is None:
+            with self._lock:
+                if self.data is None:
+                    started = time.perf_counter()
+                    data = self.loader()
+                    self.seconds = time.perf_counter() - started
+                    self.data = data
+
+    def get(self):
+        self.load()
+        while self._pending:
+            self._pending.pop(0)(self.data)
+        return self.data
+
+    def update(self, change):
+        """Run change(data) now if loaded, else once it is - never parses the file for it"""
+        if self.data is None:
+            self._pending.append(change)
+        else:
+            change(self.get())
+
+class StartupTimer:
+    """Time spent in each step between a constructor starting and the service being ready"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.steps = []  # (label, seconds)
+        self.finished = False
+
+    def mark(self, label):
+        now = time.perf_counter()
+        self.steps.append((label, now - self.last))
+        self.last = now
+
+    @property
+    def total(self):
+        return self.last - self.started
+
+    def report(self):
+        steps = ", ".join(f"{label} {seconds * 1000:.0f} ms" for label, seconds in self.steps)
+        return f"⏱️ {self.name} ready in {self.total:.2f}s ({steps})"
+
+    def finish(self, label=None, budget=None):
+        """Mark the last step and print the report, warning if it ran over budget"""
+        if label:
+            self.mark(label)
+        self.finished = True
+        runtime_log.info(self.report(), extra={"steps": dict(self.steps)})
+        if budget is not None and self.total > budget:
+            runtime_log.warning("⚠️ %s startup took %.1fs, over the %ss budget", self.name, self.total, budget)
+
+class RoomPresence:
+    """In-memory index of who is in the room and where they stand.
+
+    Kept current from join/leave/move events and reconciled now and then with a
+    single get_room_users() call, so handlers look players up by id or username
+    in O(1) without a round trip to the server.
+    """
+
+    def __init__(self):
+        self.users = {}  # user_id -> (User, position)
+        self.by_name = {}  # lowercase username -> user_id
+        self.last_sync = None
+
+    def __len__(self):
+        return len(self.users)
+
+    def __iter__(self):
+        return iter(list(self.users.values()))
+
+    def __contains__(self, username):
+        return username.lower() in self.by_name
+
+    def join(self, user, position):
+        self.users[user.id] = (user, position)
+        self.by_name[user.username.lower()] = user.id
+
+    def move(self, user, position):
+        self.join(user, position)
+
+    def leave(self, user):
+        self.users.pop(user.id, None)
+        if self.by_name.get(user.username.lower()) == user.id:
+            del self.by_name[user.username.lower()]
+
+    def set_position(self, user_id, position):
+        """Record where the bot just teleported someone, ahead of the move event"""
+        entry = self.users.get(user_id)
+        if entry:
+            self.users[user_id] = (entry[0], position)
+
+    def sync(self, room_users):
+        """Replace the index with a fresh get_room_users() result"""
+        self.users = {u.id: (u, pos) for u, pos in room_users}
+        self.by_name = {u.username.lower(): u.id for u, pos in room_users}
+        self.last_sync = time.monotonic()
+
+    def find(self, username):
+        """(User, position) for a username, case-insensitive, or None"""
+        user_id = self.by_name.get(username.lower())
+        return self.users.get(user_id) if user_id else None
+
+    def find_by_id(self, user_id):
+        return self.users.get(user_id)
+
+    def user_id(self, username):
+        return self.by_name.get(username.lower())
+
+def _row_order(key):
+    """Rows are saved under str(row_number - 1); order them numerically"""
+    return (0, int(key)) if str(key).isdigit() else (1, str(key))
+
+class SeatMap:
+    """Flat, index-ordered list of block positions compiled from a rows config.
+
+    Player (or danger-zone) index i sits on seats[i]; holes left by a row with
+    fewer saved blocks than num_blocks are None. The legacy per-index "blocks"
+    dict is only consulted for indices the rows don't cover.
+    """
+
+    def __init__(self, rows=None, blocks=None):
+        self.seats = []
+        for key in sorted(rows or {}, key=_row_order):
+            row = rows[key]
+            row_blocks = row.get("blocks", [])
+            num_blocks = row.get("num_blocks", len(row_blocks))
+            self.seats.extend(row_blocks[i] if i < len(row_blocks) else None for i in range(num_blocks))
+        self.legacy = blocks or {}
+        self.positions = [Position(b['x'], b['y'], b['z'], b['facing']) if b else None for b in self.seats]
+
+    def __len__(self):
+        return len(self.seats)
+
+    def get(self, index):
+        """Block dict for a seat index, or None"""
+        if index is None:
+            return None
+        if 0 <= index < len(self.seats) and self.seats[index]:
+            return self.seats[index]
+        return self.legacy.get(index) or self.legacy.get(str(index))
+
+    def position(self, index):
+        """Position for a seat index, or None"""
+        if index is not None and 0 <= index < len(self.positions) and self.positions[index]:
+            return self.positions[index]
+        b = self.get(index)
+        return Position(b['x'], b['y'], b['z'], b['facing']) if b else None
+
+    def first(self):
+        return next((b for b in self.seats if b), None)
+
+    def nearest(self, x, z):
+        """(index, Position) of the seat closest to a point on the floor, or None"""
+        best = None
+        for i, p in enumerate(self.positions):
+            if p is None:
+                continue
+            d = (p.x - x)**2 + (p.z - z)**2
+            if best is None or d < best[0]:
+                best = (d, i, p)
+        return (best[1], best[2]) if best else None
+
+LAYOUT_FIELDS = ("blocks", "rows", "rows_config", "chooser_pos", "danger_pos", "spawn_pos",
+                 "exit_pos", "vip_pos", "host_pos", "sit_pos")
+
+class GameLayout:
+    """Where the game happens: block rows, danger zone and the named spots.
+
+    Immutable - a set command builds a new layout with replace(), so a round that
+    is part-way through teleporting never sees the blocks change under it. The
+    seat maps are compiled once per layout, on first use.
+    """
+
+    __slots__ = LAYOUT_FIELDS + ("_seat_map", "_danger_seat_map")
+
+    def __init__(self, **fields):
+        for name in LAYOUT_FIELDS:
+            default = {} if name in ("blocks", "rows", "rows_config") else None
+            object.__setattr__(self, name, fields.get(name, default))
+        object.__setattr__(self, "_seat_map", None)
+        object.__setattr__(self, "_danger_seat_map", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameLayout is immutable - use replace()")
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(**{name: config.get(name) for name in LAYOUT_FIELDS if config.get(name) is not None})
+
+    def to_config(self):
+        return {name: getattr(self, name) for name in LAYOUT_FIELDS}
+
+    def replace(self, **changes):
+        return GameLayout(**{**self.to_config(), **changes})
+
+    @property
+    def seat_map(self) -> SeatMap:
+        """Player index -> block, compiled from rows (and legacy blocks)"""
+        if self._seat_map is None:
+            object.__setattr__(self, "_seat_map", SeatMap(self.rows, self.blocks))
+        return self._seat_map
+
+    @property
+    def danger_seat_map(self) -> SeatMap:
+        """Danger-zone index -> block, compiled from danger_pos rows"""
+        if self._danger_seat_map is None:
+            object.__setattr__(self, "_danger_seat_map", SeatMap((self.danger_pos or {}).get("rows")))
+        return self._danger_seat_map
+
+class Roster:
+    """Players in join order with O(1) membership checks"""
+
+    __slots__ = ("_names",)
+
+    def __init__(self, names=()):
+        self._names = dict.fromkeys(names)
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __iter__(self):
+        return iter(list(self._names))
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name):
+        self._names[name] = None
+
+    def discard(self, name):
+        self._names.pop(name, None)
+
+    def clear(self):
+        self._names.clear()
+
+# Phase -> phases the round may move on to; any phase may also go back to None (game over)
+GAME_TRANSITIONS = {
+    None: ("waiting",),
+    "waiting": ("waiting", "choosing"),
+    "choosing": ("waiting", "discussion"),
+    "discussion": ("voting",),
+    "voting": (),
+}
+
+class GuessFaceGame:
+    """State of the Guess Face game.
+
+    Phase changes go through enter(), which turns away transitions the round
+    flow doesn't make - a stale task trying to start a second discussion or
+    danger-zone pull is refused instead of running alongside the real one. The
+    round flow itself runs in one driver task (see Mybot.drive_game); command
+    handlers only change state through plain attribute writes and the
+    synchronous helpers here, so no change is split across an await.
+    """
+
+    __slots__ = ("layout", "active", "starting", "game_ending", "round", "phase", "players",
+                 "chosen_player", "previous_chooser", "chooser_original_pos", "chooser_timeout_time",
+                 "secret_word", "word_chosen", "revealed_letters", "votes", "discussion_ready",
+                 "player_positions", "danger_zone_players", "danger_original_positions",
+                 "excluded_players", "frozen_players", "left_during_waiting",
+                 "prize_active", "prize_amount", "min_players", "driver", "changed")
+
+    def __init__(self, layout=None):
+        self.layout = layout or GameLayout()
+        self.active = False
+        self.starting = False
+        self.game_ending = False
+        self.round = 0
+        self.phase = None
+        self.players = Roster()
+        self.chosen_player = None
+        self.previous_chooser = None
+        self.chooser_original_pos = None
+        self.chooser_timeout_time = None  # When the chooser's time started
+        self.secret_word = None
+        self.word_chosen = None  # Future the chooser's whisper resolves
+        self.revealed_letters = set()
+        self.votes = {}
+        self.discussion_ready = set()  # Players who are ready to move to danger zone
+        self.player_positions = {}  # Which block each player is on
+        self.danger_zone_players = []  # Players currently in danger zone
+        self.danger_original_positions = {}
+        self.excluded_players = set()  # Players who guessed wrong and are excluded
+        self.frozen_players = set()  # Players who stay on their block (no danger zone)
+        self.left_during_waiting = set()  # Players who left during waiting phase
+        self.prize_active = False
+        self.prize_amount = 0
+        self.min_players = 0
+        self.driver = None  # Task running the round flow
+        self.changed = None  # Event set whenever a vote or the roster changes
+
+    def enter(self, phase) -> bool:
+        """Move to `phase` if the round flow allows it from the current one"""
+        if phase is not None and phase not in GAME_TRANSITIONS.get(self.phase, ()):
+            game_log.warning("⚠️ Ignoring game phase change %s -> %s", self.phase, phase)
+            return False
+        self.phase = phase
+        return True
+
+    def can_enter(self, phase) -> bool:
+        return phase is None or phase in GAME_TRANSITIONS.get(self.phase, ())
+
+    def eligible(self, include_frozen=True):
+        """Players who vote this round: everyone still in except the chooser"""
+        return [p for p in self.players
+                if p != self.chosen_player and p not in self.excluded_players
+                and (include_frozen or p not in self.frozen_players)]
+
+    def remaining(self):
+        """Players not yet eliminated"""
+        return [p for p in self.players if p not in self.excluded_players]
+
+    def record_vote(self, username, vote):
+        self.votes[username] = vote
+        self.notify()
+
+    def notify(self):
+        if self.changed is not None:
+            self.changed.set()
+
+    async def wait_for_change(self, timeout):
+        """Sleep until a vote or roster change, or at most `timeout` seconds"""
+        if self.changed is None:
+            self.changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self.changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.changed.clear()
+
+    def await_word(self):
+        """Fresh future for this round's word; a wait left over from an older round is abandoned"""
+        self.abandon_word_wait()
+        self.word_chosen = asyncio.get_running_loop().create_future()
+        return self.word_chosen
+
+    def abandon_word_wait(self):
+        if self.word_chosen and not self.word_chosen.done():
+            self.word_chosen.cancel()
+        self.word_chosen = None
+
+    def choose_word(self, word: str) -> bool:
+        """Set the secret word; True if a round waiting on the chooser picked it up"""
+        self.secret_word = word
+        if self.word_chosen and not self.word_chosen.done():
+            self.word_chosen.set_result(word)
+            return True
+        return False
+
+    def end(self):
+        """Game over: clear the session (layout, prize settings and frozen players stay) and stop the round flow"""
+        self.abandon_word_wait()
+        self.active = False
+        self.players.clear()
+        self.chosen_player = None
+        self.secret_word = None
+        self.phase = None
+        self.votes = {}
+        self.danger_zone_players = []
+        self.excluded_players = set()
+        self.left_during_waiting = set()
+        self.game_ending = False
+        self.stop_driver()
+
+    def snapshot(self) -> dict:
+        """The session as plain data - everything but the layout and what is tied to an event loop"""
+        return copy.deepcopy({name: getattr(self, name) for name in self.__slots__
+                              if name not in ("layout", "driver", "word_chosen", "changed")})
+
+    def restore(self, state: dict):
+        """Load a snapshot() taken from another game; the round flow is not running afterwards"""
+        for name, value in copy.deepcopy(state).items():
+            setattr(self, name, value)
+
+    def stop_driver(self):
+        """Cancel the round flow, unless it is the one asking"""
+        try:
+            current = asyncio.current_task()
+        except RuntimeError:
+            current = None
+        if self.driver is None or self.driver is current:
+            return
+        self.driver.cancel()
+        self.driver = None
+
+OWNER = "owner"
+VIP = "vip"
+PLAYER = "player"
+
+CITIES = ("berlin", "reykjavik", "new york", "london", "moscow", "paris")
+
+def int_args(*defaults):
+    """Argument parser for commands taking whitespace-separated integers (None marks a required one)"""
+    def parse(args):
+        words = args.split()
+        values = []
+        for i, default in enumerate(defaults):
+            if i < len(words):
+                values.append(int(words[i]))
+            elif default is None:
+                raise ValueError("missing argument")
+            else:
+                values.append(default)
+        return values
+    return parse
+
+def target_arg(args):
+    """Argument parser for commands taking a @username"""
+    return args.lower().replace("@", "").strip()
+
+def parse_danger_args(args):
+    """"set danger [blocks]" (row 1) or "set danger row <n> [blocks]" -> [row, blocks]"""
+    words = args.lower().split()
+    if words and words[0] == "row":
+        return [int(words[1]), int(words[2]) if len(words) > 2 else 5]
+    return [1, int(words[0]) if words else 5]
+
+class Command:
+    """A chat command: the phrase that triggers it, who may run it and how its arguments are read"""
+
+    def __init__(self, phrase, handler, level=PLAYER, exact=False, parse=None, usage=None,
+                 denied=None, channels=("chat",)):
+        self.phrase = phrase
+        self.handler = handler
+        self.level = level
+        self.exact = exact  # whole message must be the phrase, otherwise the phrase is a prefix ending on a word boundary
+        self.parse = parse
+        self.usage = usage  # sent when parse raises ValueError/IndexError
+        self.denied = denied  # whispered when the user lacks the level; None stays silent
+        self.channels = channels  # "chat", "whisper" and/or "dm"
+
+class CommandRouter:
+    """Dispatch messages to commands by their first word.
+
+    Commands live in buckets keyed by the first word of their phrase, longest
+    phrase first, so a message costs one dict lookup plus a check of the few
+    phrases sharing its first word; ordinary chat falls through immediately.
+    A prefix only matches up to a word boundary: "new yorker" is not "new york".
+    """
+
+    def __init__(self):
+        self.by_token = {}
+
+    def add(self, phrase, handler, **options):
+        command = Command(phrase, handler, **options)
+        bucket = self.by_token.setdefault(phrase.split()[0], [])
+        bucket.append(command)
+        bucket.sort(key=lambda c: len(c.phrase), reverse=True)
+        return command
+
+    def match(self, message, channel):
+        """(Command, argument text) for a message, or None if it isn't a command on this channel"""
+        text = message.strip()
+        msg = text.lower()
+        if not msg:
+            return None
+        bucket = self.by_token.get(msg.split(None, 1)[0])
+        if not bucket:
+            return None
+        for command in bucket:
+            if channel not in command.channels:
+                continue
+            if msg == command.phrase or (not command.exact and msg.startswith(command.phrase)
+                                         and not msg[len(command.phrase)].isalnum()):
+                return command, text[len(command.phrase):].strip()
+        return None
+
+def new_player_stats():
+    now = datetime.now().isoformat()
+    return {
+        "games_played": 0,
+        "games_won": 0,
+        "games_lost": 0,
+        "total_wagered": 0,
+        "total_won": 0,
+        "biggest_win": 0,
+        "join_date": now,
+        "last_seen": now
+    }
+
+def current_windows(now=None):
+    """Key of the current period of every leaderboard window, e.g. {"daily": "daily:2026-10-18"}"""
+    now = now or datetime.now()
+    return {window: f"{window}:{now.strftime(fmt)}" for window, fmt in LEADERBOARD_WINDOWS.items()}
+
+class Leaderboard:
+    """Players ranked by wins, updated as results come in.
+
+    A Fenwick tree counts the players on each win total, so a player's rank and
+    the player in k-th place take O(log W) for W the highest win total, and
+    top(n) walks only the first n places. Players on the same total keep the
+    order in which they reached it.
+    """
+
+    def __init__(self, wins=None):
+        self.wins = {}  # username -> wins
+        self.by_wins = {}  # wins -> {username: None} in the order they got there
+        self._tree = [0] * 65  # counts for win totals 0..63, 1-based
+        for username, count in (wins or {}).items():
+            self.set(username, count)
+
+    def __len__(self):
+        return len(self.wins)
+
+    def _update(self, wins, delta):
+        i = wins + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _grow(self, wins):
+        size = len(self._tree) - 1
+        while size <= wins:
+            size *= 2
+        self._tree = [0] * (size + 1)
+        for total, names in self.by_wins.items():
+            self._update(total, len(names))
+
+    def _count_upto(self, wins):
+        """Players with at most `wins` wins"""
+        i = min(wins + 1, len(self._tree) - 1)
+        count = 0
+        while i > 0:
+            count += self._tree[i]
+            i -= i & -i
+        return count
+
+    def _kth(self, k):
+        """Win total of the k-th player counting from the fewest wins (1-based)"""
+        pos = 0
+        step = len(self._tree) - 1  # always a power of two
+        while step:
+            if pos + step < len(self._tree) and self._tree[pos + step] < k:
+                pos += step
+                k -= self._tree[pos]
+            step //= 2
+        return pos
+
+    def set(self, username, wins):
+        old = self.wins.get(username)
+        if old == wins:
+            return
+        if old is not None:
+            names = self.by_wins[old]
+            del names[username]
+            if not names:
+                del self.by_wins[old]
+            self._update(old, -1)
+        if wins + 1 >= len(self._tree):
+            self._grow(wins)
+        self.wins[username] = wins
+        self.by_wins.setdefault(wins, {})[username] = None
+        self._update(wins, 1)
+
+    def add(self, username, won):
+        self.set(username, self.wins.get(username, 0) + won)
+
+    def rank(self, username):
+        """(place, wins) for a player, or None if they are not on the board"""
+        wins = self.wins.get(username)
+        if wins is None:
+            return None
+        return len(self.wins) - self._count_upto(wins) + 1, wins
+
+    def top(self, limit):
+        """[(username, wins)] for the first `limit` places"""
+        result = []
+        k = len(self.wins)
+        while k > 0 and len(result) < limit:
+            wins = self._kth(k)
+            names = self.by_wins[wins]
+            result.extend((username, wins) for username in islice(names, limit - len(result)))
+            k -= len(names)
+        return result
+
+class JsonPlayerStore:
+    """Player ledger kept in balances.json, credits.json and user_stats.json (default backend)"""
+
+    def __init__(self, journal, balances, credits, user_stats, window_wins=None):
+        self.journal = journal
+        self.balances = balances
+        self.credits = credits
+        self.user_stats = user_stats
+        self.window_wins = window_wins if window_wins is not None else {}  # "daily:2026-10-18/username" -> wins
+        self._touched = set()
+        self._boards = None  # window (None = all time) -> (period key, Leaderboard), built on first query
+        journal.register("balances.json", lambda: self.balances)
+        journal.register("credits.json", lambda: self.credits)
+        journal.register("user_stats.json", lambda: self.user_stats)
+        journal.register("window_wins.json", lambda: self.window_wins)
+
+    def ensure(self, username):
+        """Create the player with starting balance and empty stats if they are new"""
+        if username not in self.balances:
+            self.balances[username] = 1000
+            self.journal.set("balances.json", username, 1000)
+        if username not in self.credits:
+            self.credits[username] = 0
+            self.journal.set("credits.json", username, 0)
+        if username not in self.user_stats:
+            self.user_stats[username] = new_player_stats()
+            self.journal.set("user_stats.json", username, self.user_stats[username])
+            if self._boards is not None:
+                self._boards[None][1].set(username, 0)
+
+    def touch(self, username):
+        if username in self.user_stats:
+            self.user_stats[username]["last_seen"] = datetime.now().isoformat()
+            self._touched.add(username)
+
+    def add_result(self, username, won=0, played=0, lost=0):
+        self.ensure(username)
+        stats = self.user_stats[username]
+        stats["games_won"] += won
+        stats["games_played"] += played
+        stats["games_lost"] += lost
+        self._touched.add(username)
+        if won:
+            self._record_win(username, won)
+
+    def _record_win(self, username, won):
+        boards = self._leaderboards() if self._boards is not None else None
+        for window, key in current_windows().items():
+            entry = f"{key}/{username}"
+            self.window_wins[entry] = self.window_wins.get(entry, 0) + won
+            self.journal.set("window_wins.json", entry, self.window_wins[entry])
+            if boards is not None:
+                boards[window][1].add(username, won)
+        if boards is not None:
+            boards[None][1].add(username, won)
+
+    def _leaderboards(self):
+        """The boards, built once from the stats and window files and rolled over when a period ends"""
+        keys = current_windows()
+        if self._boards is None:
+            self._boards = {None: (None, Leaderboard({username: stats.get("games_won", 0)
+                                                      for username, stats in self.user_stats.items()}))}
+        stale = [window for window, key in keys.items() if self._boards.get(window, (None,))[0] != key]
+        if stale:
+            current = set(keys.values())
+            wins = {window: {} for window in stale}
+            for entry, count in list(self.window_wins.items()):
+                key, _, username = entry.partition("/")
+                if key not in current:
+                    # A finished period - only the current ones are kept
+                    del self.window_wins[entry]
+                    self.journal.delete("window_wins.json", entry)
+                elif key.split(":", 1)[0] in wins:
+                    wins[key.split(":", 1)[0]][username] = count
+            for window in stale:
+                self._boards[window] = (keys[window], Leaderboard(wins[window]))
+        return self._boards
+
+    def add_balance(self, username, balance=0, credits=0):
+        self.ensure(username)
+        if balance:
+            self.balances[username] += balance
+            self.journal.set("balances.json", username, self.balances[username])
+        if credits:
+            self.credits[username] += credits
+            self.journal.set("credits.json", username, self.credits[username])
+
+    def commit(self):
+        """Journal every player changed since the last commit"""
+        for username in self._touched:
+            self.journal.set("user_stats.json", username, self.user_stats[username])
+        self._touched.clear()
+
+    async def get_stats(self, username):
+        return self.user_stats.get(username)
+
+    async def get_credits(self, username):
+        return self.credits.get(username, 0)
+
+    async def top_players(self, limit=5, window=None):
+        return self._leaderboards()[window][1].top(limit)
+
+    async def rank(self, username, window=None):
+        """(place, wins) on the all-time or a windowed board; None if the player has no entry"""
+        return self._leaderboards()[window][1].rank(username)
+
+    def close(self):
+        pass
+
+PLAYER_COLUMNS = ("balance", "credits", "games_played", "games_won", "games_lost",
+                  "total_wagered", "total_won", "biggest_win", "join_date", "last_seen")
+
+PLAYERS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    username TEXT PRIMARY KEY,
+    balance INTEGER NOT NULL DEFAULT 1000,
+    credits INTEGER NOT NULL DEFAULT 0,
+    games_played INTEGER NOT NULL DEFAULT 0,
+    games_won INTEGER NOT NULL DEFAULT 0,
+    games_lost INTEGER NOT NULL DEFAULT 0,
+    total_wagered INTEGER NOT NULL DEFAULT 0,
+    total_won INTEGER NOT NULL DEFAULT 0,
+    biggest_win INTEGER NOT NULL DEFAULT 0,
+    join_date TEXT,
+    last_seen TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_players_games_won ON players (games_won DESC);
+CREATE INDEX IF NOT EXISTS idx_players_last_seen ON players (last_seen);
+CREATE TABLE IF NOT EXISTS window_wins (
+    period TEXT NOT NULL,
+    username TEXT NOT NULL,
+    wins INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (period, username)
+);
+CREATE INDEX IF NOT EXISTS idx_window_wins ON window_wins (period, wins DESC);
+"""
+
+def migrate_json_players(conn, balances_path="balances.json", credits_path="credits.json", stats_path="user_stats.json"):
+    """One-shot import of the JSON player files into the players table"""
+    balances = read_json_file(balances_path, {}) or {}
+    credits = read_json_file(credits_path, {}) or {}
+    user_stats = read_json_file(stats_path, {}) or {}
+
+    rows = []
+    for username in set(balances) | set(credits) | set(user_stats):
+        stats = {**new_player_stats(), **user_stats.get(username, {})}
+        rows.append((
+            username,
+            balances.get(username, 1000),
+            credits.get(username, 0),
+            *(stats[column] for column in PLAYER_COLUMNS[2:])
+        ))
+
+    with conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO players (username, {', '.join(PLAYER_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * (len(PLAYER_COLUMNS) + 1))})",
+            rows
+        )
+    persist_log.info("📦 Migrated %d players from JSON into SQLite", len(rows))
+    return len(rows)
+
+class SqlitePlayerStore:
+    """Player ledger in a single SQLite table (opt in with PLAYER_STORE=sqlite).
+
+    Nothing is loaded into memory at startup. New players, result and balance
+    deltas and last-seen times are buffered and written as one transaction on
+    commit, which runs on the FileWriter thread; reads go to a separate reader
+    thread, which WAL mode lets run alongside the writer.
+
+    Several bot processes can share one database: every write is an increment
+    (col = col + ?) inside a BEGIN IMMEDIATE transaction, so concurrent rounds in
+    different rooms add up instead of overwriting each other, and a writer that
+    finds the database locked waits and retries rather than dropping the batch.
+
+    Journal records a JSON-mode run left for the ledger files are replayed into
+    the table as absolute values, the way they would have landed in the files.
+    """
+
+    JOURNAL_COLUMNS = {"balances.json": "balance", "credits.json": "credits"}
+
+    def __init__(self, writer, path="players.db", known_cache_size=10000, busy_timeout=LEDGER_BUSY_TIMEOUT):
+        self.writer = writer
+        self.path = path
+        self.known_cache_size = known_cache_size
+        self.busy_timeout = busy_timeout
+        self._known = OrderedDict()  # recently ensured usernames, so chat does not hit the DB
+        self._new = {}  # username -> first seen
+        self._deltas = {}  # username -> [won, played, lost, balance, credits]
+        self._seen = {}  # username -> last seen
+        self._window_wins = {}  # (period, username) -> wins, for the daily/weekly boards
+        self._replayed = {}  # username -> {column: value} from journal replay
+        self._replayed_wins = {}  # (period, username) -> wins from journal replay
+        self._batch = 0
+        self._reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="player-reader")
+
+        self._write_conn = self._connect()
+        self._write_conn.executescript(PLAYERS_SCHEMA)
+        # Only the first process to open an empty ledger imports the JSON files
+        self._write_conn.execute("BEGIN IMMEDIATE")
+        if self._write_conn.execute("SELECT 1 FROM players LIMIT 1").fetchone() is None:
+            migrate_json_players(self._write_conn)
+        else:
+            self._write_conn.commit()
+        self._read_conn = self._connect()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def ensure(self, username):
+        if username in self._known:
+            self._known.move_to_end(username)
+            return
+        self._known[username] = True
+        if len(self._known) > self.known_cache_size:
+            self._known.popitem(last=False)
+        self._new.setdefault(username, datetime.now().isoformat())
+
+    def touch(self, username):
+        self.ensure(username)
+        self._seen[username] = datetime.now().isoformat()
+
+    def add_result(self, username, won=0, played=0, lost=0):
+        self.ensure(username)
+        delta = self._deltas.setdefault(username, [0, 0, 0, 0, 0])
+        delta[0] += won
+        delta[1] += played
+        delta[2] += lost
+        if won:
+            for key in current_windows().values():
+                self._window_wins[key, username] = self._window_wins.get((key, username), 0) + won
+
+    def add_balance(self, username, balance=0, credits=0):
+        self.ensure(username)
+        delta = self._deltas.setdefault(username, [0, 0, 0, 0, 0])
+        delta[3] += balance
+        delta[4] += credits
+
+    def replay_record(self, record):
+        """Buffer a JSON-ledger journal record; the next commit writes it"""
+        if record.get("op") != "set":
+            return  # The ledger files only ever delete finished window periods
+        filename, key, value = record.get("f"), record.get("k"), record.get("v")
+        if filename == "window_wins.json":
+            period, _, username = key.partition("/")
+            self._replayed_wins[period, username] = value
+            return
+        self._new.setdefault(key, datetime.now().isoformat())
+        columns = self._replayed.setdefault(key, {})
+        if filename == "user_stats.json":
+            columns.update((column, value[column]) for column in PLAYER_COLUMNS[2:] if column in value)
+        elif filename in self.JOURNAL_COLUMNS:
+            columns[self.JOURNAL_COLUMNS[filename]] = value
+
+    def commit(self):
+        """Write everything buffered since the last commit as one transaction"""
+        if not (self._new or self._deltas or self._seen or self._replayed_wins):
+            return
+        batch = (self._new, self._replayed, self._deltas, self._seen, self._window_wins, self._replayed_wins)
+        self._new, self._replayed, self._deltas, self._seen, self._window_wins, self._replayed_wins = {}, {}, {}, {}, {}, {}
+        self._batch += 1
+        self.writer.submit(("players", self._batch), self._write_batch, batch)
+
+    def _write_batch(self, batch):
+        for attempt in range(LEDGER_WRITE_RETRIES):
+            try:
+                self._apply_batch(batch)
+                return
+            except sqlite3.OperationalError as e:
+                # Another process held the lock past busy_timeout; the batch is still ours to write
+                if "locked" not in str(e) or attempt == LEDGER_WRITE_RETRIES - 1:
+                    raise
+                persist_log.warning("⚠️ Player ledger busy, retrying write (%d/%d)", attempt + 1, LEDGER_WRITE_RETRIES)
+                time.sleep(0.5 * 2 ** attempt)
+
+    def _apply_batch(self, batch):
+        new, replayed, deltas, seen, window_wins, replayed_wins = batch
+        with self._write_conn:
+            self._write_conn.execute("BEGIN IMMEDIATE")
+            self._write_conn.executemany(
+                "INSERT OR IGNORE INTO players (username, join_date, last_seen) VALUES (?, ?, ?)",
+                [(username, ts, ts) for username, ts in new.items()]
+            )
+            for username, columns in replayed.items():
+                if columns:
+                    self._write_conn.execute(
+                        f"UPDATE players SET {', '.join(f'{column} = ?' for column in columns)} WHERE username = ?",
+                        (*columns.values(), username)
+                    )
+            self._write_conn.executemany(
+                "UPDATE players SET games_won = games_won + ?, games_played = games_played + ?, "
+                "games_lost = games_lost + ?, balance = balance + ?, credits = credits + ? WHERE username = ?",
+                [(*delta, username) for username, delta in deltas.items()]
+            )
+            self._write_conn.executemany(
+                "UPDATE players SET last_seen = ? WHERE username = ?",
+                [(ts, username) for username, ts in seen.items()]
+            )
+            if window_wins or replayed_wins:
+                self._write_conn.executemany(
+                    "INSERT INTO window_wins (period, username, wins) VALUES (?, ?, ?) "
+                    "ON CONFLICT (period, username) DO UPDATE SET wins = excluded.wins",
+                    [(key, username, wins) for (key, username), wins in replayed_wins.items()]
+                )
+                self._write_conn.executemany(
+                    "INSERT INTO window_wins (period, username, wins) VALUES (?, ?, ?) "
+                    "ON CONFLICT (period, username) DO UPDATE SET wins = wins + excluded.wins",
+                    [(key, username, won) for (key, username), won in window_wins.items()]
+                )
+                # Only the current periods are kept
+                current = list(current_windows().values())
+                self._write_conn.execute(
+                    f"DELETE FROM window_wins WHERE period NOT IN ({', '.join('?' * len(current))})", current
+                )
+
+    async def _read(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._reader, fn, *args)
+
+    def _read_player(self, username):
+        row = self._read_conn.execute(
+            f"SELECT {', '.join(PLAYER_COLUMNS)} FROM players WHERE username = ?", (username,)
+        ).fetchone()
+        return dict(zip(PLAYER_COLUMNS, row)) if row else None
+
+    async def get_stats(self, username):
+        player = await self._read(self._read_player, username)
+        if player is None:
+            if username not in self._new:
+                return None
+            player = {"balance": 1000, "credits": 0, **new_player_stats()}
+        # Results from a round that is not committed yet
+        won, played, lost, balance, credits = self._deltas.get(username, (0, 0, 0, 0, 0))
+        player["games_won"] += won
+        player["games_played"] += played
+        player["games_lost"] += lost
+        player["balance"] += balance
+        player["credits"] += credits
+        return player
+
+    async def get_credits(self, username):
+        player = await self._read(self._read_player, username)
+        return (player["credits"] if player else 0) + self._deltas.get(username, (0, 0, 0, 0, 0))[4]
+
+    def _read_top(self, limit, period):
+        if period is None:
+            return self._read_conn.execute(
+                "SELECT username, games_won FROM players ORDER BY games_won DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return self._read_conn.execute(
+            "SELECT username, wins FROM window_wins WHERE period = ? ORDER BY wins DESC LIMIT ?", (period, limit)
+        ).fetchall()
+
+    def _read_rank(self, username, period):
+        # Both boards are indexed by wins, so the count only walks the entries ahead of the player
+        if period is None:
+            row = self._read_conn.execute("SELECT games_won FROM players WHERE username = ?", (username,)).fetchone()
+            if row is None:
+                return None
+            ahead = self._read_conn.execute("SELECT COUNT(*) FROM players WHERE games_won > ?", row).fetchone()
+        else:
+            row = self._read_conn.execute(
+                "SELECT wins FROM window_wins WHERE period = ? AND username = ?", (period, username)
+            ).fetchone()
+            if row is None:
+                return None
+            ahead = self._read_conn.execute(
+                "SELECT COUNT(*) FROM window_wins WHERE period = ? AND wins > ?", (period, row[0])
+            ).fetchone()
+        return ahead[0] + 1, row[0]
+
+    async def top_players(self, limit=5, window=None):
+        period = current_windows()[window] if window else None
+        return [tuple(row) for row in await self._read(self._read_top, limit, period)]
+
+    async def rank(self, username, window=None):
+        """(place, wins) on the all-time or a windowed board; None if the player has no entry"""
+        period = current_windows()[window] if window else None
+        return await self._read(self._read_rank, username, period)
+
+    def close(self):
+        self._reader.shutdown(wait=True)
+        self._read_conn.close()
+        self._write_conn.close()
+
+class LedgerLocked(RuntimeError):
+    """Another process owns this directory's data files; reconnecting can't fix that"""
+
+
+class SharedServices:
+    """What every room in the process shares: the player ledger, the username and
+    outfit caches, the HTTP pool and the file writer/journal behind them.
+
+    Rooms register their own files on the same journal, so open() - which replays
+    it - must wait until every room's bot has been built.
+
+    The journal, user cache and JSON ledger are rewritten whole on checkpoint, so
+    one process owns them, guarded by players.lock. Processes share players only
+    through the SQLite ledger, each running from its own directory with PLAYER_DB
+    pointing at the same database.
+    """
+
+    def __init__(self):
+        self.startup = StartupTimer("Shared services")
+        self.writer = FileWriter()
+        self.journal = DataJournal(self.writer)
+        self.http = HttpClient()  # Non-blocking Web API lookups
+        self.outfits = OutfitCache(self.http)
+        self.player_store = os.getenv("PLAYER_STORE", "json").lower()
+        self.player_db = os.getenv("PLAYER_DB", "players.db")
+        self._ledger_lock = None
+        self._lock_data_files()
+        if self.player_store == "sqlite":
+            self.players = SqlitePlayerStore(self.writer, self.player_db)
+            # Journal records a JSON-mode run left for the ledger land in the database
+            for filename in ("balances.json", "credits.json", "user_stats.json", "window_wins.json"):
+                self.journal.forward(filename, self.players)
+            self.startup.mark("player database")
+        else:
+            self.players = JsonPlayerStore(self.journal,
+                                           read_json_file("balances.json", {}) or {},
+                                           read_json_file("credits.json", {}) or {},
+                                           read_json_file("user_stats.json", {}) or {},
+                                           read_json_file("window_wins.json", {}) or {})
+            self.startup.mark("player ledger")
+        self.resolver = UserResolver(self.journal, self.fetch_user_id)
+        self.startup.mark("user cache")
+        self.opened = False
+
+    def _lock_data_files(self):
+        """Claim the journal, user cache and JSON ledger for this process"""
+        if fcntl is None:
+            return
+        self._ledger_lock = open("players.lock", "w")
+        try:
+            fcntl.flock(self._ledger_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._ledger_lock.close()
+            self._ledger_lock = None
+            if self.player_store == "sqlite":
+                raise LedgerLocked("Another bot process owns this directory's journal and user cache - "
+                                   "run each process from its own directory, with PLAYER_DB pointing at the shared database")
+            raise LedgerLocked("Another bot process owns the JSON player files - set PLAYER_STORE=sqlite "
+                               "and run each process from its own directory to share the player ledger")
+
+    def open(self):
+        """Replay the journal once every room has registered its files"""
+        if self.opened:
+            return
+        self.opened = True
+        self.journal.replay()
+        self.startup.mark("journal replay")
+        self.startup.finish()
+
+    async def fetch_user_id(self, username: str) -> str | None:
+        """Ask the Web API for a username's id; None if it doesn't exist, raises if the API fails"""
+        status, data, _ = await self.http.get_json(f"{CREATE_API_URL}/users", params={"username": username})
+        if status != 200 or data is None:
+            raise RuntimeError(f"API error: {status}")
+
+        users_list = data.get("users", [])
+        if users_list and len(users_list) > 0:
+            user_data = users_list[0]
+            user_id = user_data.get("user_id")
+            real_username = user_data.get("username", username)
+            if user_id:
+                api_log.info("API: Found %s -> %s", real_username, user_id)
+                return user_id
+        else:
+            api_log.info("API: User '%s' not found", username)
+        return None
+
+    def reset_loop(self):
+        """Drop in-flight work of a stopped event loop before serving from a new one"""
+        self.outfits.reset_loop()
+        self.resolver.reset_loop()
+
+    def save_all(self):
+        """Checkpoint every file with journaled changes"""
+        self.players.commit()
+        self.journal.checkpoint()
+
+    def close(self):
+        """Flush everything synchronously once the event loop has stopped"""
+        self.writer.close()
+        self.save_all()
+        self.players.close()
+        if self._ledger_lock is not None:
+            self._ledger_lock.close()
+            self._ledger_lock = None
+
+def load_rooms(path=ROOMS_CONFIG):
+    """Rooms for the multi-room runner: [{"room_id", "token", "name", "data_dir"}, ...]
+
+    Each room keeps its own game config and lists under data_dir (default
+    rooms/<name>); [] when there is no rooms config.
+    """
+    rooms = []
+    for i, room in enumerate(read_json_file(path, []) or []):
+        if not room.get("room_id") or not room.get("token"):
+            runtime_log.warning("⚠️ Skipping room #%d in %s: room_id and token are required", i + 1, path)
+            continue
+        name = room.get("name") or room["room_id"]
+        rooms.append({
+            "name": name,
+            "room_id": room["room_id"],
+            "token": room["token"],
+            "data_dir": room.get("data_dir") or os.path.join("rooms", name),
+        })
+    return rooms
+
 class Mybot(BaseBot):
-    def __init__(self) -> None:
+    def __init__(self, shared: SharedServices | None = None, data_dir: str = ".", room_id: str | None = None) -> None:
         super().__init__()
+        # Room files live in data_dir; the ledger, caches and HTTP pool are shared
+        self.data_dir = data_dir
+        os.makedirs(data_dir, exist_ok=True)
+        self.startup = StartupTimer("Room" if data_dir == "." else f"Room {data_dir}")
+        self.owns_shared = shared is None
+        self.shared = shared or SharedServices()
+        self.startup.mark("shared services")
         self.load_game_config()
-        self.balances = self.load_balances()
-        self.credits = self.load_credits()
         self.owner_usernames = ["TITOMOSTAFA", ""] 
         self.my_user_id = None
-        self.user_stats = self.load_user_stats()
-        self.daily_rewards = self.load_daily_rewards()
         self.allowed_whispers = self.load_allowed_whispers()
         self.vips = self.load_vips()
         self.bot_start_time = datetime.now()
-        self.users_messaged_bot = self.load_users_messaged_bot()  # Track users who messaged the bot
-        self.user_conversations = self.load_user_conversations()  # Map user_id -> conversation_id for sending invites
-        # Initialize room_id to None - will be set from environment or session_metadata in on_start
+        # Stores that grow with every user ever seen are parsed on first use or by
+        # the warm-up after connecting, so they don't hold up joining the room
+        self.cold = {store.name: store for store in (
+            ColdStore("daily_rewards", self.load_daily_rewards),
+            ColdStore("users_messaged_bot", self.load_users_messaged_bot),  # Track users who messaged the bot
+            ColdStore("user_conversations", self.load_user_conversations),  # Map user_id -> conversation_id for sending invites
+            ColdStore("invited_users", self.load_invited_users),  # user_id -> {"room", "status", "at"} invite delivery state
+        )}
+        # The room this bot connects to; the SDK's session metadata doesn't carry it
+        self.connect_room_id = room_id
+        # Initialize room_id to None - will be set from connect_room_id or environment in on_start
         self.room_id = None
         self.current_room_id = None
-        self.invited_users = self.load_invited_users()  # Track users who have been sent an invite
-        
-        # Guess Face Game state (active session state)
-        self.guess_face_game.update({
-            "active": False,
-            "round": 0,
-            "players": [],
-            "chosen_player": None,
-            "secret_word": None,
-            "revealed_letters": set(),
-            "votes": {},
-            "phase": None,
-            "discussion_ready": set(),  # Players who are ready to move to danger zone
-            "game_ending": False,  # Flag to prevent new game starts during cleanup
-            "prize_active": False,
-            "prize_amount": 0,
-            "min_players": 0,
-            "starting": False,
-            "chooser_timeout_task": None,  # Task for chooser timeout
-            "chooser_timeout_time": None  # When the chooser timeout started
-        })
+        self.invite_campaign = None  # Task running the current !invite campaign
+        self.presence = RoomPresence()  # Who is in the room and where, kept current from events
+        self.block_lock_sweep = None
+        self.outbox = OutboundScheduler()  # Rate-limited, prioritised outgoing requests
+        METRICS.register(("outbox", data_dir), self.outbox_metrics)
+        self.background = {}  # name -> long-running task started from on_start
+        self.connected_since = None  # epoch seconds of the last on_start; None while offline
+        self.last_event_at = None
+        self.http = self.shared.http
+        self.outfits = self.shared.outfits
+        self.resolver = self.shared.resolver
+        self.commands = self._build_commands()
+
+        # Small per-change journal records instead of full file rewrites on every change
+        self.writer = self.shared.writer
+        self.journal = self.shared.journal
+        self.journal.register(self.data_path("allowed_whispers.json"), lambda: self.allowed_whispers)
+        self.journal.register(self.data_path("vips.json"), lambda: self.vips)
+        self.journal.register(self.data_path("users_messaged_bot.json"), lambda: self.users_messaged_bot)
+        self.journal.register(self.data_path("user_conversations.json"), lambda: self.user_conversations)
+        self.journal.register(self.data_path("invited_users.json"), lambda: self.invited_users)
+        self.startup.mark("room stores")
+        if self.owns_shared:
+            self.shared.open()
+            self.startup.mark("open shared services")
+        self._webapi = None
+
+    @property
+    def webapi(self):
+        """Highrise Web API client, created on first use"""
+        if self._webapi is None:
+            try:
+                self._webapi = WebAPI()
+                api_log.info("WebAPI initialized successfully")
+            except Exception as e:
+                api_log.error("WebAPI initialization failed: %s", e)
+        return self._webapi
+
+    @webapi.setter
+    def webapi(self, webapi):
+        # The SDK's bot_runner hands every new connection its own client
+        self._webapi = webapi
+
+    def health(self, now=None):
+        """Connection and activity summary for /health"""
+        now = now or time.time()
+        return {
+            "connected": self.connected_since is not None,
+            "connected_for": round(now - self.connected_since, 1) if self.connected_since else None,
+            "last_event_age": round(now - self.last_event_at, 1) if self.last_event_at else None,
+            "room_id": self.room_id,
+            "users_in_room": len(self.presence),
+            "outbound_queued": sum(stats["depth"] for stats in self.outbox.stats.values()),
+        }
 
-        try:
-            self.webapi = WebAPI()
-            print("WebAPI initialized successfully")
-        except Exception as e:
-            print(f"WebAPI initialization failed: {e}")
-            self.webapi = None  # type: ignore
+    def game_view(self):
+        """The game for /game - everything but the secret word"""
+        state = self.game.snapshot()
+        state["word_chosen"] = state.pop("secret_word") is not None
+        state["layout"] = self.game.layout.to_config()
+        return state
+
+    def presence_view(self):
+        """Who is in the room and where, for /presence"""
+        return [{"id": u.id, "username": u.username, "position": pos} for u, pos in self.presence]
+
+    def outbox_metrics(self):
+        """Outbound scheduler queue depths and outcomes, read at scrape time"""
+        room = self.data_dir
+        for lane, stats in self.outbox.stats.items():
+            yield "bot_outbound_queue_depth", {"room": room, "lane": lane}, stats["depth"]
+            for outcome in ("sent", "retried", "failed"):
+                yield "bot_outbound_requests_total", {"room": room, "lane": lane, "outcome": outcome}, stats[outcome]
+
+    @property
+    def daily_rewards(self):
+        return self.cold["daily_rewards"].get()
+
+    @property
+    def users_messaged_bot(self):
+        return self.cold["users_messaged_bot"].get()
+
+    @property
+    def user_conversations(self):
+        return self.cold["user_conversations"].get()
+
+    @property
+    def invited_users(self):
+        return self.cold["invited_users"].get()
+
+    async def warm_up(self):
+        """Load the cold stores off the event loop, then resume work that needs them"""
+        pending = [store for store in self.cold.values() if not store.loaded]
+        if pending:
+            loop = asyncio.get_running_loop()
+            for store in pending:
+                await loop.run_in_executor(None, store.load)
+                store.get()  # Apply changes events made while it loaded
+            persist_log.info("📂 Cold stores loaded: %s", ", ".join(
+                f"{store.name} {len(store.data)} in {store.seconds * 1000:.0f} ms" for store in pending))
+        self.resume_invite_campaign()
+
+    def remember_contact(self, user_id, conversation_id=None):
+        """Add a user (and their DM conversation) to the !invite lists without loading them on an event"""
+        def add_user(users):
+            if user_id not in users:
+                users.add(user_id)
+                self.journal.add(self.data_path("users_messaged_bot.json"), user_id)
+
+        def set_conversation(conversations):
+            if conversations.get(user_id) != conversation_id:
+                conversations[user_id] = conversation_id
+                self.journal.set(self.data_path("user_conversations.json"), user_id, conversation_id)
+
+        self.cold["users_messaged_bot"].update(add_user)
+        if conversation_id is not None:
+            self.cold["user_conversations"].update(set_conversation)
+
+    @property
+    def players(self):
+        """The shared player ledger (swapped for the SQLite store when the shared services open)"""
+        return self.shared.players
+
+    def data_path(self, filename):
+        """Where this room keeps one of its own files"""
+        return filename if self.data_dir == "." else os.path.join(self.data_dir, filename)
 
     def save_game_config(self):
         config = {
@@ -92,67 +2379,48 @@ class Mybot(BaseBot):
                 "z": self.down_position.z,  # type: ignore
                 "facing": self.down_position.facing  # type: ignore
             } if self.down_position else None,
-            "blocks": self.guess_face_game.get("blocks", {}),
-            "rows": self.guess_face_game.get("rows", {}),
-            "rows_config": self.guess_face_game.get("rows_config", {}),
-            "chooser_pos": self.guess_face_game.get("chooser_pos"),
-            "danger_pos": self.guess_face_game.get("danger_pos"),
-            "spawn_pos": self.guess_face_game.get("spawn_pos"),
-            "exit_pos": self.guess_face_game.get("exit_pos"),
-            "vip_pos": self.guess_face_game.get("vip_pos"),
-            "host_pos": self.guess_face_game.get("host_pos"),
-            "sit_pos": self.guess_face_game.get("sit_pos")
+            **self.game.layout.to_config()
         }
-        with open("game_config.json", "w") as f:
-            json.dump(config, f)
+        self._save_json(self.data_path("game_config.json"), config)
+
+    def update_layout(self, **changes):
+        """Swap in a layout with these spots changed and save it"""
+        self.game.layout = self.game.layout.replace(**changes)
+        self.save_game_config()
+
+    @property
+    def seat_map(self) -> SeatMap:
+        return self.game.layout.seat_map
+
+    @property
+    def danger_seat_map(self) -> SeatMap:
+        return self.game.layout.danger_seat_map
 
     def load_game_config(self):
         self.saved_position = None
         self.down_position = None
-        self.guess_face_game = {
-            "blocks": {},
-            "rows": {},
-            "rows_config": {},
-            "chooser_pos": None,
-            "danger_pos": None,
-            "spawn_pos": None,
-            "exit_pos": None,
-            "vip_pos": None,
-            "host_pos": None,
-            "sit_pos": None,
-            "player_positions": {},  # Track which block each player is on
-            "danger_zone_players": [],  # Players currently in danger zone (up to 5)
-            "excluded_players": set(),  # Players who guessed wrong and are excluded
-            "frozen_players": set(),  # Players who stay on their block (no danger zone)
-            "left_during_waiting": set()  # Players who left during waiting phase
-        }
-        try:
-            with open("game_config.json", "r") as f:
-                config = json.load(f)
-                pos = config.get("saved_position")
-                if pos:
-                    self.saved_position = Position(pos['x'], pos['y'], pos['z'], pos['facing'])
-                down_pos = config.get("down_position")
-                if down_pos:
-                    self.down_position = Position(down_pos['x'], down_pos['y'], down_pos['z'], down_pos['facing'])
-                self.guess_face_game["blocks"] = config.get("blocks", {})
-                self.guess_face_game["rows"] = config.get("rows", {})
-                self.guess_face_game["rows_config"] = config.get("rows_config", {})
-                self.guess_face_game["chooser_pos"] = config.get("chooser_pos")
-                self.guess_face_game["danger_pos"] = config.get("danger_pos")
-                self.guess_face_game["spawn_pos"] = config.get("spawn_pos")
-                self.guess_face_game["exit_pos"] = config.get("exit_pos")
-                self.guess_face_game["vip_pos"] = config.get("vip_pos")
-                self.guess_face_game["host_pos"] = config.get("host_pos")
-                self.guess_face_game["sit_pos"] = config.get("sit_pos")
-        except (FileNotFoundError, json.JSONDecodeError):
-            pass
-
+        self.game = GuessFaceGame()
+        config = read_json_file(self.data_path("game_config.json"))
+        if config:
+            pos = config.get("saved_position")
+            if pos:
+                self.saved_position = Position(pos['x'], pos['y'], pos['z'], pos['facing'])
+            down_pos = config.get("down_position")
+            if down_pos:
+                self.down_position = Position(down_pos['x'], down_pos['y'], down_pos['z'], down_pos['facing'])
+            self.game.layout = GameLayout.from_config(config)
+
+    @event_handler
     async def on_start(self, session_metadata: SessionMetadata) -> None:
+        # The SDK hands us a fresh client on every (re)connect; send through the shared scheduler
+        if not isinstance(self.highrise, ScheduledHighrise):
+            self.highrise = ScheduledHighrise(self.highrise, self.outbox)
         self.my_user_id = session_metadata.user_id
-        # Dynamically get the room ID the bot is currently in from session_metadata
-        # Check if room_info exists and has room_id, otherwise fallback
-        self.room_id = os.getenv("HIGHRISE_ROOM_ID", "665339cebb0667c76e14c27d")
+        if not self.startup.finished:
+            self.startup.finish("connect", budget=STARTUP_BUDGET)
+        self.connected_since = time.time()
+        # RoomInfo has no room ID, so use the one we connected with; fall back to the environment
+        self.room_id = self.connect_room_id or os.getenv("HIGHRISE_ROOM_ID", "665339cebb0667c76e14c27d")
         if hasattr(session_metadata, "room_info") and session_metadata.room_info:
             # Try different possible attribute names for room ID
             self.room_id = getattr(session_metadata.room_info, "room_id", 
@@ -162,37 +2430,54 @@ class Mybot(BaseBot):
         self.current_room_id = self.room_id
         self.save_room_id()
             
-        print(f"Bot started! User ID: {self.my_user_id} in Room ID: {self.room_id}")
+        room_log.info("Bot started! User ID: %s in Room ID: %s", self.my_user_id, self.room_id)
         
         # Send welcome message about invite system
         await self.highrise.chat("🎮 Welcome to Guess Face Bot!\n💌 Want a room invite? Send me a private message!")
         
-        asyncio.create_task(self.save_data_periodically())
+        await self.sync_presence()
+        for u, pos in self.presence:
+            if u.id != self.my_user_id:
+                self.outfits.prefetch(u.id)
+        # on_start runs again on every reconnect; keep one copy of each loop
+        self.run_background("save", self.save_data_periodically)
+        self.run_background("presence", self.sync_presence_periodically)
+        self.run_background("warm_up", self.warm_up)
+        WATCHDOG.start()
+        self.resume_game()
+
+    def run_background(self, name, factory):
+        task = self.background.get(name)
+        if task is None or task.done():
+            self.background[name] = asyncio.create_task(factory())
+        return self.background[name]
+
+    async def sync_presence(self):
+        """Reconcile the presence index with the server in one get_room_users() call"""
+        try:
+            room_users_resp = await self.highrise.get_room_users()
+            if hasattr(room_users_resp, 'content'):
+                self.presence.sync(room_users_resp.content)  # type: ignore
+        except Exception as e:
+            room_log.warning("Presence sync error: %s", e)
+
+    async def sync_presence_periodically(self):
+        """Catch any join/leave/move events that were missed"""
+        while True:
+            await asyncio.sleep(60)
+            await self.sync_presence()
 
+    @event_handler
     async def on_user_join(self, user: User, position: Position | AnchorPosition) -> None:
+        self.presence.join(user, position)
+        self.resolver.remember(user.username, user.id)
+        self.outfits.prefetch(user.id)
         # Track user who joined the room for !invite command
-        self.users_messaged_bot.add(user.id)
-        self.save_users_messaged_bot()
-        print(f"👤 Added {user.username} (ID: {user.id}) to users_messaged_bot. Total: {len(self.users_messaged_bot)}")
+        self.remember_contact(user.id)
+        room_log.info("👤 Added %s (ID: %s) to users_messaged_bot", user.username, user.id,
+                      extra={"event": "join", "user_id": user.id})
         
-        if user.username not in self.balances:
-            self.balances[user.username] = 1000
-            self.save_balances()
-        if user.username not in self.credits:
-            self.credits[user.username] = 0
-            self.save_credits()
-        if user.username not in self.user_stats:
-            self.user_stats[user.username] = {
-                "games_played": 0,
-                "games_won": 0,
-                "games_lost": 0,
-                "total_wagered": 0,
-                "total_won": 0,
-                "biggest_win": 0,
-                "join_date": datetime.now().isoformat(),
-                "last_seen": datetime.now().isoformat()
-            }
-            self.save_user_stats()
+        self.players.ensure(user.username)
 
         try:
             await asyncio.sleep(1.0) # Small delay to ensure user is fully in the room
@@ -203,1164 +2488,853 @@ class Mybot(BaseBot):
                 "📋 Commands: type 'commands' or 'help' in private message"
             )
             await self.highrise.send_whisper(user.id, welcome_msg)
-            print(f"✅ Welcome message sent to {user.username}")
+            room_log.debug("✅ Welcome message sent to %s", user.username, extra={"event": "join"})
             
         except Exception as e:
             if "left the room" in str(e).lower():
-                print(f"ℹ️ User {user.username} left before welcome whisper could be sent.")
+                room_log.info("ℹ️ User %s left before welcome whisper could be sent.", user.username, extra={"event": "join"})
             else:
-                print(f"❌ Welcome whisper error for {user.username}: {e}")
+                room_log.warning("❌ Welcome whisper error for %s: %s", user.username, e)
 
+    @event_handler
     async def on_user_leave(self, user: User) -> None:
-        if user.username in self.user_stats:
-            self.user_stats[user.username]["last_seen"] = datetime.now().isoformat()
-            self.save_user_stats()
+        self.presence.leave(user)
+        self.players.touch(user.username)
 
         # Remove from game if active
-        if self.guess_face_game["active"] and user.username in self.guess_face_game["players"]:
-            self.guess_face_game["players"].remove(user.username)
+        if self.game.active and user.username in self.game.players:
+            self.game.players.discard(user.username)
+            self.game.notify()
             await self.highrise.chat(f"{user.username} left the game")
 
 
-    async def on_chat(self, user: User, message: str) -> None:  # type: ignore
-        username = user.username
+    @event_handler
+    async def on_user_move(self, user: User, destination: Position | AnchorPosition) -> None:
+        self.presence.move(user, destination)
+        await self.enforce_block_lock(user, destination)
+
+    def _build_commands(self) -> CommandRouter:
+        """Every chat/whisper/DM command, with who may run it and how its arguments are parsed"""
+        router = CommandRouter()
+        owner_only = "This command is for the owner only."
+        vip_only = "⛔ This command is for moderators/VIP only!"
+
+        # Room invites
+        router.add("!setroom", self.cmd_setroom, level=OWNER, denied="❌ Only owner can use this command!")
+        router.add("setroom", self.cmd_setroom, level=OWNER, denied="❌ Only owner can use this command!")
+        router.add("!invite", self.cmd_invite_all, level=OWNER, exact=True, denied="❌ Only owner can use this command!")
+        router.add("invite", self.cmd_invite_all, level=OWNER, exact=True, denied="❌ Only owner can use this command!")
+        for phrase, exact in (("!invite", False), ("invite", True)):
+            router.add(phrase, lambda user, args, conversation_id=None: self.send_invite_to_room(user, conversation_id),
+                       exact=exact, channels=("whisper", "dm"))
+
+        # Help and stats
+        for phrase, exact in (("!commands", False), ("commands", True)):
+            router.add(phrase, lambda user, args, conversation_id=None: self.handle_commands_command(user, conversation_id),
+                       exact=exact, channels=("whisper", "dm"))
+        for phrase, exact in (("!help", False), ("help", True)):
+            router.add(phrase, lambda user, args, conversation_id=None: self.handle_help_command(user, conversation_id),
+                       exact=exact, channels=("dm",))
+        router.add("!stats", lambda user, args, conversation_id=None: self.handle_stats_command(user, conversation_id),
+                   channels=("chat", "dm"))
+        router.add("stats", lambda user, args, conversation_id=None: self.handle_stats_command(user, conversation_id),
+                   exact=True, channels=("dm",))
+        router.add("!rank", self.cmd_rank)
+        router.add("!ranklist", lambda user, args: self.handle_ranklist_command(user, args))
+
+        # Playing
+        for city in CITIES:
+            router.add(city, partial(self.cmd_city_vote, city))
+        router.add("!vote", self.cmd_vote)
+        router.add("!vote", lambda user, args: self.handle_vote_command(user, args.lower()), channels=("whisper",))
+        router.add("!join", self.cmd_join)
+        router.add("!leave", lambda user, args: self.handle_leave_command(user))
+        router.add("!hint", lambda user, args: self.handle_hint_command(user))
+
+        # Room setup (owner)
+        router.add("save", self.cmd_save, level=OWNER, exact=True, denied=owner_only)
+        router.add("go", self.cmd_go, level=OWNER, exact=True, denied=owner_only)
+        router.add("set row", self.cmd_set_row, level=OWNER, parse=int_args(None, 15),
+                   usage="Usage: set row [row number] [number of blocks]")
+        router.add("set chooser", partial(self.cmd_set_area, "chooser_pos", "Chooser", "✅"), level=OWNER,
+                   parse=int_args(5), usage="❌ Usage: set chooser [number of Blocks optional - default 5]")
+        danger_usage = "❌ Usage: set danger1 [blocks] or set danger2 [blocks] or set danger row [1/2] [blocks]"
+        router.add("set danger", self.cmd_set_danger, level=OWNER, parse=parse_danger_args, usage=danger_usage)
+        router.add("set danger1", self.cmd_set_danger, level=OWNER, parse=lambda args: [1] + int_args(5)(args), usage=danger_usage)
+        router.add("set danger2", self.cmd_set_danger, level=OWNER, parse=lambda args: [2] + int_args(5)(args), usage=danger_usage)
+        router.add("set spawn", partial(self.cmd_set_area, "spawn_pos", "Spawn", "✅"), level=OWNER,
+                   parse=int_args(5), usage="❌ Usage: set spawn [number of Blocks optional - default 5]")
+        router.add("set exit", partial(self.cmd_set_area, "exit_pos", "Exit", "✅"), level=OWNER,
+                   parse=int_args(5), usage="❌ Usage: set exit [number of Blocks optional - default 5]")
+        router.add("set chair", self.cmd_set_chair, level=OWNER, exact=True, denied=owner_only)
+        router.add("sit", self.cmd_sit, level=OWNER, exact=True, denied=owner_only)
+        router.add("rows", self.cmd_rows, level=OWNER, exact=True)
+        router.add("config", self.cmd_config, level=OWNER, exact=True)
+
+        # Room setup and moderation (VIP)
+        router.add("save down", self.cmd_save_down, level=VIP, exact=True, denied=vip_only)
+        router.add("down", self.cmd_down, level=VIP, exact=True, denied=vip_only)
+        router.add("set vip_spot", partial(self.cmd_set_area, "vip_pos", "VIP", "⭐"), level=VIP,
+                   parse=int_args(5), usage="❌ Usage: set vip_spot [optional blocks - default 5]",
+                   denied="⛔ This command is for VIP only!")
+        router.add("set host", partial(self.cmd_set_area, "host_pos", "Host", "👑"), level=VIP,
+                   parse=int_args(5), usage="❌ Usage: set host [optional blocks - default 5]", denied=vip_only)
+        router.add("!end", self.cmd_end, level=VIP, exact=True, denied="⛔ This command is for VIP/moderators only!")
+        router.add("!prizeon", self.cmd_prize_on, level=VIP, exact=True)
+        router.add("!prizeoff", self.cmd_prize_off, level=VIP, exact=True)
+        router.add("!prizeamount", self.cmd_prize_amount, level=VIP, parse=int_args(None),
+                   usage="❌ Please enter a valid number")
+        router.add("!prizeminimum", self.cmd_prize_minimum, level=VIP, parse=int_args(None),
+                   usage="❌ Usage: !prizeminimum [number]")
+        router.add("!reset", self.cmd_reset, level=VIP)
+        router.add("!vip", self.cmd_vip, level=VIP, exact=True, denied="⛔ You must be VIP to use this command!")
+        router.add("h", self.cmd_host, level=VIP, exact=True, denied="⛔ You must be VIP/Moderator to use this command!")
+
+        # Game control (owner)
+        router.add("eq", self.equip_user, level=OWNER, parse=lambda args: args.split()[0].replace("@", "") if args else "",
+                   denied=owner_only)
+        router.add("freeze", self.cmd_freeze, level=OWNER, parse=target_arg, denied=owner_only)
+        router.add("unfreeze", self.cmd_unfreeze, level=OWNER, parse=target_arg, denied=owner_only)
+        router.add("kick", self.cmd_kick, level=OWNER, parse=target_arg, denied=owner_only)
+        router.add("!change chooser", self.cmd_change_chooser, level=OWNER, denied=owner_only)
+        router.add("put", self.cmd_put, level=OWNER, denied=owner_only)
+        router.add("pull", self.cmd_pull, level=OWNER, parse=target_arg, denied=owner_only)
+        router.add("allow", self.cmd_allow, level=OWNER, parse=target_arg, denied=owner_only)
+        router.add("disallow", self.cmd_disallow, level=OWNER, parse=target_arg, denied=owner_only)
+        router.add("!add_vip", self.cmd_add_vip, level=OWNER, parse=target_arg, denied="⛔ " + owner_only)
+        router.add("!remove_vip", self.cmd_remove_vip, level=OWNER, parse=target_arg, denied="⛔ " + owner_only)
+        router.add("!vip_list", self.cmd_vip_list, level=OWNER, exact=True, denied="⛔ " + owner_only)
+        return router
+
+    async def run_command(self, user: User, message: str, channel: str, conversation_id: str | None = None) -> bool:
+        """Run the command a message names on this channel; False if it isn't one"""
+        found = self.commands.match(message, channel)
+        if not found:
+            return False
+        command, args = found
 
-        if username not in self.balances:
-            self.balances[username] = 1000
-            self.save_balances()
-        if username not in self.credits:
-            self.credits[username] = 0
-            self.save_credits()
+        if (command.level == OWNER and not await self.is_owner(user)) or (command.level == VIP and not await self.is_vip(user)):
+            if command.denied:
+                await self.highrise.send_whisper(user.id, command.denied)
+            return True
 
-        msg = message.lower().strip()
-        
-        # Set room command - update the room ID for invites
-        if msg.startswith("!setroom") or msg.startswith("setroom"):
-            if not await self.is_owner(user):
-                await self.highrise.chat("❌ Only owner can use this command!")
-                return
-            
-            parts = msg.split()
-            if len(parts) < 2:
-                await self.highrise.send_whisper(user.id, f"📍 Current room ID: {self.current_room_id}\n💡 Usage: !setroom <room_id>")
-                return
-            
-            new_room_id = parts[1]
-            self.current_room_id = new_room_id
-            self.save_room_id()
-            await self.highrise.send_whisper(user.id, f"✅ Room updated! New invites will be sent to: {new_room_id}")
-            return
-        
-        # Invite command - send room invites to all users who messaged the bot
-        if msg == "!invite" or msg == "invite":
-            if not await self.is_owner(user):
-                await self.highrise.chat("❌ Only owner can use this command!")
-                return
-            
-            if not self.users_messaged_bot:
-                await self.highrise.chat("📭 No users have messaged the bot yet.")
-                return
-            
-            sent_count = 0
-            fail_count = 0
-            
-            await self.highrise.chat(f"📢 Starting to send invites to {len(self.users_messaged_bot)} users...")
-            
-            for user_id in list(self.users_messaged_bot):
-                try:
-                    # Try to send invite to each user
-                    dummy_user = User(id=user_id, username="User")  # type: ignore
-                    conv_id = self.user_conversations.get(user_id)
-                    
-                    # We MUST have a conversation ID to send a message/invite
-                    if not conv_id:
-                        fail_count += 1
-                        continue
-                        
-                    await self.send_invite_to_room(dummy_user, conv_id)
-                    sent_count += 1
-                    # Small delay to prevent rate limiting if many users
-                    if sent_count % 5 == 0:
-                        await asyncio.sleep(0.5)
-                except Exception as e:
-                    print(f"Error sending invite to {user_id}: {e}")
-                    fail_count += 1
-            
-            result_msg = f"📬 Sent {sent_count} invites!"
-            if fail_count > 0:
-                result_msg += f" ({fail_count} failed - users need to DM bot first)"
-            
-            await self.highrise.chat(result_msg)
-            return
-        
-        # Check if message is a city name (vote in public chat)
-        allowed_words = ["berlin", "reykjavik", "new york", "london", "moscow", "paris"]
-        if msg in allowed_words and self.guess_face_game.get("phase") in ["voting", "discussion"]:
-            # Player is voting via public chat
-            await self.handle_vote_command(user, msg)
-            return
-
-        if msg == "save":
-            if not await self.is_owner(user):
-                await self.highrise.send_whisper(user.id, "This command is for the owner only.")
-                return
-            room_users = (await self.highrise.get_room_users()).content  # type: ignore
-            for u, pos in room_users:
-                if u.id == user.id:
-                    self.saved_position = pos
-                    self.save_game_config()
-                    await self.highrise.chat("Position saved successfully!")
-                    return
-            await self.highrise.chat("Could not find your position.")
-            return
+        if command.parse:
+            try:
+                args = command.parse(args)
+            except (ValueError, IndexError):
+                if command.usage:
+                    await self.highrise.chat(command.usage)
+                return True
 
-        if msg == "go":
-            if not await self.is_owner(user):
-                await self.highrise.send_whisper(user.id, "This command is for the owner only.")
-                return
-            if self.saved_position:
-                await self.highrise.walk_to(self.saved_position)
-                await self.highrise.chat("Going to saved position...")
+        started = time.perf_counter()
+        try:
+            if conversation_id is None:
+                await command.handler(user, args)
             else:
-                await self.highrise.chat("No saved position found.")
+                await command.handler(user, args, conversation_id)
+        except Exception:
+            METRICS.inc("bot_errors_total", where="command", name=command.phrase)
+            raise
+        finally:
+            METRICS.observe("bot_command_seconds", time.perf_counter() - started, command=command.phrase)
+        return True
+
+    @event_handler
+    async def on_chat(self, user: User, message: str) -> None:  # type: ignore
+        self.players.ensure(user.username)
+        self.resolver.remember(user.username, user.id)
+        await self.run_command(user, message, "chat")
+
+    async def cmd_setroom(self, user: User, args: str):
+        """Update the room ID for invites"""
+        if not args:
+            await self.highrise.send_whisper(user.id, f"📍 Current room ID: {self.current_room_id}\n💡 Usage: !setroom <room_id>")
             return
 
-        if msg == "save down":
-            if not await self.is_vip(user):
-                await self.highrise.send_whisper(user.id, "⛔ This command is for moderators/VIP only!")
-                return
-            room_users = (await self.highrise.get_room_users()).content  # type: ignore
-            for u, pos in room_users:
-                if u.id == user.id:
-                    self.down_position = pos
-                    self.save_game_config()
-                    await self.highrise.chat(f"✅ {username} saved the down position!")
-                    return
-            await self.highrise.chat("Could not find your position.")
-            return
+        new_room_id = args.split()[0]
+        self.current_room_id = new_room_id
+        self.save_room_id()
+        await self.highrise.send_whisper(user.id, f"✅ Room updated! New invites will be sent to: {new_room_id}")
 
-        if msg == "down":
-            if not await self.is_vip(user):
-                await self.highrise.send_whisper(user.id, "⛔ This command is for moderators/VIP only!")
-                return
-            if self.down_position:
-                try:
-                    room_users_resp = await self.highrise.get_room_users()
-                    room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                    for u, pos in room_users:
-                        if u.id == user.id:
-                            await self.highrise.teleport(u.id, self.down_position)  # type: ignore
-                            await self.highrise.chat(f"⬇️ {username} went down!")
-                            return
-                except Exception as e:
-                    await self.highrise.send_whisper(user.id, f"Error teleporting: {str(e)}")
-            else:
-                await self.highrise.chat("No down position saved. Use 'save down' first.")
+    async def cmd_invite_all(self, user: User, args: str):
+        """Send room invites to all users who messaged the bot"""
+        if not self.users_messaged_bot:
+            await self.highrise.chat("📭 No users have messaged the bot yet.")
             return
-
-        if msg.startswith("set row"):
-            if not await self.is_owner(user):
-                return
-            try:
-                parts = msg.split(" ")
-                if len(parts) < 3:
-                    await self.highrise.chat("Usage: set row [row number] [number of blocks]")
-                    return
-                
-                row_num = int(parts[2])
-                num_blocks = int(parts[3]) if len(parts) > 3 else 15
-                
-                if row_num < 1:
-                    await self.highrise.chat("❌ Row number must be 1 or greater")
-                    return
-                
-                room_users = (await self.highrise.get_room_users()).content  # type: ignore
-                found = False
-                for u, pos in room_users:
-                    if u.id == user.id:
-                        found = True
-                        if "rows" not in self.guess_face_game: self.guess_face_game["rows"] = {}
-                        row_key = str(row_num - 1)
-                        blocks = []
-                        for i in range(num_blocks):
-                            blocks.append({"x": pos.x + (i * 2.0), "y": pos.y, "z": pos.z, "facing": pos.facing})  # type: ignore
-                        
-                        self.guess_face_game["rows"][row_key] = {"blocks": blocks, "num_blocks": num_blocks}
-                        self.save_game_config()
-                        await self.highrise.chat(f"✅ Row saved {row_num} successfully!")
-                        return
-                
-                if not found:
-                    await self.highrise.chat("❌ Could not find your position.")
-            except:
-                await self.highrise.chat("❌ Input error.")
+        if self.invite_campaign and not self.invite_campaign.done():
+            await self.highrise.chat("📨 An invite campaign is already running.")
             return
 
-        if msg.startswith("set chooser"):
-            if not await self.is_owner(user):
-                return
-            try:
-                parts = msg.split(" ")
-                num_blocks = int(parts[2]) if len(parts) > 2 else 5
-                room_users_resp = await self.highrise.get_room_users()
-                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                for u, pos in room_users:
-                    if u.id == user.id:
-                        blocks = []
-                        block_spacing = 2.0
-                        for i in range(num_blocks):
-                            blocks.append({
-                                "x": pos.x + (i * block_spacing),  # type: ignore
-                                "y": pos.y,  # type: ignore
-                                "z": pos.z,  # type: ignore
-                                "facing": pos.facing  # type: ignore
-                            })
-                        self.guess_face_game["chooser_pos"] = {"blocks": blocks, "num_blocks": num_blocks}
-                        self.save_game_config()
-                        await self.highrise.chat(f"✅ Chooser area saved! ({num_blocks} blocks)")
-                        await self.highrise.send_whisper(user.id, f"📍 Chooser area saved at:\nX: {pos.x:.1f}\nBlocks: {num_blocks}")  # type: ignore
-                        return
-            except (ValueError, IndexError):
-                await self.highrise.chat("❌ Usage: set chooser [number of Blocks optional - default 5]")
+        room_id = self.current_room_id or self.room_id
+        targets, skipped = self.invite_targets(room_id)
+        if not targets:
+            await self.highrise.chat(f"📭 All {skipped} users were already invited to this room.")
             return
 
-        if msg.startswith("set danger"):
-            if not await self.is_owner(user):
-                return
-            try:
-                parts = msg.split(" ")
-                
-                # Support multiple formats:
-                # "set danger1 [blocks]" - row 1
-                # "set danger2 [blocks]" - row 2
-                # "set danger row 1 [blocks]" - row 1
-                # "set danger row 2 [blocks]" - row 2
-                # "set danger [blocks]" - defaults to row 1
-                
-                row_num = 1
-                num_blocks = 5
-                
-                if msg.startswith("set danger1"):
-                    row_num = 1
-                    num_blocks = int(parts[2]) if len(parts) > 2 else 5
-                elif msg.startswith("set danger2"):
-                    row_num = 2
-                    num_blocks = int(parts[2]) if len(parts) > 2 else 5
-                elif len(parts) >= 3 and parts[2] == "row":
-                    # "set danger row 1 [blocks]" format
-                    row_num = int(parts[3])
-                    num_blocks = int(parts[4]) if len(parts) > 4 else 5
-                else:
-                    # "set danger [blocks]" format - defaults to row 1
-                    num_blocks = int(parts[1]) if len(parts) > 1 else 5
-                
-                room_users_resp = await self.highrise.get_room_users()
-                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                for u, pos in room_users:
-                    if u.id == user.id:
-                        blocks = []
-                        block_spacing = 2.0
-                        for i in range(num_blocks):
-                            blocks.append({
-                                "x": pos.x + (i * block_spacing),  # type: ignore
-                                "y": pos.y,  # type: ignore
-                                "z": pos.z,  # type: ignore
-                                "facing": pos.facing  # type: ignore
-                            })
-                        
-                        # Initialize danger_pos as rows if it doesn't exist
-                        if "danger_pos" not in self.guess_face_game:
-                            self.guess_face_game["danger_pos"] = {"rows": {}}
-                        
-                        # Save to the specified row
-                        if "rows" not in self.guess_face_game["danger_pos"]:
-                            self.guess_face_game["danger_pos"]["rows"] = {}
-                        
-                        self.guess_face_game["danger_pos"]["rows"][str(row_num)] = {
-                            "blocks": blocks,
-                            "num_blocks": num_blocks
-                        }
-                        
-                        self.save_game_config()
-                        await self.highrise.chat(f"✅ Danger zone saved for row #{row_num}! ({num_blocks} blocks)")
-                        await self.highrise.send_whisper(user.id, f"📍 Danger zone saved for row {row_num} at:\nX: {pos.x:.1f}\nBlocks: {num_blocks}")  # type: ignore
-                        return
-            except (ValueError, IndexError):
-                await self.highrise.chat("❌ Usage: set danger1 [blocks] or set danger2 [blocks] or set danger row [1/2] [blocks]")
+        await self.highrise.chat(f"📢 Starting to send invites to {len(targets)} users..."
+                                 + (f" ({skipped} already invited)" if skipped else ""))
+        self.invite_campaign = asyncio.create_task(self.run_invite_campaign(room_id, targets))
+
+    def invite_targets(self, room_id):
+        """Users still owed an invite to room_id, marked pending so an interrupted run can resume, and the number skipped"""
+        targets = []
+        skipped = 0
+        for user_id in list(self.users_messaged_bot):
+            record = self.invited_users.get(user_id)
+            if record and record.get("room") == room_id and record.get("status") == "sent":
+                skipped += 1
+                continue
+            targets.append(user_id)
+            self.set_invite_state(user_id, room_id, "pending")
+        return targets, skipped
+
+    def set_invite_state(self, user_id, room_id, status):
+        record = {"room": room_id, "status": status, "at": time.time()}
+        self.invited_users[user_id] = record
+        self.journal.set(self.data_path("invited_users.json"), user_id, record)
+
+    def resume_invite_campaign(self):
+        """Pick up invites left pending when the bot last stopped"""
+        if self.invite_campaign and not self.invite_campaign.done():
             return
-
-        if msg.startswith("set spawn"):
-            if not await self.is_owner(user):
-                return
-            try:
-                parts = msg.split(" ")
-                num_blocks = int(parts[2]) if len(parts) > 2 else 5
-                room_users_resp = await self.highrise.get_room_users()
-                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                for u, pos in room_users:
-                    if u.id == user.id:
-                        blocks = []
-                        block_spacing = 2.0
-                        for i in range(num_blocks):
-                            blocks.append({
-                                "x": pos.x + (i * block_spacing),  # type: ignore
-                                "y": pos.y,  # type: ignore
-                                "z": pos.z,  # type: ignore
-                                "facing": pos.facing  # type: ignore
-                            })
-                        self.guess_face_game["spawn_pos"] = {"blocks": blocks, "num_blocks": num_blocks}
-                        self.save_game_config()
-                        await self.highrise.chat(f"✅ Spawn area saved! ({num_blocks} blocks)")
-                        await self.highrise.send_whisper(user.id, f"📍 Spawn area saved at:\nX: {pos.x:.1f}\nBlocks: {num_blocks}")  # type: ignore
-                        return
-            except (ValueError, IndexError):
-                await self.highrise.chat("❌ Usage: set spawn [number of Blocks optional - default 5]")
+        by_room = {}
+        for user_id, record in self.invited_users.items():
+            if record.get("status") == "pending":
+                by_room.setdefault(record.get("room"), []).append(user_id)
+        if not by_room:
             return
-
-        if msg.startswith("set exit"):
-            if not await self.is_owner(user):
+        room_id, targets = max(by_room.items(), key=lambda item: len(item[1]))
+        invite_log.info("📨 Resuming invite campaign: %d pending invites to %s", len(targets), room_id)
+        self.invite_campaign = asyncio.create_task(self.run_invite_campaign(room_id, targets))
+
+    async def run_invite_campaign(self, room_id, targets, concurrency: int = INVITE_CONCURRENCY):
+        """Send invites concurrently, recording each delivery so a restart resumes where it stopped"""
+        limit = asyncio.Semaphore(concurrency)
+        counts = {"sent": 0, "failed": 0, "no_conversation": 0}
+        started = time.monotonic()
+
+        async def invite(user_id):
+            # We MUST have a conversation ID to send a message/invite
+            conv_id = self.user_conversations.get(user_id)
+            if not conv_id:
+                counts["no_conversation"] += 1
+                self.set_invite_state(user_id, room_id, "failed")
                 return
-            try:
-                parts = msg.split(" ")
-                num_blocks = int(parts[2]) if len(parts) > 2 else 5
-                room_users_resp = await self.highrise.get_room_users()
-                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                for u, pos in room_users:
-                    if u.id == user.id:
-                        blocks = []
-                        block_spacing = 2.0
-                        for i in range(num_blocks):
-                            blocks.append({
-                                "x": pos.x + (i * block_spacing),  # type: ignore
-                                "y": pos.y,  # type: ignore
-                                "z": pos.z,  # type: ignore
-                                "facing": pos.facing  # type: ignore
-                            })
-                        self.guess_face_game["exit_pos"] = {"blocks": blocks, "num_blocks": num_blocks}
-                        self.save_game_config()
-                        await self.highrise.chat(f"✅ Exit area saved! ({num_blocks} blocks)")
-                        await self.highrise.send_whisper(user.id, f"📍 Exit area saved at:\nX: {pos.x:.1f}\nBlocks: {num_blocks}")  # type: ignore
-                        return
-            except (ValueError, IndexError):
-                await self.highrise.chat("❌ Usage: set exit [number of Blocks optional - default 5]")
-            return
+            async with limit:
+                dummy_user = User(id=user_id, username="User")  # type: ignore
+                delivered = await self.send_invite_to_room(dummy_user, conv_id, room_id)
+            status = "sent" if delivered else "failed"
+            counts[status] += 1
+            self.set_invite_state(user_id, room_id, status)
+
+        await asyncio.gather(*(invite(user_id) for user_id in targets))
+
+        elapsed = time.monotonic() - started
+        rate = counts["sent"] / elapsed if elapsed > 0 else 0.0
+        invite_log.info("📬 Invite campaign to %s: %d sent, %d failed, %d without conversation in %.1fs (%.1f/s)",
+                        room_id, counts["sent"], counts["failed"], counts["no_conversation"], elapsed, rate,
+                        extra={"room": room_id, **counts})
+
+        result_msg = f"📬 Sent {counts['sent']} invites in {elapsed:.0f}s ({rate:.1f}/s)!"
+        if counts["failed"]:
+            result_msg += f" ({counts['failed']} failed)"
+        if counts["no_conversation"]:
+            result_msg += f" ({counts['no_conversation']} failed - users need to DM bot first)"
+        try:
+            await self.highrise.chat(result_msg)
+        except Exception as e:
+            invite_log.warning("Error reporting invite campaign: %s", e)
 
-        if msg.startswith("set vip_spot"):
-            if not await self.is_vip(user):
-                await self.highrise.send_whisper(user.id, "⛔ This command is for VIP only!")
-                return
-            try:
-                parts = msg.split(" ")
-                num_blocks = int(parts[2]) if len(parts) > 2 else 5
-                room_users_resp = await self.highrise.get_room_users()
-                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                for u, pos in room_users:
-                    if u.id == user.id:
-                        blocks = []
-                        block_spacing = 2.0
-                        for i in range(num_blocks):
-                            blocks.append({
-                                "x": pos.x + (i * block_spacing),  # type: ignore
-                                "y": pos.y,  # type: ignore
-                                "z": pos.z,  # type: ignore
-                                "facing": pos.facing  # type: ignore
-                            })
-                        self.guess_face_game["vip_pos"] = {"blocks": blocks, "num_blocks": num_blocks}
-                        self.save_game_config()
-                        await self.highrise.chat(f"⭐ VIP area saved! ({num_blocks} blocks)")
-                        await self.highrise.send_whisper(user.id, f"📍 VIP area saved at:\nX: {pos.x:.1f}\nBlocks: {num_blocks}")  # type: ignore
-                        return
-            except (ValueError, IndexError):
-                await self.highrise.chat("❌ Usage: set vip_spot [optional blocks - default 5]")
+    async def cmd_city_vote(self, city: str, user: User, args: str):
+        """A city name said in public chat is a vote"""
+        phase = self.game.phase
+        if not args and phase in ["voting", "discussion"]:
+            await self.handle_vote_command(user, city)
             return
 
-        if msg.startswith("set host"):
-            if not await self.is_vip(user):
-                await self.highrise.send_whisper(user.id, "⛔ This command is for moderators/VIP only!")
-                return
-            try:
-                parts = msg.split(" ")
-                num_blocks = int(parts[2]) if len(parts) > 2 else 5
-                room_users_resp = await self.highrise.get_room_users()
-                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                for u, pos in room_users:
-                    if u.id == user.id:
-                        blocks = []
-                        block_spacing = 2.0
-                        for i in range(num_blocks):
-                            blocks.append({
-                                "x": pos.x + (i * block_spacing),  # type: ignore
-                                "y": pos.y,  # type: ignore
-                                "z": pos.z,  # type: ignore
-                                "facing": pos.facing  # type: ignore
-                            })
-                        self.guess_face_game["host_pos"] = {"blocks": blocks, "num_blocks": num_blocks}
-                        self.save_game_config()
-                        await self.highrise.chat(f"👑 Host area saved! ({num_blocks} blocks)")
-                        await self.highrise.send_whisper(user.id, f"📍 Host area saved at:\nX: {pos.x:.1f}\nBlocks: {num_blocks}")  # type: ignore
-                        return
-            except (ValueError, IndexError):
-                await self.highrise.chat("❌ Usage: set host [optional blocks - default 5]")
-            return
+        # "<city> ..." only counts from players while voting
+        if user.username in self.game.players and phase == "voting":
+            self.game.record_vote(user.username, city)
+            await self.highrise.send_whisper(user.id, f"✅ Your vote for {city.upper()} has been recorded!")
 
-        if msg == "rows":
-            if not await self.is_owner(user):
-                return
-            rows = self.guess_face_game.get("rows", {})
-            if not rows:
-                await self.highrise.chat("No rows saved! Use 'set row [number] [Blocks]' to save them.")
-                return
-            
-            # Send rows in small chunks to avoid "Message too long" error
-            await self.highrise.send_whisper(user.id, "📊 Saved rows:")
-            await asyncio.sleep(0.5)
-            rows_list = sorted(rows.keys(), key=lambda x: int(x) if isinstance(x, int) or x.isdigit() else 0)
-            
-            for row_id in rows_list:
-                r = rows[row_id]
-                row_num = int(row_id) + 1
-                
-                if "blocks" in r:
-                    num_blocks = r.get("num_blocks", len(r["blocks"]))
-                    first_block = r["blocks"][0]
-                    msg_text = f"Row {row_num}: {num_blocks} blocks starting at X={first_block['x']:.1f} Z={first_block['z']:.1f}"
-                else:
-                    msg_text = f"Row {row_num}: X={r.get('x', 0):.1f} Y={r.get('y', 0):.1f} Z={r.get('z', 0):.1f}"
-                
-                try:
-                    await self.highrise.send_whisper(user.id, msg_text)
-                    await asyncio.sleep(0.2)
-                except:
-                    pass
+    async def cmd_vote(self, user: User, args: str):
+        username = user.username
+        if username not in self.game.players:
+            return
+        if self.game.phase != "voting":
+            await self.highrise.send_whisper(user.id, "❌ Voting is not available right now!")
             return
 
-        if msg == "config":
-            if not await self.is_owner(user):
-                return
-            config_info = """⚙️ Current game settings:
-
-📊 Rows: {'✅ Setup' if self.guess_face_game.get('rows') else '❌ Not configured'}
-📍 Chooser area: {'✅ Setup' if self.guess_face_game.get('chooser_pos') else '❌ Not configured'}
-⚡ Danger zone: {'✅ Setup' if self.guess_face_game.get('danger_pos') else '❌ Not configured'}
-🚪 Spawn/Entry: {'✅ Setup' if self.guess_face_game.get('spawn_pos') else '❌ Not configured'}
-🚪 Exit area: {'✅ Setup' if self.guess_face_game.get('exit_pos') else '❌ Not configured'}
+        vote = args.lower()
+        if vote in CITIES:
+            self.game.record_vote(username, vote)
+            await self.highrise.send_whisper(user.id, f"✅ Your vote for {vote.upper()} has been recorded!")
+        else:
+            await self.highrise.chat(f"❌ Invalid city! Choose from: {', '.join(CITIES)}")
 
-Setup commands (owner only):
-• set row [number] [blocks] - save row
-• rows - display all saved rows
-• set chooser [blocks] - set chooser area
-• set danger [blocks] - set danger zone
-• set spawn [blocks] - set spawn location
-• set exit [blocks] - set exit location
-• set chair - set bot sitting position
-• sit - make bot sit
-• !end - end the game
-• kick @username - kick a player from the game
-• !change chooser @username - change the chooser"""
-            await self.highrise.send_whisper(user.id, config_info)
+    async def cmd_join(self, user: User, args: str):
+        # Check if game is in a phase where joining is allowed
+        if self.game.active and self.game.phase not in ["waiting", None]:
+            await self.highrise.chat(f"{user.username} ❌ Cannot join now - a round is in progress!")
             return
-
-        if msg == "!end":
-            if not await self.is_vip(user):
-                await self.highrise.send_whisper(user.id, "⛔ This command is for VIP/moderators only!")
-                return
-            
-            spawn_pos = self.guess_face_game.get("spawn_pos")
-            if not spawn_pos:
-                await self.highrise.send_whisper(user.id, "❌ Spawn position not set! Please use 'set spawn' command first.")
-                return
-            
-            try:
-                # Reset game state
-                self.guess_face_game["active"] = False
-                self.guess_face_game["players"] = []
-                self.guess_face_game["phase"] = None
-                self.guess_face_game["game_ending"] = False
-                self.guess_face_game["chosen_player"] = None
-                self.guess_face_game["secret_word"] = None
-                self.guess_face_game["excluded_players"] = set()
-                self.guess_face_game["frozen_players"] = set()
-                
-                # Teleport all players in the room to spawn
-                room_users_resp = await self.highrise.get_room_users()
-                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                
-                teleport_pos = spawn_pos
-                if "blocks" in spawn_pos and spawn_pos["blocks"]:
-                    teleport_pos = spawn_pos["blocks"][0]
-                
-                await self.highrise.chat("🏁 Game ended! Moving all players to spawn...")
-                
-                for u, pos in room_users:
-                    # Skip the bot itself
-                    if u.id == self.my_user_id:
-                        continue
-                    await self.highrise.teleport(u.id, Position(teleport_pos['x'], teleport_pos['y'], teleport_pos['z'], teleport_pos['facing']))  # type: ignore
-                    await asyncio.sleep(0.1) # Avoid rate limits
-                
-                return
-            except Exception as e:
-                await self.highrise.send_whisper(user.id, f"❌ Error ending game: {str(e)}")
+        await self.handle_join_command(user)
+
+    async def cmd_rank(self, user: User, args: str):
+        await self.highrise.send_whisper(user.id, f"Balance: {await self.players.get_credits(user.username)}g")
+
+    async def cmd_save(self, user: User, args: str):
+        entry = self.presence.find_by_id(user.id)
+        if entry:
+            u, pos = entry
+            self.saved_position = pos
+            self.save_game_config()
+            await self.highrise.chat("Position saved successfully!")
             return
+        await self.highrise.chat("Could not find your position.")
 
-        if msg == "set chair":
-            if not await self.is_owner(user):
-                await self.highrise.send_whisper(user.id, "This command is for the owner only.")
-                return
-            try:
-                room_users_resp = await self.highrise.get_room_users()
-                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                for u, pos in room_users:
-                    if u.id == user.id:
-                        # Try to save position with available attributes
-                        try:
-                            # Try Position type first (x, y, z attributes)
-                            if hasattr(pos, 'x') and hasattr(pos, 'y') and hasattr(pos, 'z'):
-                                self.guess_face_game["sit_pos"] = {
-                                    "x": pos.x,  # type: ignore
-                                    "y": pos.y,  # type: ignore
-                                    "z": pos.z,  # type: ignore
-                                    "facing": getattr(pos, 'facing', 'ForwardDown'),
-                                    "type": "position"
-                                }
-                                self.save_game_config()
-                                await self.highrise.chat(f"✅ Chair position saved! ({username} is now the chair)")
-                                await self.highrise.send_whisper(user.id, "📍 Your chair position saved!\nType 'sit' to make me sit here")
-                                return
-                            # Try AnchorPosition type (entity_id and anchor_ix)
-                            elif hasattr(pos, 'entity_id') and hasattr(pos, 'anchor_ix'):
-                                self.guess_face_game["sit_pos"] = {
-                                    "entity_id": str(pos.entity_id),  # type: ignore
-                                    "anchor_ix": int(pos.anchor_ix),  # type: ignore
-                                    "type": "anchor"
-                                }
-                                self.save_game_config()
-                                await self.highrise.chat(f"✅ Chair position saved! ({username} is now the chair)")
-                                await self.highrise.send_whisper(user.id, "📍 Your chair position saved!\nType 'sit' to make me sit here")
-                                return
-                            else:
-                                # Debug: show what attributes the position has
-                                attrs = dir(pos)
-                                await self.highrise.chat("❌ Could not identify position type. Try standing somewhere else!")
-                                return
-                        except Exception as e:
-                            await self.highrise.chat(f"❌ Error with position: {str(e)}")
-                            return
-            except Exception as e:
-                await self.highrise.chat(f"❌ Error saving chair position: {str(e)}")
+    async def cmd_go(self, user: User, args: str):
+        if self.saved_position:
+            await self.highrise.walk_to(self.saved_position)
+            await self.highrise.chat("Going to saved position...")
+        else:
+            await self.highrise.chat("No saved position found.")
+
+    async def cmd_save_down(self, user: User, args: str):
+        entry = self.presence.find_by_id(user.id)
+        if entry:
+            u, pos = entry
+            self.down_position = pos
+            self.save_game_config()
+            await self.highrise.chat(f"✅ {user.username} saved the down position!")
             return
-        
-        if msg == "sit":
-            if not await self.is_owner(user):
-                await self.highrise.send_whisper(user.id, "This command is for the owner only.")
-                return
-            
-            sit_pos = self.guess_face_game.get("sit_pos")
-            if not sit_pos:
-                await self.highrise.chat("❌ Chair position not set! Use 'set chair' first.")
-                return
-            
+        await self.highrise.chat("Could not find your position.")
+
+    async def cmd_down(self, user: User, args: str):
+        if self.down_position:
             try:
-                # Handle both Position and AnchorPosition
-                if sit_pos.get("type") == "anchor":
-                    # Walk to anchor position
-                    anchor_pos = AnchorPosition(sit_pos["entity_id"], sit_pos["anchor_ix"])
-                    await self.highrise.walk_to(anchor_pos)
-                else:
-                    # Walk to normal position
-                    await self.highrise.walk_to(Position(sit_pos['x'], sit_pos['y'], sit_pos['z'], sit_pos['facing']))
-                
-                await asyncio.sleep(1.0)
-                # Ensure bot is sitting and not playing a dance emote
-                # We can use "idle-loop-sitfloor" or similar if the goal is to sit on floor
-                # If sitting on a chair, the walk_to(anchor_pos) usually handles the sitting state
-                if sit_pos.get("type") != "anchor":
-                    await self.highrise.send_emote("idle-loop-sitfloor")
-                
-                await self.highrise.chat("Done sitting successfully! 🪑")
+                entry = self.presence.find_by_id(user.id)
+                if entry:
+                    u, pos = entry
+                    await self.highrise.teleport(u.id, self.down_position)  # type: ignore
+                    await self.highrise.chat(f"⬇️ {user.username} went down!")
             except Exception as e:
-                await self.highrise.chat(f"❌ error: {str(e)}")
+                await self.highrise.send_whisper(user.id, f"Error teleporting: {str(e)}")
+        else:
+            await self.highrise.chat("No down position saved. Use 'save down' first.")
+
+    def _area_blocks(self, pos, num_blocks: int) -> list:
+        """num_blocks positions 2m apart along X, starting where the user stands"""
+        block_spacing = 2.0
+        return [{
+            "x": pos.x + (i * block_spacing),  # type: ignore
+            "y": pos.y,  # type: ignore
+            "z": pos.z,  # type: ignore
+            "facing": pos.facing  # type: ignore
+        } for i in range(num_blocks)]
+
+    async def cmd_set_row(self, user: User, args: list):
+        row_num, num_blocks = args
+        if row_num < 1:
+            await self.highrise.chat("❌ Row number must be 1 or greater")
             return
 
-        if msg == "!prizeon":
-            if not await self.is_vip(user):
-                return
-            self.guess_face_game["prize_active"] = True
-            await self.highrise.chat("✅ Prize system enabled! (Requires minimum players to start)")
+        entry = self.presence.find_by_id(user.id)
+        if not entry:
+            await self.highrise.chat("❌ Could not find your position.")
             return
-
-        if msg == "!prizeoff":
-            if not await self.is_vip(user):
-                return
-            self.guess_face_game["prize_active"] = False
-            await self.highrise.chat("❌ Prize system disabled!")
+        u, pos = entry
+        row_key = str(row_num - 1)
+        rows = {**self.game.layout.rows, row_key: {"blocks": self._area_blocks(pos, num_blocks), "num_blocks": num_blocks}}
+        self.update_layout(rows=rows)
+        await self.highrise.chat(f"✅ Row saved {row_num} successfully!")
+
+    async def cmd_set_area(self, key: str, label: str, emoji: str, user: User, args: list):
+        """set chooser/spawn/exit/vip_spot/host: save an area of blocks starting where the user stands"""
+        num_blocks = args[0]
+        entry = self.presence.find_by_id(user.id)
+        if entry:
+            u, pos = entry
+            self.update_layout(**{key: {"blocks": self._area_blocks(pos, num_blocks), "num_blocks": num_blocks}})
+            await self.highrise.chat(f"{emoji} {label} area saved! ({num_blocks} blocks)")
+            await self.highrise.send_whisper(user.id, f"📍 {label} area saved at:\nX: {pos.x:.1f}\nBlocks: {num_blocks}")  # type: ignore
+
+    async def cmd_set_danger(self, user: User, args: list):
+        row_num, num_blocks = args
+        entry = self.presence.find_by_id(user.id)
+        if entry:
+            u, pos = entry
+            # Save to the specified row, keeping the other danger zone rows
+            danger_pos = dict(self.game.layout.danger_pos or {})
+            danger_pos["rows"] = {**danger_pos.get("rows", {}), str(row_num): {
+                "blocks": self._area_blocks(pos, num_blocks),
+                "num_blocks": num_blocks
+            }}
+            self.update_layout(danger_pos=danger_pos)
+            await self.highrise.chat(f"✅ Danger zone saved for row #{row_num}! ({num_blocks} blocks)")
+            await self.highrise.send_whisper(user.id, f"📍 Danger zone saved for row {row_num} at:\nX: {pos.x:.1f}\nBlocks: {num_blocks}")  # type: ignore
+
+    async def cmd_rows(self, user: User, args: str):
+        rows = self.game.layout.rows
+        if not rows:
+            await self.highrise.chat("No rows saved! Use 'set row [number] [Blocks]' to save them.")
             return
 
-        if msg.startswith("!prizeamount "):
-            if not await self.is_vip(user):
-                return
-            try:
-                amount = int(msg.split(" ")[1])
-                # Validate that the amount is a valid tip tier
-                valid_tiers = [1, 5, 10, 50, 100, 500, 1000]
-                if amount not in valid_tiers:
-                    await self.highrise.chat(f"❌ Invalid prize amount! Valid tiers are: {', '.join(map(str, valid_tiers))}")
-                    return
-                self.guess_face_game["prize_amount"] = amount
-                await self.highrise.chat(f"💰 Prize amount set to: {amount} gold")
-            except:
-                await self.highrise.chat("❌ Please enter a valid number")
-            return
+        # Send rows in small chunks to avoid "Message too long" error
+        await self.highrise.send_whisper(user.id, "📊 Saved rows:", lane="bulk")
+        rows_list = sorted(rows.keys(), key=_row_order)
 
-        if msg.startswith("!reset"):
-            if not await self.is_vip(user):
-                return
-            self.guess_face_game["min_players"] = 0
-            self.guess_face_game["prize_active"] = False
-            await self.highrise.chat("✅ Game settings reset! No minimum players, Prize system OFF.")
-            return
+        for row_id in rows_list:
+            r = rows[row_id]
+            row_num = int(row_id) + 1
+
+            if "blocks" in r:
+                num_blocks = r.get("num_blocks", len(r["blocks"]))
+                first_block = r["blocks"][0]
+                msg_text = f"Row {row_num}: {num_blocks} blocks starting at X={first_block['x']:.1f} Z={first_block['z']:.1f}"
+            else:
+                msg_text = f"Row {row_num}: X={r.get('x', 0):.1f} Y={r.get('y', 0):.1f} Z={r.get('z', 0):.1f}"
 
-        if msg.startswith("!prizeminimum "):
-            if not await self.is_vip(user):
-                return
             try:
-                parts = msg.split(" ")
-                if len(parts) < 2:
-                    await self.highrise.chat("❌ Usage: !prizeminimum [number]")
-                    return
-                min_p = int(parts[1])
-                self.guess_face_game["min_players"] = min_p
-                await self.highrise.chat(f"👥 Minimum players required: {min_p}")
+                await self.highrise.send_whisper(user.id, msg_text, lane="bulk")
             except:
-                await self.highrise.chat("❌ Please enter a valid number")
-            return
-
-        # Voting logic (now supports direct city name)
-        allowed_cities = ["berlin", "reykjavik", "new york", "london", "moscow", "paris"]
-        city_match = None
-        for city in allowed_cities:
-            if msg == city or msg.startswith(city + " "):
-                city_match = city
-                break
-        
-        if city_match:
-            # Check if user is in players list and it's voting phase
-            is_player = username in self.guess_face_game["players"]
-            is_voting_phase = self.guess_face_game.get("phase") == "voting"
-            
-            if is_player and is_voting_phase:
-                self.guess_face_game["votes"][username] = city_match
-                await self.highrise.send_whisper(user.id, f"✅ Your vote for {city_match.upper()} has been recorded!")
-                return
-            elif is_player and not is_voting_phase:
-                # Optional: inform player that it's not voting time yet
                 pass
-            # If not a player, we ignore the city name as a vote
-        
-        # Original !vote command (for backward compatibility or explicit use)
-        if msg.startswith("!vote "):
-            if username not in self.guess_face_game["players"]:
-                return
-            if self.guess_face_game.get("phase") != "voting":
-                await self.highrise.send_whisper(user.id, "❌ Voting is not available right now!")
-                return
-                
-            vote = msg[6:].strip().lower()
-            if vote in allowed_cities:
-                self.guess_face_game["votes"][username] = vote
-                await self.highrise.send_whisper(user.id, f"✅ Your vote for {vote.upper()} has been recorded!")
-            else:
-                await self.highrise.chat(f"❌ Invalid city! Choose from: {', '.join(allowed_cities)}")
-            return
-
-        if msg.startswith("!join"):
-            # Check if game is in a phase where joining is allowed
-            if self.guess_face_game["active"] and self.guess_face_game.get("phase") not in ["waiting", None]:
-                await self.highrise.chat(f"{username} ❌ Cannot join now - a round is in progress!")
-                return
-            
-            # Custom countdown logic for prize/minimum players
-            min_req = self.guess_face_game.get("min_players", 0)
-            
-            # Check if we should start countdown
-            players_count = len(self.guess_face_game["players"])
-            if not self.guess_face_game["active"] and not self.guess_face_game.get("starting"):
-                if (min_req == 0 and players_count + 1 >= 1) or (min_req > 0 and players_count + 1 >= min_req):
-                    await self.handle_join_command(user)
-                    return
-            
-            await self.handle_join_command(user)
-            return
-
-        elif msg.startswith("!leave"):
-            await self.handle_leave_command(user)
-
-        elif msg.startswith("!hint"):
-            await self.handle_hint_command(user)
-
-        elif msg.startswith("!vote "):
-            vote_word = msg[6:].strip().lower()
-            await self.handle_vote_command(user, vote_word)
-            return
 
-        elif msg.startswith("!stats"):
-            await self.handle_stats_command(user)
+    async def cmd_config(self, user: User, args: str):
+        config_info = f"""⚙️ Current game settings:
 
-        elif msg.startswith("!rank"):
-            await self.highrise.send_whisper(user.id, f"Balance: {self.credits[username]}g")
-
-        elif msg.startswith("!ranklist"):
-            await self.handle_ranklist_command(user)
-
-        elif msg.startswith("eq "):
-            if not await self.is_owner(user):
-                await self.highrise.send_whisper(user.id, "This command is for the owner only.")
-                return
-            await self.equip_user(user, message)
-
-        elif msg.startswith("freeze "):
-            if not await self.is_owner(user):
-                await self.highrise.send_whisper(user.id, "This command is for the owner only.")
-                return
-            target = msg.split(" ", 1)[1].replace("@", "").strip()
-            if target:
-                self.guess_face_game["frozen_players"].add(target)
-                await self.highrise.chat(f"❄️ {target} is now FROZEN (stays on block, no danger zone)")
-            return
-
-        elif msg.startswith("kick "):
-            if not await self.is_owner(user):
-                await self.highrise.send_whisper(user.id, "This command is for the owner only.")
-                return
-            target = msg.split(" ", 1)[1].replace("@", "").strip()
-            if target:
-                # Remove from game players list
-                if target in self.guess_face_game.get("players", []):
-                    self.guess_face_game["players"].remove(target)
-                
-                # Add to excluded list so they can't rejoin this game
-                self.guess_face_game["excluded_players"].add(target)
-                
-                # Teleport to exit if set
-                exit_pos = self.guess_face_game.get("exit_pos")
-                if exit_pos:
-                    room_users_resp = await self.highrise.get_room_users()
-                    room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                    for u, pos in room_users:
-                        if u.username.lower() == target.lower():
-                            t_pos = exit_pos
-                            if "blocks" in exit_pos and exit_pos["blocks"]:
-                                t_pos = exit_pos["blocks"][0]
-                            await self.highrise.teleport(u.id, Position(t_pos['x'], t_pos['y'], t_pos['z'], t_pos['facing']))  # type: ignore
-                            break
-                
-                await self.highrise.chat(f"👢 {target} has been kicked from the game!")
-                
-                # Check if game should end because only chooser or no players left
-                available_players = [p for p in self.guess_face_game["players"] 
-                                   if p not in self.guess_face_game.get("excluded_players", set())]
-                
-                # If only chooser left or no players left, end game
-                if len(available_players) <= 1:
-                    if len(available_players) == 0 or (len(available_players) == 1 and available_players[0] == self.guess_face_game.get("chosen_player")):
-                        await self.highrise.chat("🏁 No players left in the game. Ending...")
-                        # Reuse the logic from !end but safely
-                        self.guess_face_game["active"] = False
-                        self.guess_face_game["players"] = []
-                        self.guess_face_game["phase"] = None
-                        self.guess_face_game["game_ending"] = False
-                        self.guess_face_game["chosen_player"] = None
-                        self.guess_face_game["secret_word"] = None
-                        self.guess_face_game["excluded_players"] = set()
-            return
-
-        elif msg.startswith("unfreeze "):
-            if not await self.is_owner(user):
-                await self.highrise.send_whisper(user.id, "This command is for the owner only.")
-                return
-            target = msg.split(" ", 1)[1].replace("@", "").strip()
-            if target and target in self.guess_face_game["frozen_players"]:
-                self.guess_face_game["frozen_players"].remove(target)
-                await self.highrise.chat(f"🔥 {target} is now UNFROZEN (can go to danger zone)")
-            return
+📊 Rows: {'✅ Setup' if self.game.layout.rows else '❌ Not configured'}
+📍 Chooser area: {'✅ Setup' if self.game.layout.chooser_pos else '❌ Not configured'}
+⚡ Danger zone: {'✅ Setup' if self.game.layout.danger_pos else '❌ Not configured'}
+🚪 Spawn/Entry: {'✅ Setup' if self.game.layout.spawn_pos else '❌ Not configured'}
+🚪 Exit area: {'✅ Setup' if self.game.layout.exit_pos else '❌ Not configured'}
 
-        elif msg.startswith("!change chooser "):
-            if not await self.is_owner(user):
-                await self.highrise.send_whisper(user.id, "This command is for the owner only.")
-                return
-            # Extract the player name after "!change chooser "
-            new_chooser = message[15:].replace("@", "").strip()
-            
-            # Find the player (case-insensitive search)
-            found_player = None
-            for player in self.guess_face_game["players"]:
-                if player.lower() == new_chooser.lower():
-                    found_player = player
-                    break
-            
-            if not found_player:
-                await self.highrise.chat(f"❌ Player '{new_chooser}' not found in game! Players: {', '.join(self.guess_face_game['players'])}")
-                return
-            
-            new_chooser = found_player
-            
-            old_chooser = self.guess_face_game.get("chosen_player")
-            self.guess_face_game["chosen_player"] = new_chooser
-            self.guess_face_game["secret_word"] = None  # Reset secret word so they must choose again
-            self.guess_face_game["votes"] = {}  # Clear any previous votes/selections
-            
-            # Return old chooser to their block if they exist
-            if old_chooser and old_chooser in self.guess_face_game.get("player_positions", {}):
-                old_chooser_idx = self.guess_face_game["player_positions"][old_chooser]
-                room_users_resp = await self.highrise.get_room_users()
-                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                
-                rows = self.guess_face_game.get("rows", {})
-                blocks = self.guess_face_game.get("blocks", {})
-                old_pos = None
-                
-                if rows and old_chooser_idx is not None:
-                    current_count = 0
-                    for row_key in sorted(rows.keys(), key=lambda x: int(x) if isinstance(x, str) else x):
-                        row = rows[row_key]
-                        num_blocks = row.get("num_blocks", len(row.get("blocks", [])))
-                        if current_count + num_blocks > old_chooser_idx:
-                            pos_in_row = old_chooser_idx - current_count
-                            if "blocks" in row and pos_in_row < len(row["blocks"]):
-                                block = row["blocks"][pos_in_row]
-                                old_pos = Position(block['x'], block['y'], block['z'], block['facing'])
-                            break
-                        current_count += num_blocks
-                
-                if not old_pos and (str(old_chooser_idx) in blocks or old_chooser_idx in blocks):
-                    b = blocks.get(old_chooser_idx) or blocks.get(str(old_chooser_idx))
-                    if b:
-                        old_pos = Position(b['x'], b['y'], b['z'], b['facing'])
-
-                if old_pos:
-                    for u, pos in room_users:
-                        if u.username == old_chooser:
-                            await self.highrise.teleport(u.id, old_pos)  # type: ignore
-                            break
-            
-            # Teleport new chooser to chooser position
-            chooser_pos = self.guess_face_game.get("chooser_pos")
-            if chooser_pos:
-                room_users_resp = await self.highrise.get_room_users()
-                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                # Get first block from blocks list (or use as direct position if old format)
-                teleport_pos = chooser_pos
-                if "blocks" in chooser_pos and chooser_pos["blocks"]:
-                    teleport_pos = chooser_pos["blocks"][0]
-                for u, pos in room_users:
-                    if u.username == new_chooser:
-                        await self.highrise.teleport(u.id, Position(teleport_pos['x'], teleport_pos['y'], teleport_pos['z'], teleport_pos['facing']))  # type: ignore
-                        break
-            
-            await self.highrise.chat(f"🔄 Chooser changed: {old_chooser} → {new_chooser}")
-            await self.highrise.chat(f"⚠️ Previous secret word cancelled. @{new_chooser} please whisper a new word!")
-            return
+Setup commands (owner only):
+• set row [number] [blocks] - save row
+• rows - display all saved rows
+• set chooser [blocks] - set chooser area
+• set danger [blocks] - set danger zone
+• set spawn [blocks] - set spawn location
+• set exit [blocks] - set exit location
+• set chair - set bot sitting position
+• sit - make bot sit
+• !end - end the game
+• kick @username - kick a player from the game
+• !change chooser @username - change the chooser"""
+        await self.highrise.send_whisper(user.id, config_info)
 
-        elif msg.startswith("put"):
-            if not await self.is_owner(user):
-                await self.highrise.send_whisper(user.id, "This command is for the owner only.")
-                return
-            
-            parts = msg.split(" ")
-            mode = "manual" # Default to manual if just "put"
-            if len(parts) > 1:
-                if parts[1].lower() == "bot":
-                    mode = "bot"
+    async def cmd_end(self, user: User, args: str):
+        spawn_pos = self.game.layout.spawn_pos
+        if not spawn_pos:
+            await self.highrise.send_whisper(user.id, "❌ Spawn position not set! Please use 'set spawn' command first.")
+            return
+        
+        try:
+            # Reset game state and stop the round in progress
+            self.game.end()
+            self.game.frozen_players = set()
             
-            current_chooser = self.guess_face_game.get("chosen_player")
-            if not current_chooser:
-                await self.highrise.chat("❌ No chooser is currently selected!")
-                return
+            # Teleport all players in the room to spawn
             
-            # Check if chooser is in player positions (on a block)
-            if current_chooser not in self.guess_face_game.get("player_positions", {}):
-                await self.highrise.chat(f"❌ {current_chooser} is not assigned to any block!")
-                return
+            teleport_pos = spawn_pos
+            if "blocks" in spawn_pos and spawn_pos["blocks"]:
+                teleport_pos = spawn_pos["blocks"][0]
             
-            chooser_idx = self.guess_face_game["player_positions"][current_chooser]
-            rows = self.guess_face_game.get("rows", {})
-            blocks = self.guess_face_game.get("blocks", {})
+            await self.highrise.chat("🏁 Game ended! Moving all players to spawn...")
             
-            # Find the chooser's original block position
-            original_pos = None
-            if rows and chooser_idx is not None:
-                current_count = 0
-                for row_key in sorted(rows.keys(), key=lambda x: int(x) if isinstance(x, str) else x):
-                    row = rows[row_key]
-                    num_blocks = row.get("num_blocks", len(row.get("blocks", [])))
-                    if current_count + num_blocks > chooser_idx:
-                        pos_in_row = chooser_idx - current_count
-                        if "blocks" in row and pos_in_row < len(row["blocks"]):
-                            block = row["blocks"][pos_in_row]
-                            original_pos = Position(block['x'], block['y'], block['z'], block['facing'])
-                        break
-                    current_count += num_blocks
+            destination = Position(teleport_pos['x'], teleport_pos['y'], teleport_pos['z'], teleport_pos['facing'])
+            # Skip the bot itself
+            await self.teleport_many([(u.id, destination) for u, pos in self.presence if u.id != self.my_user_id])
+        except Exception as e:
+            await self.highrise.send_whisper(user.id, f"❌ Error ending game: {str(e)}")
+
+    async def cmd_set_chair(self, user: User, args: str):
+        try:
+            entry = self.presence.find_by_id(user.id)
+            if entry:
+                u, pos = entry
+                # Try to save position with available attributes
+                try:
+                    # Try Position type first (x, y, z attributes)
+                    if hasattr(pos, 'x') and hasattr(pos, 'y') and hasattr(pos, 'z'):
+                        self.update_layout(sit_pos={
+                            "x": pos.x,  # type: ignore
+                            "y": pos.y,  # type: ignore
+                            "z": pos.z,  # type: ignore
+                            "facing": getattr(pos, 'facing', 'ForwardDown'),
+                            "type": "position"
+                        })
+                        await self.highrise.chat(f"✅ Chair position saved! ({user.username} is now the chair)")
+                        await self.highrise.send_whisper(user.id, "📍 Your chair position saved!\nType 'sit' to make me sit here")
+                        return
+                    # Try AnchorPosition type (entity_id and anchor_ix)
+                    elif hasattr(pos, 'entity_id') and hasattr(pos, 'anchor_ix'):
+                        self.update_layout(sit_pos={
+                            "entity_id": str(pos.entity_id),  # type: ignore
+                            "anchor_ix": int(pos.anchor_ix),  # type: ignore
+                            "type": "anchor"
+                        })
+                        await self.highrise.chat(f"✅ Chair position saved! ({user.username} is now the chair)")
+                        await self.highrise.send_whisper(user.id, "📍 Your chair position saved!\nType 'sit' to make me sit here")
+                        return
+                    else:
+                        # Debug: show what attributes the position has
+                        attrs = dir(pos)
+                        await self.highrise.chat("❌ Could not identify position type. Try standing somewhere else!")
+                        return
+                except Exception as e:
+                    await self.highrise.chat(f"❌ Error with position: {str(e)}")
+                    return
+        except Exception as e:
+            await self.highrise.chat(f"❌ Error saving chair position: {str(e)}")
+
+    async def cmd_sit(self, user: User, args: str):
+        sit_pos = self.game.layout.sit_pos
+        if not sit_pos:
+            await self.highrise.chat("❌ Chair position not set! Use 'set chair' first.")
+            return
+        
+        try:
+            # Handle both Position and AnchorPosition
+            if sit_pos.get("type") == "anchor":
+                # Walk to anchor position
+                anchor_pos = AnchorPosition(sit_pos["entity_id"], sit_pos["anchor_ix"])
+                await self.highrise.walk_to(anchor_pos)
+            else:
+                # Walk to normal position
+                await self.highrise.walk_to(Position(sit_pos['x'], sit_pos['y'], sit_pos['z'], sit_pos['facing']))
             
-            # Fallback to blocks dictionary
-            if not original_pos and (str(chooser_idx) in blocks or chooser_idx in blocks):
-                b = blocks.get(chooser_idx) or blocks.get(str(chooser_idx))
-                if b:
-                    original_pos = Position(b['x'], b['y'], b['z'], b['facing'])
+            await asyncio.sleep(1.0)
+            # Ensure bot is sitting and not playing a dance emote
+            # We can use "idle-loop-sitfloor" or similar if the goal is to sit on floor
+            # If sitting on a chair, the walk_to(anchor_pos) usually handles the sitting state
+            if sit_pos.get("type") != "anchor":
+                await self.highrise.send_emote("idle-loop-sitfloor")
             
-            if original_pos:
-                room_users_resp = await self.highrise.get_room_users()
-                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                for u, pos in room_users:
-                    if u.username == current_chooser:
-                        await self.highrise.teleport(u.id, original_pos)  # type: ignore
-                        break
-                
-                if mode == "bot":
-                    # Make bot the chooser
-                    self.guess_face_game["chosen_player"] = "Bot"
-                    self.guess_face_game["secret_word"] = random.choice(["berlin", "reykjavik", "new york", "london", "moscow", "paris"])
-                    await self.highrise.chat(f"🔄 {current_chooser} returned. I will choose the word! 🤖")
-                    await self.highrise.chat("✅ Word selected! 🤫 Start voting!")
-                    asyncio.create_task(self.discussion_phase())
-                else:
-                    # Manual mode
-                    self.guess_face_game["chosen_player"] = "Manual" 
-                    self.guess_face_game["secret_word"] = None
-                    await self.highrise.chat(f"🔄 {current_chooser} returned. Owner/Allowed users can whisper the city! 🤫")
-            else:
-                await self.highrise.chat(f"❌ Could not find {current_chooser}'s block position!")
+            await self.highrise.chat("Done sitting successfully! 🪑")
+        except Exception as e:
+            await self.highrise.chat(f"❌ error: {str(e)}")
+
+    async def cmd_prize_on(self, user: User, args: str):
+        self.game.prize_active = True
+        await self.highrise.chat("✅ Prize system enabled! (Requires minimum players to start)")
+
+    async def cmd_prize_off(self, user: User, args: str):
+        self.game.prize_active = False
+        await self.highrise.chat("❌ Prize system disabled!")
+
+    async def cmd_prize_amount(self, user: User, args: list):
+        amount = args[0]
+        # Validate that the amount is a valid tip tier
+        valid_tiers = [1, 5, 10, 50, 100, 500, 1000]
+        if amount not in valid_tiers:
+            await self.highrise.chat(f"❌ Invalid prize amount! Valid tiers are: {', '.join(map(str, valid_tiers))}")
             return
-
-        elif msg.startswith("pull "):
-            if not await self.is_owner(user):
-                await self.highrise.send_whisper(user.id, "This command is for the owner only.")
-                return
+        self.game.prize_amount = amount
+        await self.highrise.chat(f"💰 Prize amount set to: {amount} gold")
+
+    async def cmd_reset(self, user: User, args: str):
+        self.game.min_players = 0
+        self.game.prize_active = False
+        await self.highrise.chat("✅ Game settings reset! No minimum players, Prize system OFF.")
+
+    async def cmd_prize_minimum(self, user: User, args: list):
+        min_p = args[0]
+        self.game.min_players = min_p
+        await self.highrise.chat(f"👥 Minimum players required: {min_p}")
+
+    async def cmd_freeze(self, user: User, args: str):
+        target = args
+        if target:
+            self.game.frozen_players.add(target)
+            await self.highrise.chat(f"❄️ {target} is now FROZEN (stays on block, no danger zone)")
+
+    async def cmd_kick(self, user: User, args: str):
+        target = args
+        if target:
+            # Remove from game players list
+            if target in self.game.players:
+                self.game.players.discard(target)
+                self.game.notify()
             
-            target_name = msg.split(" ", 1)[1].replace("@", "").strip()
-            if not target_name:
-                await self.highrise.chat("Usage: pull @username")
-                return
+            # Add to excluded list so they can't rejoin this game
+            self.game.excluded_players.add(target)
             
-            # Find the player in the game
-            found_player = None
-            for player in self.guess_face_game.get("players", []):
-                if player.lower() == target_name.lower():
-                    found_player = player
-                    break
+            # Teleport to exit if set
+            exit_pos = self.game.layout.exit_pos
+            if exit_pos:
+                entry = self.presence.find(target)
+                if entry:
+                    u, pos = entry
+                    t_pos = exit_pos
+                    if "blocks" in exit_pos and exit_pos["blocks"]:
+                        t_pos = exit_pos["blocks"][0]
+                    await self.highrise.teleport(u.id, Position(t_pos['x'], t_pos['y'], t_pos['z'], t_pos['facing']))  # type: ignore
             
-            if not found_player:
-                await self.highrise.chat(f"❌ Player '{target_name}' not found in game!")
-                return
+            await self.highrise.chat(f"👢 {target} has been kicked from the game!")
             
-            # Get chooser position
-            chooser_pos = self.guess_face_game.get("chooser_pos")
-            if not chooser_pos:
-                await self.highrise.chat("❌ Chooser position not set! Use 'set chooser' first.")
-                return
+            # Check if game should end because only chooser or no players left
+            available_players = self.game.remaining()
             
-            # Teleport player to chooser area
-            try:
-                room_users_resp = await self.highrise.get_room_users()
-                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                # Get first block from blocks list (or use as direct position if old format)
-                teleport_pos = chooser_pos
-                if "blocks" in chooser_pos and chooser_pos["blocks"]:
-                    teleport_pos = chooser_pos["blocks"][0]
-                for u, pos in room_users:
-                    if u.username == found_player:
-                        await self.highrise.teleport(u.id, Position(teleport_pos['x'], teleport_pos['y'], teleport_pos['z'], teleport_pos['facing']))  # type: ignore
-                        await self.highrise.chat(f"🎯 {found_player} pulled to chooser area!")
-                        break
-            except Exception as e:
-                await self.highrise.chat(f"❌ Error pulling {found_player}: {str(e)}")
+            # If only chooser left or no players left, end game
+            if len(available_players) <= 1:
+                if len(available_players) == 0 or (len(available_players) == 1 and available_players[0] == self.game.chosen_player):
+                    await self.highrise.chat("🏁 No players left in the game. Ending...")
+                    # Same reset as !end
+                    self.game.end()
+
+    async def cmd_unfreeze(self, user: User, args: str):
+        target = args
+        if target and target in self.game.frozen_players:
+            self.game.frozen_players.remove(target)
+            await self.highrise.chat(f"🔥 {target} is now UNFROZEN (can go to danger zone)")
+
+    async def cmd_change_chooser(self, user: User, args: str):
+        new_chooser = args.replace("@", "").strip()
+        
+        # Find the player (case-insensitive search)
+        found_player = None
+        for player in self.game.players:
+            if player.lower() == new_chooser.lower():
+                found_player = player
+                break
+        
+        if not found_player:
+            await self.highrise.chat(f"❌ Player '{new_chooser}' not found in game! Players: {', '.join(self.game.players)}")
             return
+        
+        new_chooser = found_player
+        
+        old_chooser = self.game.chosen_player
+        self.game.chosen_player = new_chooser
+        self.game.secret_word = None  # Reset secret word so they must choose again
+        self.game.votes = {}  # Clear any previous votes/selections
+        
+        # Return old chooser to their block if they exist
+        if old_chooser and old_chooser in self.game.player_positions:
+            old_chooser_idx = self.game.player_positions[old_chooser]
+            old_pos = self.seat_map.position(old_chooser_idx)
+
+            if old_pos:
+                entry = self.presence.find(old_chooser)
+                if entry:
+                    u, pos = entry
+                    await self.highrise.teleport(u.id, old_pos)  # type: ignore
+        
+        # Teleport new chooser to chooser position
+        chooser_pos = self.game.layout.chooser_pos
+        if chooser_pos:
+            # Get first block from blocks list (or use as direct position if old format)
+            teleport_pos = chooser_pos
+            if "blocks" in chooser_pos and chooser_pos["blocks"]:
+                teleport_pos = chooser_pos["blocks"][0]
+            entry = self.presence.find(new_chooser)
+            if entry:
+                u, pos = entry
+                await self.highrise.teleport(u.id, Position(teleport_pos['x'], teleport_pos['y'], teleport_pos['z'], teleport_pos['facing']))  # type: ignore
+        
+        await self.highrise.chat(f"🔄 Chooser changed: {old_chooser} → {new_chooser}")
+        await self.highrise.chat(f"⚠️ Previous secret word cancelled. @{new_chooser} please whisper a new word!")
 
-        elif msg.startswith("allow "):
-            if not await self.is_owner(user):
-                await self.highrise.send_whisper(user.id, "This command is for the owner only.")
-                return
-            target = msg.split(" ", 1)[1].replace("@", "").strip()
-            if target:
-                self.allowed_whispers.add(target)
-                self.save_allowed_whispers()
-                await self.highrise.chat(f"✅ {target} can now whisper to the bot!")
+    async def cmd_put(self, user: User, args: str):
+        mode = "bot" if args.lower().split()[:1] == ["bot"] else "manual"  # Default to manual if just "put"
+        
+        current_chooser = self.game.chosen_player
+        if not current_chooser:
+            await self.highrise.chat("❌ No chooser is currently selected!")
             return
-
-        elif msg.startswith("disallow "):
-            if not await self.is_owner(user):
-                await self.highrise.send_whisper(user.id, "This command is for the owner only.")
-                return
-            target = msg.split(" ", 1)[1].replace("@", "").strip()
-            if target and target in self.allowed_whispers:
-                self.allowed_whispers.remove(target)
-                self.save_allowed_whispers()
-                await self.highrise.chat(f"❌ {target} can no longer whisper to the bot!")
+        
+        # Check if chooser is in player positions (on a block)
+        if current_chooser not in self.game.player_positions:
+            await self.highrise.chat(f"❌ {current_chooser} is not assigned to any block!")
             return
+        
+        chooser_idx = self.game.player_positions[current_chooser]
+        
+        # Find the chooser's original block position
+        original_pos = self.seat_map.position(chooser_idx)
+        
+        if original_pos:
+            entry = self.presence.find(current_chooser)
+            if entry:
+                u, pos = entry
+                await self.highrise.teleport(u.id, original_pos)  # type: ignore
+            
+            if mode == "bot":
+                # Make bot the chooser
+                self.game.chosen_player = "Bot"
+                word = random.choice(CITIES)
+                await self.highrise.chat(f"🔄 {current_chooser} returned. I will choose the word! 🤖")
+                await self.highrise.chat("✅ Word selected! 🤫 Start voting!")
+                if not self.game.choose_word(word) and self.game.can_enter("discussion"):
+                    # No round is waiting on a chooser - start the discussion here
+                    self.drive_game(self.discussion_phase())
+            else:
+                # Manual mode
+                self.game.chosen_player = "Manual" 
+                self.game.secret_word = None
+                await self.highrise.chat(f"🔄 {current_chooser} returned. Owner/Allowed users can whisper the city! 🤫")
+        else:
+            await self.highrise.chat(f"❌ Could not find {current_chooser}'s block position!")
 
-        elif msg.startswith("!add_vip "):
-            if not await self.is_owner(user):
-                await self.highrise.send_whisper(user.id, "⛔ This command is for the owner only.")
-                return
-            target = msg.split(" ", 1)[1].replace("@", "").strip()
-            if target:
-                self.vips.add(target)
-                self.save_vips()
-                await self.highrise.chat(f"⭐ {target} is now VIP (Moderator)!")
+    async def cmd_pull(self, user: User, args: str):
+        target_name = args
+        if not target_name:
+            await self.highrise.chat("Usage: pull @username")
             return
-
-        elif msg.startswith("!remove_vip "):
-            if not await self.is_owner(user):
-                await self.highrise.send_whisper(user.id, "⛔ This command is for the owner only.")
-                return
-            target = msg.split(" ", 1)[1].replace("@", "").strip()
-            if target and target in self.vips:
-                self.vips.remove(target)
-                self.save_vips()
-                await self.highrise.chat(f"❌ {target} is no longer VIP!")
+        
+        # Find the player in the game
+        found_player = None
+        for player in self.game.players:
+            if player.lower() == target_name.lower():
+                found_player = player
+                break
+        
+        if not found_player:
+            await self.highrise.chat(f"❌ Player '{target_name}' not found in game!")
             return
-
-        elif msg == "!vip_list":
-            if not await self.is_owner(user):
-                await self.highrise.send_whisper(user.id, "⛔ This command is for the owner only.")
-                return
-            if self.vips:
-                vip_list = ", ".join(sorted(self.vips))
-                await self.highrise.send_whisper(user.id, f"⭐ VIP Members ({len(self.vips)}):\n{vip_list}")
-            else:
-                await self.highrise.send_whisper(user.id, "❌ No VIP members yet!")
+        
+        # Get chooser position
+        chooser_pos = self.game.layout.chooser_pos
+        if not chooser_pos:
+            await self.highrise.chat("❌ Chooser position not set! Use 'set chooser' first.")
             return
+        
+        # Teleport player to chooser area
+        try:
+            # Get first block from blocks list (or use as direct position if old format)
+            teleport_pos = chooser_pos
+            if "blocks" in chooser_pos and chooser_pos["blocks"]:
+                teleport_pos = chooser_pos["blocks"][0]
+            entry = self.presence.find(found_player)
+            if entry:
+                u, pos = entry
+                await self.highrise.teleport(u.id, Position(teleport_pos['x'], teleport_pos['y'], teleport_pos['z'], teleport_pos['facing']))  # type: ignore
+                await self.highrise.chat(f"🎯 {found_player} pulled to chooser area!")
+        except Exception as e:
+            await self.highrise.chat(f"❌ Error pulling {found_player}: {str(e)}")
+
+    async def cmd_allow(self, user: User, args: str):
+        target = args
+        if target:
+            self.allowed_whispers.add(target)
+            self.journal.add(self.data_path("allowed_whispers.json"), target)
+            await self.highrise.chat(f"✅ {target} can now whisper to the bot!")
+
+    async def cmd_disallow(self, user: User, args: str):
+        target = args
+        if target and target in self.allowed_whispers:
+            self.allowed_whispers.remove(target)
+            self.journal.discard(self.data_path("allowed_whispers.json"), target)
+            await self.highrise.chat(f"❌ {target} can no longer whisper to the bot!")
+
+    async def cmd_add_vip(self, user: User, args: str):
+        target = args
+        if target:
+            self.vips.add(target)
+            self.journal.add(self.data_path("vips.json"), target)
+            await self.highrise.chat(f"⭐ {target} is now VIP (Moderator)!")
+
+    async def cmd_remove_vip(self, user: User, args: str):
+        target = args
+        if target and target in self.vips:
+            self.vips.remove(target)
+            self.journal.discard(self.data_path("vips.json"), target)
+            await self.highrise.chat(f"❌ {target} is no longer VIP!")
+
+    async def cmd_vip_list(self, user: User, args: str):
+        if self.vips:
+            vip_list = ", ".join(sorted(self.vips))
+            await self.highrise.send_whisper(user.id, f"⭐ VIP Members ({len(self.vips)}):\n{vip_list}")
+        else:
+            await self.highrise.send_whisper(user.id, "❌ No VIP members yet!")
 
-        elif msg == "!vip":
-            if not await self.is_vip(user):
-                await self.highrise.send_whisper(user.id, "⛔ You must be VIP to use this command!")
-                return
-            
-            vip_pos = self.guess_face_game.get("vip_pos")
-            if not vip_pos:
-                await self.highrise.send_whisper(user.id, "❌ VIP spot not set yet! Ask the owner to set it with 'set vip_spot'")
-                return
-            
-            try:
-                room_users_resp = await self.highrise.get_room_users()
-                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                # Get first block from blocks list (or use as direct position if old format)
-                teleport_pos = vip_pos
-                if "blocks" in vip_pos and vip_pos["blocks"]:
-                    teleport_pos = vip_pos["blocks"][0]
-                for u, pos in room_users:
-                    if u.username == user.username:
-                        await self.highrise.teleport(u.id, Position(teleport_pos['x'], teleport_pos['y'], teleport_pos['z'], teleport_pos['facing']))  # type: ignore
-                        await self.highrise.chat(f"⭐ {user.username} joined the VIP area!")
-                        break
-            except Exception as e:
-                await self.highrise.send_whisper(user.id, f"❌ Error teleporting: {str(e)}")
+    async def cmd_vip(self, user: User, args: str):
+        vip_pos = self.game.layout.vip_pos
+        if not vip_pos:
+            await self.highrise.send_whisper(user.id, "❌ VIP spot not set yet! Ask the owner to set it with 'set vip_spot'")
             return
+        
+        try:
+            # Get first block from blocks list (or use as direct position if old format)
+            teleport_pos = vip_pos
+            if "blocks" in vip_pos and vip_pos["blocks"]:
+                teleport_pos = vip_pos["blocks"][0]
+            entry = self.presence.find(user.username)
+            if entry:
+                u, pos = entry
+                await self.highrise.teleport(u.id, Position(teleport_pos['x'], teleport_pos['y'], teleport_pos['z'], teleport_pos['facing']))  # type: ignore
+                await self.highrise.chat(f"⭐ {user.username} joined the VIP area!")
+        except Exception as e:
+            await self.highrise.send_whisper(user.id, f"❌ Error teleporting: {str(e)}")
 
-        elif msg == "h":
-            if not await self.is_vip(user):
-                await self.highrise.send_whisper(user.id, "⛔ You must be VIP/Moderator to use this command!")
-                return
-            
-            host_pos = self.guess_face_game.get("host_pos")
-            if not host_pos:
-                await self.highrise.send_whisper(user.id, "❌ Host spot not set yet! Ask the owner to set it with 'set host'")
-                return
-            
-            try:
-                room_users_resp = await self.highrise.get_room_users()
-                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                # Get first block from blocks list (or use as direct position if old format)
-                teleport_pos = host_pos
-                if "blocks" in host_pos and host_pos["blocks"]:
-                    teleport_pos = host_pos["blocks"][0]
-                for u, pos in room_users:
-                    if u.username == user.username:
-                        await self.highrise.teleport(u.id, Position(teleport_pos['x'], teleport_pos['y'], teleport_pos['z'], teleport_pos['facing']))  # type: ignore
-                        await self.highrise.chat(f"👑 {user.username} is now hosting!")
-                        break
-            except Exception as e:
-                await self.highrise.send_whisper(user.id, f"❌ Error teleporting: {str(e)}")
+    async def cmd_host(self, user: User, args: str):
+        host_pos = self.game.layout.host_pos
+        if not host_pos:
+            await self.highrise.send_whisper(user.id, "❌ Host spot not set yet! Ask the owner to set it with 'set host'")
             return
+        
+        try:
+            # Get first block from blocks list (or use as direct position if old format)
+            teleport_pos = host_pos
+            if "blocks" in host_pos and host_pos["blocks"]:
+                teleport_pos = host_pos["blocks"][0]
+            entry = self.presence.find(user.username)
+            if entry:
+                u, pos = entry
+                await self.highrise.teleport(u.id, Position(teleport_pos['x'], teleport_pos['y'], teleport_pos['z'], teleport_pos['facing']))  # type: ignore
+                await self.highrise.chat(f"👑 {user.username} is now hosting!")
+        except Exception as e:
+            await self.highrise.send_whisper(user.id, f"❌ Error teleporting: {str(e)}")
 
+    @event_handler
     async def on_message(self, user_id: str, conversation_id: str, is_new_conversation: bool) -> None:  # type: ignore
         try:
-            # Track that this user messaged the bot - add to list for !invite command
-            self.users_messaged_bot.add(user_id)
-            self.user_conversations[user_id] = conversation_id  # Store conversation ID for later invites
-            self.save_users_messaged_bot()
-            print(f"📝 Added {user_id} to users_messaged_bot (DM). Total: {len(self.users_messaged_bot)}")
+            # Track that this user messaged the bot, and the conversation to send invites to
+            self.remember_contact(user_id, conversation_id)
+            invite_log.info("📝 Added %s to users_messaged_bot (DM)", user_id,
+                            extra={"event": "dm", "user_id": user_id})
             
             response = await self.highrise.get_messages(conversation_id)
             if not (response and hasattr(response, 'messages') and response.messages and len(response.messages) > 0):  # type: ignore
                 return
 
             message = response.messages[0].content.strip()  # type: ignore
-            msg = message.lower()
 
             # Create a dummy user object for compatibility with handle functions
             user = User(id=user_id, username="User") 
-
-            if msg.startswith("!commands") or msg == "commands":
-                # Clear conversation IDs are handled inside handle_commands_command
-                await self.handle_commands_command(user, conversation_id)
-            elif msg.startswith("!help") or msg == "help":
-                await self.handle_help_command(user, conversation_id)
-            elif msg.startswith("!stats") or msg == "stats":
-                await self.handle_stats_command(user, conversation_id)
-            elif msg.startswith("!invite") or msg == "invite":
-                await self.send_invite_to_room(user, conversation_id)
+            await self.run_command(user, message, "dm", conversation_id)
 
         except Exception as e:
-            print(f"Error in on_message: {e}")
+            room_log.exception("Error in on_message: %s", e)
 
+    @event_handler
     async def on_whisper(self, user: User, message: str) -> None:  # type: ignore
         username = user.username
         msg = message.lower().strip()
 
-        print(f"\n📨📨📨 WHISPER RECEIVED FROM {username}: '{msg}'")
+        room_log.info("📨 Whisper from %s: %r", username, msg, extra={"event": "whisper", "user_id": user.id})
 
         # Track that this user messaged the bot
-        self.users_messaged_bot.add(user.id)
-        self.save_users_messaged_bot()
+        self.remember_contact(user.id)
         
-        if username not in self.balances:
-            self.balances[username] = 1000
-            self.save_balances()
-        if username not in self.credits:
-            self.credits[username] = 0
-            self.save_credits()
+        self.players.ensure(username)
 
         try:
-            # Handle !commands/!invite in whisper
-            if msg == "commands" or msg == "!commands":
-                await self.handle_commands_command(user)
-                return
-            elif msg == "invite" or msg == "!invite":
-                await self.send_invite_to_room(user)
+            # Handle !commands/!invite/!vote in whisper
+            if await self.run_command(user, message, "whisper"):
                 return
 
             # Allowed words for voting and choosing
-            allowed_words = ["berlin", "reykjavik", "new york", "london", "moscow", "paris"]
-            
-            # Handle !vote command format
-            if msg.startswith("!vote "):
-                vote_word = msg[6:].strip().lower()  # Extract word after !vote
-                # Create a user object with the vote word as message
-                await self.handle_vote_command(user, vote_word)
-                return
+            allowed_words = CITIES
             
             # Check if user is the chooser and game is in "choosing" phase
-            if username == self.guess_face_game.get("chosen_player") and self.guess_face_game.get("phase") == "choosing":
+            if username == self.game.chosen_player and self.game.phase == "choosing":
                 # Chooser can ONLY whisper one of the 6 allowed words
                 if msg in allowed_words:
-                    # Cancel the timeout task since they whispered in time
-                    if self.guess_face_game.get("chooser_timeout_task"):
-                        self.guess_face_game["chooser_timeout_task"].cancel()
-                        self.guess_face_game["chooser_timeout_task"] = None
-                    
-                    self.guess_face_game["secret_word"] = msg
+                    # Wakes the waiting round straight away
+                    self.game.choose_word(msg)
                     await self.highrise.chat("✅ Word accepted! 🤫")
-                    print(f"✅ Chooser {username} selected word: {msg}")
+                    game_log.info("✅ Chooser %s selected word: %s", username, msg)
                     return
                 else:
                     # Chooser tried to whisper an invalid word
@@ -1368,14 +3342,14 @@ Setup commands (owner only):
                     return
             
             # During voting/discussion phase, accept votes from any player (allowed city names)
-            if self.guess_face_game.get("phase") in ["voting", "discussion"]:
+            if self.game.phase in ["voting", "discussion"]:
                 if msg in allowed_words:
                     # Player is voting during discussion/voting phase
                     await self.handle_vote_command(user, msg)
                     return
                 # If it's an authorized user, they can whisper other things
                 elif username in self.allowed_whispers:
-                    print(f"✅ Authorized whisper from {username}: {message}")
+                    room_log.info("✅ Authorized whisper from %s: %s", username, message, extra={"event": "whisper"})
                     return
                 # Otherwise silently ignore
                 return
@@ -1387,108 +3361,129 @@ Setup commands (owner only):
                     await self.handle_vote_command(user, message)
                     return
                 # Authorized player can whisper anything else (commands etc)
-                print(f"✅ Authorized whisper from {username}: {message}")
+                room_log.info("✅ Authorized whisper from %s: %s", username, message, extra={"event": "whisper"})
                 return
             
             # Ignore ALL other whispers silently (non-authorized players, non-voting words)
             return
 
         except Exception as e:
-            import traceback
-            print(f"❌ ERROR in on_whisper for {username}: {e}")
-            print(traceback.format_exc())
+            room_log.exception("❌ ERROR in on_whisper for %s: %s", username, e)
 
     async def handle_join_command(self, user: User):
         username = user.username
 
         # Prevent joining while game is ending
-        if self.guess_face_game.get("game_ending"):
+        if self.game.game_ending:
             await self.highrise.chat(f"{username} ❌ Game is ending. Try again in a moment!")
             return
 
         # Check if player was already excluded (left the game)
-        if username in self.guess_face_game.get("excluded_players", set()):
+        if username in self.game.excluded_players:
             await self.highrise.chat(f"{username} ❌ You cannot return - you already left this game")
             return
 
         # Only allow joining if game is NOT active, or if active but still in "waiting" phase
-        if self.guess_face_game["active"] and self.guess_face_game.get("phase") != "waiting":
+        if self.game.active and self.game.phase != "waiting":
             await self.highrise.chat(f"{username} ❌ Cannot join now - game has already started!")
             return
 
-        if self.guess_face_game["active"] and self.guess_face_game.get("phase") == "waiting":
+        if self.game.active and self.game.phase == "waiting":
             # Game is active but still in waiting phase, allow join
             await self.highrise.chat(f"{username} Joined the game! ⏳ Game starts in 1 minute! 🎮")
-            if username not in self.guess_face_game["players"]:
-                self.guess_face_game["players"].append(username)
+            if username not in self.game.players:
+                self.game.players.add(username)
                 await self._teleport_player_to_position(user, username)
         else:
             # Game is not active yet, start it
             await self.highrise.chat(f"{username} Joined! ⏳ Game starts in 1 minute! 🎮")
-            if username not in self.guess_face_game["players"]:
-                self.guess_face_game["players"].append(username)
+            if username not in self.game.players:
+                self.game.players.add(username)
                 await self._teleport_player_to_position(user, username)
 
-            if not self.guess_face_game["active"]:
-                self.guess_face_game["active"] = True
-                self.guess_face_game["phase"] = "waiting"
-                self.guess_face_game["excluded_players"] = set()
-                asyncio.create_task(self.start_game_countdown())
+            if not self.game.active:
+                self.game.active = True
+                self.game.enter("waiting")
+                self.game.excluded_players = set()
+                self.drive_game(self.start_game_countdown())
+
+    def resume_game(self):
+        """Pick a game cut off by a disconnect back up from the phase it was in"""
+        game = self.game
+        if not game.active or (game.driver is not None and not game.driver.done()):
+            return
+        game_log.info("♻️ Resuming Guess Face game: round %d, phase %s", game.round, game.phase)
+        if self.block_lock_sweep is None or self.block_lock_sweep.done():
+            self.block_lock_sweep = asyncio.create_task(self.monitor_player_positions())
+        # Phases are rewound by hand here: the flow resumes at the step that leads into them
+        if game.round == 0:
+            flow = self.start_game_countdown()
+        elif game.phase is None:
+            flow = self.start_new_round()  # The last round was scored; go on to the next
+        elif game.phase == "waiting" or (game.phase == "choosing" and not game.secret_word):
+            game.round -= 1  # Replay the start of this round, same chooser
+            flow = self.start_new_round()
+        elif game.phase in ("choosing", "discussion"):
+            game.phase = "choosing"
+            flow = self.discussion_phase(keep_votes=True)
+        elif not game.danger_zone_players:
+            game.phase = "discussion"
+            flow = self.pull_to_danger_zone()
+        else:
+            flow = self.end_round()
+        self.drive_game(flow)
+
+    def drive_game(self, coro):
+        """Run the round flow as the game's one driver task, replacing any flow still running"""
+        self.game.stop_driver()
+        self.game.driver = asyncio.create_task(coro)
+        return self.game.driver
 
     async def _teleport_player_to_position(self, user: User, username: str):
         """Helper to teleport player to correct row/block"""
-        player_idx = len(self.guess_face_game["players"]) - 1
-        
-        # Try rows system first
-        rows = self.guess_face_game.get("rows", {})
-        if rows:
-            # Find which row this player goes to
-            current_player_count = 0
-            target_row_idx = None
-            pos_in_row = 0
-            
-            # Iterate through rows in order to find which row this player belongs to
-            for row_idx in sorted(rows.keys(), key=lambda x: int(x) if isinstance(x, str) else x):
-                row = rows[row_idx]
-                num_blocks = row.get("num_blocks", len(row.get("blocks", [])))
-                
-                if current_player_count + num_blocks > player_idx:
-                    # This player goes in this row
-                    target_row_idx = row_idx
-                    pos_in_row = player_idx - current_player_count
-                    break
-                
-                current_player_count += num_blocks
-            
-            # Teleport player to their block
-            if target_row_idx is not None and target_row_idx in rows:
-                row = rows[target_row_idx]
-                if "blocks" in row and pos_in_row < len(row["blocks"]):
-                    block = row["blocks"][pos_in_row]
-                    self.guess_face_game["player_positions"][username] = player_idx
-                    await self.highrise.teleport(user.id, Position(block['x'], block['y'], block['z'], block['facing']))  # type: ignore
-                    return
-        
-        # Fallback to blocks system
-        blocks = self.guess_face_game.get("blocks", {})
-        if str(player_idx) in blocks or player_idx in blocks:
-            b = blocks.get(player_idx) or blocks.get(str(player_idx))
-            self.guess_face_game["player_positions"][username] = player_idx
-            await self.highrise.teleport(user.id, Position(b['x'], b['y'], b['z'], b['facing']))  # type: ignore
+        player_idx = len(self.game.players) - 1
+        expected_pos = self.seat_map.position(player_idx)
+        if expected_pos:
+            self.game.player_positions[username] = player_idx
+            await self.highrise.teleport(user.id, expected_pos)  # type: ignore
+
+    async def teleport_many(self, moves, concurrency: int = BULK_TELEPORT_CONCURRENCY) -> dict:
+        """Teleport (user_id, Position) pairs concurrently; returns {user_id: error} for the ones that failed.
+
+        At most `concurrency` teleports are in flight and the outbound scheduler
+        caps the rate, so a user who already left is recorded without aborting the rest.
+        """
+        limit = asyncio.Semaphore(concurrency)
+        failures = {}
+
+        async def move(user_id, destination):
+            async with limit:
+                try:
+                    await self.highrise.teleport(user_id, destination)  # type: ignore
+                    self.presence.set_position(user_id, destination)
+                except Exception as e:
+                    failures[user_id] = e
+
+        await asyncio.gather(*(move(user_id, destination) for user_id, destination in moves))
+        if failures:
+            game_log.warning("⚠️ %d/%d teleports failed: %s", len(failures), len(moves),
+                             ", ".join(f"{uid}: {e}" for uid, e in failures.items()))
+        return failures
 
     async def start_game_countdown(self):
-        # Start monitoring player positions during waiting phase
-        asyncio.create_task(self.monitor_player_positions())
+        # Block lock is enforced from on_user_move; this sweep only backs it up
+        if self.block_lock_sweep is None or self.block_lock_sweep.done():
+            self.block_lock_sweep = asyncio.create_task(self.monitor_player_positions())
         
         # Countdown logic with minimum players requirement
         while True:
-            min_req = self.guess_face_game.get("min_players", 0)
+            min_req = self.game.min_players
             
             # If there's a minimum requirement, wait until it's met
-            if min_req > 0 and len(self.guess_face_game["players"]) < min_req:
-                await self.highrise.chat(f"⏳ Waiting for players ({len(self.guess_face_game['players'])}/{min_req})")
+            if min_req > 0 and len(self.game.players) < min_req:
+                await self.highrise.chat(f"⏳ Waiting for players ({len(self.game.players)}/{min_req})")
                 await asyncio.sleep(10)
-                if not self.guess_face_game["active"]: return
+                if not self.game.active: return
                 continue # Re-check min_req after waiting
             else:
                 # Requirement met or no requirement
@@ -1498,15 +3493,15 @@ Setup commands (owner only):
         await self.highrise.chat("⏳ Game starts in 1 minute! 🎮")
         for i in range(50, 0, -10):
             await asyncio.sleep(10)
-            if not self.guess_face_game["active"]: return
+            if not self.game.active: return
             
             # Re-fetch min_req in case it changed (e.g. !reset)
-            min_req = self.guess_face_game.get("min_players", 0)
+            min_req = self.game.min_players
             
             # If min_req was set, ensure it's still met during the minute
-            if min_req > 0 and len(self.guess_face_game["players"]) < min_req:
+            if min_req > 0 and len(self.game.players) < min_req:
                 await self.highrise.chat("❌ Countdown stopped - not enough players")
-                self.guess_face_game["active"] = False
+                self.game.active = False
                 return
             await self.highrise.chat(f"⏳ Game starts in {i} seconds...")
 
@@ -1514,156 +3509,98 @@ Setup commands (owner only):
         for i in range(9, 0, -1):
             await self.highrise.chat(f"⏳ {i}")
             await asyncio.sleep(1)
-            if not self.guess_face_game["active"]: return
+            if not self.game.active: return
             
             # Re-fetch min_req
-            min_req = self.guess_face_game.get("min_players", 0)
-            if min_req > 0 and len(self.guess_face_game["players"]) < min_req:
+            min_req = self.game.min_players
+            if min_req > 0 and len(self.game.players) < min_req:
                 await self.highrise.chat("❌ Countdown stopped - not enough players")
-                self.guess_face_game["active"] = False
+                self.game.active = False
                 return
 
         # Final check before starting
-        min_req = self.guess_face_game.get("min_players", 0)
+        min_req = self.game.min_players
         # Allow any owner to play alone for testing
-        is_owner_alone = len(self.guess_face_game["players"]) == 1 and any(owner in self.guess_face_game["players"] for owner in self.owner_usernames)
+        is_owner_alone = len(self.game.players) == 1 and any(owner in self.game.players for owner in self.owner_usernames)
 
-        if not self.guess_face_game["active"] or (min_req > 0 and len(self.guess_face_game["players"]) < min_req and not is_owner_alone):
+        if not self.game.active or (min_req > 0 and len(self.game.players) < min_req and not is_owner_alone):
             await self.highrise.chat("Not enough players. Game cancelled.")
-            self.guess_face_game["active"] = False
+            self.game.active = False
             return
 
         # Now that game is actually starting, move players who left during waiting to excluded list
-        self.guess_face_game["excluded_players"].update(self.guess_face_game.get("left_during_waiting", set()))
-        self.guess_face_game["left_during_waiting"] = set()
+        self.game.excluded_players.update(self.game.left_during_waiting)
+        self.game.left_during_waiting = set()
 
         await self.start_new_round()
 
-    async def monitor_player_positions(self):
-        """Monitor players during waiting phase only - allow free movement during game"""
-        while self.guess_face_game.get("active"):
+    def _off_block(self, username: str, pos) -> Position | None:
+        """The block a waiting player should be sent back to, or None if they may stay where they are"""
+        if not self.game.active or self.game.phase != "waiting":
+            return None
+        if username not in self.game.players:
+            return None
+        # Skip excluded (eliminated) players
+        if username in self.game.excluded_players:
+            return None
+        expected_pos = self.seat_map.position(self.game.player_positions.get(username))
+        if not expected_pos or not hasattr(pos, 'x'):
+            return None
+        distance = ((pos.x - expected_pos.x)**2 + (pos.y - expected_pos.y)**2)**0.5  # type: ignore
+        return expected_pos if distance > BLOCK_LOCK_TOLERANCE else None
+
+    async def enforce_block_lock(self, user: User, pos) -> None:
+        """Send a waiting player back to their block when they walk off it"""
+        expected_pos = self._off_block(user.username, pos)
+        if expected_pos:
             try:
-                # Only enforce position restrictions during waiting phase
-                if self.guess_face_game.get("phase") != "waiting":
-                    # During game phases, players are free to move
-                    # Bot only teleports them when needed (to danger zone, chooser area)
-                    await asyncio.sleep(1)
-                    continue
-                
-                # During waiting phase, enforce block positions
-                room_users_resp = await self.highrise.get_room_users()
-                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                
-                for player_name in self.guess_face_game.get("players", []):
-                    # Skip excluded (eliminated) players
-                    if player_name in self.guess_face_game.get("excluded_players", set()):
-                        continue
-                    
-                    player_idx = self.guess_face_game.get("player_positions", {}).get(player_name)
-                    rows = self.guess_face_game.get("rows", {})
-                    blocks = self.guess_face_game.get("blocks", {})
-                    
-                    # Find expected position during waiting
-                    expected_pos = None
-                    
-                    # Regular player - should stay on their block during waiting
-                    if player_idx is not None:
-                        if rows:
-                            current_player_count = 0
-                            target_row_idx = None
-                            pos_in_row = 0
-                            
-                            for row_idx in sorted(rows.keys()):
-                                row = rows[row_idx]
-                                num_blocks = row.get("num_blocks", len(row.get("blocks", [])))
-                                
-                                if current_player_count + num_blocks > player_idx:
-                                    target_row_idx = row_idx
-                                    pos_in_row = player_idx - current_player_count
-                                    break
-                                
-                                current_player_count += num_blocks
-                            
-                            if target_row_idx is not None and target_row_idx in rows:
-                                row = rows[target_row_idx]
-                                if "blocks" in row and pos_in_row < len(row["blocks"]):
-                                    block = row["blocks"][pos_in_row]
-                                    expected_pos = Position(block['x'], block['y'], block['z'], block['facing'])
-                        
-                        if not expected_pos and (str(player_idx) in blocks or player_idx in blocks):
-                            b = blocks.get(player_idx) or blocks.get(str(player_idx))
-                            if b:
-                                expected_pos = Position(b['x'], b['y'], b['z'], b['facing'])
-                    
-                    # Teleport if moved during waiting phase
-                    if expected_pos:
-                        for u, pos in room_users:
-                            if u.username == player_name:
-                                # Check if player is too far from expected position
-                                distance = ((pos.x - expected_pos.x)**2 + (pos.y - expected_pos.y)**2)**0.5  # type: ignore
-                                if distance > 0.5:  # If moved more than 0.5 meters - allow small movements
-                                    try:
-                                        await self.highrise.teleport(u.id, expected_pos)  # type: ignore
-                                    except:
-                                        pass
-                                break
-                
-                await asyncio.sleep(1)  # Check every 1 second during waiting
+                await self.highrise.teleport(user.id, expected_pos)  # type: ignore
+                self.presence.set_position(user.id, expected_pos)
             except:
-                await asyncio.sleep(1)
+                pass
+
+    async def monitor_player_positions(self):
+        """Occasional sweep behind the move-event block lock, for events that never arrived"""
+        while self.game.active:
+            await asyncio.sleep(BLOCK_LOCK_SWEEP_SECONDS)
+            if self.game.phase != "waiting":
+                continue
+            for player_name in list(self.game.players):
+                entry = self.presence.find(player_name)
+                if entry:
+                    u, pos = entry
+                    await self.enforce_block_lock(u, pos)
 
     async def start_new_round(self):
-        self.guess_face_game["round"] += 1
+        self.game.round += 1
 
         # Set phase to waiting to lock player movement
-        self.guess_face_game["phase"] = "waiting"
+        if not self.game.enter("waiting"):
+            return
         
         # Return all players to their blocks (except excluded ones and current chooser) before starting new round
         try:
-            room_users_resp = await self.highrise.get_room_users()
-            room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-            current_chooser = self.guess_face_game.get("chosen_player")
+            current_chooser = self.game.chosen_player
+            moves = []
             
-            for player_name in self.guess_face_game.get("players", []):
+            for player_name in self.game.players:
                 # Skip excluded (eliminated) players and current chooser (he stays where he is)
-                if player_name in self.guess_face_game.get("excluded_players", set()):
+                if player_name in self.game.excluded_players:
                     continue
                 if player_name == current_chooser:
                     continue
                 
-                player_idx = self.guess_face_game.get("player_positions", {}).get(player_name)
-                rows = self.guess_face_game.get("rows", {})
-                blocks = self.guess_face_game.get("blocks", {})
-                expected_pos = None
-                
                 # Find player's block position
-                if player_idx is not None:
-                    if rows:
-                        current_count = 0
-                        for row_key in sorted(rows.keys()):
-                            row = rows[row_key]
-                            num_blocks = row.get("num_blocks", len(row.get("blocks", [])))
-                            
-                            if current_count + num_blocks > player_idx:
-                                pos_in_row = player_idx - current_count
-                                if "blocks" in row and pos_in_row < len(row["blocks"]):
-                                    block = row["blocks"][pos_in_row]
-                                    expected_pos = Position(block['x'], block['y'], block['z'], block['facing'])
-                                break
-                            
-                            current_count += num_blocks
-                    
-                    if not expected_pos and (str(player_idx) in blocks or player_idx in blocks):
-                        b = blocks.get(player_idx) or blocks.get(str(player_idx))
-                        if b:
-                            expected_pos = Position(b['x'], b['y'], b['z'], b['facing'])
+                player_idx = self.game.player_positions.get(player_name)
+                expected_pos = self.seat_map.position(player_idx)
                 
                 # Teleport player to their block
                 if expected_pos:
-                    for u, pos in room_users:
-                        if u.username == player_name:
-                            await self.highrise.teleport(u.id, expected_pos)  # type: ignore
-                            break
+                    entry = self.presence.find(player_name)
+                    if entry:
+                        u, pos = entry
+                        moves.append((u.id, expected_pos))
+            await self.teleport_many(moves)
         except:
             pass
 
@@ -1671,126 +3608,112 @@ Setup commands (owner only):
         await asyncio.sleep(5)
 
         # The chosen_player NEVER changes - same player for entire game
-        chosen_username = self.guess_face_game.get("chosen_player")
+        chosen_username = self.game.chosen_player
         is_first_round = not chosen_username
         
         # If no chosen_player selected yet (first round), select one randomly
         if not chosen_username:
-            available_players = [p for p in self.guess_face_game["players"] 
-                               if p not in self.guess_face_game.get("excluded_players", set())]
+            available_players = self.game.remaining()
             if not available_players:
                 await self.highrise.chat("❌ No players available!")
-                self.guess_face_game["active"] = False
-                self.guess_face_game["players"] = []
+                self.game.end()
                 return
             # Ensure random selection from all available players across all rows
             chosen_username = random.choice(available_players)
-            self.guess_face_game["chosen_player"] = chosen_username
-            print(f"🎯 Randomly selected chooser: {chosen_username} from {len(available_players)} available players")
+            self.game.chosen_player = chosen_username
+            game_log.info("🎯 Randomly selected chooser: %s from %d available players", chosen_username, len(available_players))
             
             # Explain the game flow on first round
             await self.highrise.chat("📋 Game Rules:\n\n1️⃣ Chooser whispers a secret word\n2️⃣ Other players discuss and guess\n3️⃣ Up to 5 players go to danger zone\n4️⃣ Game continues until 1 player remains 🏆")
         
         # Check if chosen_player has been eliminated
-        if chosen_username in self.guess_face_game.get("excluded_players", set()):
+        if chosen_username in self.game.excluded_players:
             # Chooser was eliminated, select a new one randomly
-            available_players = [p for p in self.guess_face_game["players"] 
-                               if p not in self.guess_face_game.get("excluded_players", set())]
+            available_players = self.game.remaining()
             if not available_players:
                 await self.highrise.chat("❌ No available players! Game ended!")
-                self.guess_face_game["active"] = False
-                self.guess_face_game["players"] = []
+                self.game.end()
                 return
             
             # Pick a new chooser randomly
             chosen_username = random.choice(available_players)
-            self.guess_face_game["chosen_player"] = chosen_username
+            self.game.chosen_player = chosen_username
             await self.highrise.chat(f"🔄 Previous chooser eliminated! New chooser selected: @{chosen_username}")
         
-        self.guess_face_game["phase"] = "choosing"
-        self.guess_face_game["secret_word"] = None
-        self.guess_face_game["revealed_letters"] = set()
-        self.guess_face_game["votes"] = {}
-        self.guess_face_game["danger_zone_players"] = []
-        self.guess_face_game["chooser_timeout_time"] = datetime.now()
-
-        # Cancel any previous timeout task
-        if self.guess_face_game.get("chooser_timeout_task"):
-            self.guess_face_game["chooser_timeout_task"].cancel()
-        
-        # Start new timeout task (60 seconds)
-        self.guess_face_game["chooser_timeout_task"] = asyncio.create_task(
-            self._chooser_timeout_handler(chosen_username)
-        )
+        if not self.game.enter("choosing"):
+            return
+        self.game.secret_word = None
+        self.game.revealed_letters = set()
+        self.game.votes = {}
+        self.game.danger_zone_players = []
+        self.game.chooser_timeout_time = datetime.now()
+        word_chosen = self.game.await_word()
 
-        await self.highrise.chat(f"🎯 Round #{self.guess_face_game['round']}\n@{chosen_username} Choose a word! (⏰ 60 seconds)")
+        await self.highrise.chat(f"🎯 Round #{self.game.round}\n@{chosen_username} Choose a word! (⏰ {CHOOSER_TIMEOUT} seconds)")
 
         # Only teleport chooser to area if it's the first round or if chooser changed
         # In subsequent rounds, chooser stays in their position (chooser_pos)
-        if is_first_round or self.guess_face_game.get("previous_chooser") != chosen_username:
+        if is_first_round or self.game.previous_chooser != chosen_username:
             # Save chooser's original position before teleporting
             chooser_original_pos = None
-            room_users_resp = await self.highrise.get_room_users()
-            room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-            for u, pos in room_users:
-                if u.username == chosen_username:
-                    chooser_original_pos = {"x": pos.x, "y": pos.y, "z": pos.z, "facing": pos.facing}  # type: ignore
-                    break
+            entry = self.presence.find(chosen_username)
+            if entry:
+                u, pos = entry
+                chooser_original_pos = {"x": pos.x, "y": pos.y, "z": pos.z, "facing": pos.facing}  # type: ignore
             
-            self.guess_face_game["chooser_original_pos"] = chooser_original_pos
+            self.game.chooser_original_pos = chooser_original_pos
 
         # Teleport chooser to area if set
-        if "chooser_pos" in self.guess_face_game and self.guess_face_game["chooser_pos"]:
-            c = self.guess_face_game["chooser_pos"]
+        if self.game.layout.chooser_pos:
+            c = self.game.layout.chooser_pos
             # Get first block from blocks list (or use as direct position if old format)
             teleport_pos = c
             if "blocks" in c and c["blocks"]:
                 teleport_pos = c["blocks"][0]
             
             # Check if already there to avoid redundant teleport
-            room_users_resp = await self.highrise.get_room_users()
-            room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-            for u, pos in room_users:
-                if u.username == chosen_username:
-                    dx = pos.x - teleport_pos['x']  # type: ignore
-                    dz = pos.z - teleport_pos['z']  # type: ignore
-                    if (dx**2 + dz**2)**0.5 > 1.0:
-                        await self.highrise.teleport(u.id, Position(teleport_pos['x'], teleport_pos['y'], teleport_pos['z'], teleport_pos['facing']))  # type: ignore
-                    break
+            entry = self.presence.find(chosen_username)
+            if entry:
+                u, pos = entry
+                dx = pos.x - teleport_pos['x']  # type: ignore
+                dz = pos.z - teleport_pos['z']  # type: ignore
+                if (dx**2 + dz**2)**0.5 > 1.0:
+                    await self.highrise.teleport(u.id, Position(teleport_pos['x'], teleport_pos['y'], teleport_pos['z'], teleport_pos['facing']))  # type: ignore
         
         # Remember the current chooser for next round
-        self.guess_face_game["previous_chooser"] = chosen_username
-
-        # Wait for player to choose (indefinite wait - no time limit)
-        while not self.guess_face_game["secret_word"]:
-            await asyncio.sleep(1)
+        self.game.previous_chooser = chosen_username
+
+        # Wait for the chooser's whisper; the round continues the moment it arrives
+        done, _ = await asyncio.wait({word_chosen}, timeout=CHOOSER_TIMEOUT)
+        if not done:
+            if (self.game.phase == "choosing" and
+                self.game.chosen_player == chosen_username):
+                await self._chooser_timed_out(chosen_username)
+                return
+            # An owner handed the choice to someone else - no time limit for them
+            await asyncio.wait({word_chosen})
+        if word_chosen.cancelled():
+            return  # Round abandoned (game ended or chooser left)
 
         # Start discussion phase
         await self.discussion_phase()
 
-    async def _chooser_timeout_handler(self, chosen_player: str):
-        """Handle timeout if chooser doesn't whisper within 60 seconds"""
+    async def _chooser_timed_out(self, chosen_player: str):
+        """Eliminate a chooser who didn't whisper in time and move the game on"""
+        self.game.abandon_word_wait()
         try:
-            # Wait 60 seconds
-            await asyncio.sleep(60)
-            
-            # Check if we're still in choosing phase and same chooser
-            if (self.guess_face_game.get("phase") == "choosing" and 
-                self.guess_face_game.get("chosen_player") == chosen_player and
-                not self.guess_face_game.get("secret_word")):
-                
-                print(f"⏰ TIMEOUT: Chooser {chosen_player} didn't whisper in time!")
+            if not self.game.secret_word:
+                game_log.info("⏰ TIMEOUT: Chooser %s didn't whisper in time!", chosen_player)
                 
                 # Announce timeout
                 await self.highrise.chat(f"⏰ {chosen_player} didn't choose in time! Eliminated and selecting new chooser...")
                 
                 # Eliminate this chooser
-                self.guess_face_game["excluded_players"].add(chosen_player)
-                self.guess_face_game["chosen_player"] = None
+                self.game.excluded_players.add(chosen_player)
+                self.game.chosen_player = None
                 
                 # Check if only 1 player remains - they win!
-                remaining_players = [p for p in self.guess_face_game.get("players", []) 
-                                   if p not in self.guess_face_game.get("excluded_players", set())]
+                remaining_players = self.game.remaining()
                 
                 if len(remaining_players) == 1:
                     # Game ends, winner declared
@@ -1802,67 +3725,55 @@ Setup commands (owner only):
                     await asyncio.sleep(2)
                     
                     # Teleport winner to spawn position
-                    spawn_pos = self.guess_face_game.get("spawn_pos")
+                    spawn_pos = self.game.layout.spawn_pos
                     if spawn_pos:
                         try:
-                            room_users_resp = await self.highrise.get_room_users()
-                            room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                            for u, pos in room_users:
-                                if u.username == winner:
-                                    await self.highrise.teleport(u.id, Position(  # type: ignore
-                                        spawn_pos['x'], 
-                                        spawn_pos['y'], 
-                                        spawn_pos['z'], 
-                                        spawn_pos['facing']
-                                    ))
-                                    await self.highrise.chat(f"✅ Done move winner @{winner} to Spawn!")
-                                    break
+                            entry = self.presence.find(winner)
+                            if entry:
+                                u, pos = entry
+                                await self.highrise.teleport(u.id, Position(  # type: ignore
+                                    spawn_pos['x'], 
+                                    spawn_pos['y'], 
+                                    spawn_pos['z'], 
+                                    spawn_pos['facing']
+                                ))
+                                await self.highrise.chat(f"✅ Done move winner @{winner} to Spawn!")
                         except Exception as e:
-                            print(f"Error teleporting winner: {e}")
+                            game_log.warning("Error teleporting winner: %s", e)
                     
                     # Mark winner in stats
-                    if winner in self.user_stats:
-                        self.user_stats[winner]["games_won"] += 1
-                        # Auto distribute prize for final winner
-                        if self.guess_face_game.get("prize_active") and self.guess_face_game.get("prize_amount", 0) > 0:
-                            amount = self.guess_face_game["prize_amount"]
-                            try:
-                                # Find winner user_id
-                                winner_id = None
-                                room_users_resp = await self.highrise.get_room_users()
-                                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                                for u, pos in room_users:
-                                    if u.username == winner:
-                                        winner_id = u.id
-                                        break
+                    self.players.add_result(winner, won=1)
+                    # Auto distribute prize for final winner
+                    if self.game.prize_active and self.game.prize_amount > 0:
+                        amount = self.game.prize_amount
+                        try:
+                            # Find winner user_id
+                            winner_id = None
+                            entry = self.presence.find(winner)
+                            if entry:
+                                u, pos = entry
+                                winner_id = u.id
+                            
+                            if winner_id:
+                                # Tip amounts in Highrise are specific (1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+                                # We need to find the largest tip amount <= prize_amount
+                                possible_tips = [10000, 5000, 1000, 500, 100, 50, 10, 5, 1]
+                                remaining = amount
+                                for tip in possible_tips:
+                                    while remaining >= tip:
+                                        await self.highrise.tip_user(winner_id, f"gold_bar_{tip}")  # type: ignore
+                                        remaining -= tip
                                 
-                                if winner_id:
-                                    # Tip amounts in Highrise are specific (1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
-                                    # We need to find the largest tip amount <= prize_amount
-                                    possible_tips = [10000, 5000, 1000, 500, 100, 50, 10, 5, 1]
-                                    remaining = amount
-                                    for tip in possible_tips:
-                                        while remaining >= tip:
-                                            await self.highrise.tip_user(winner_id, f"gold_bar_{tip}")  # type: ignore
-                                            remaining -= tip
-                                    
-                                    await self.highrise.chat(f"🎁 Congratulations @{winner}! Prize of {amount} gold sent! 💰🏆")
-                                else:
-                                    await self.highrise.chat(f"⚠️ Could not find winner @{winner} to send prize.")
-                            except Exception as e:
-                                print(f"Error tipping winner: {e}")
-                                await self.highrise.chat(f"❌ Error sending gold to @{winner}. Check bot's gold balance.")
-                    self.save_user_stats()
+                                await self.highrise.chat(f"🎁 Congratulations @{winner}! Prize of {amount} gold sent! 💰🏆")
+                            else:
+                                await self.highrise.chat(f"⚠️ Could not find winner @{winner} to send prize.")
+                        except Exception as e:
+                            game_log.error("Error tipping winner: %s", e)
+                            await self.highrise.chat(f"❌ Error sending gold to @{winner}. Check bot's gold balance.")
+                    self.players.commit()
                     
                     # Reset game state
-                    self.guess_face_game["active"] = False
-                    self.guess_face_game["players"] = []
-                    self.guess_face_game["chosen_player"] = None
-                    self.guess_face_game["secret_word"] = None
-                    self.guess_face_game["phase"] = None
-                    self.guess_face_game["danger_zone_players"] = []
-                    self.guess_face_game["excluded_players"] = set()
-                    self.guess_face_game["game_ending"] = False
+                    self.game.end()
                     
                     # Ask to continue
                     await self.highrise.chat("🎮 New game? Type !join to start!")
@@ -1870,38 +3781,25 @@ Setup commands (owner only):
                     # Start a new round with a new chooser
                     await asyncio.sleep(2)
                     await self.start_new_round()
-        except asyncio.CancelledError:
-            # Timeout was cancelled (player whispered in time)
-            print(f"✅ Chooser {chosen_player} whispered in time, timeout cancelled")
-            pass
         except Exception as e:
-            print(f"❌ Error in chooser timeout handler: {e}")
+            game_log.exception("❌ Error in chooser timeout handler: %s", e)
 
-    async def discussion_phase(self):
-        secret = self.guess_face_game["secret_word"].lower()
-        word_display = self.get_word_display(secret)
-        
+    async def discussion_phase(self, keep_votes=False):
         # Set phase to discussion (allows voting during discussion)
-        self.guess_face_game["phase"] = "discussion"
-        self.guess_face_game["votes"] = {}  # Reset votes
-        
-        # Get eligible players (everyone except chooser and excluded)
-        eligible_players = [p for p in self.guess_face_game["players"] 
-                           if p != self.guess_face_game["chosen_player"] 
-                           and p not in self.guess_face_game.get("excluded_players", set())]
+        if not self.game.enter("discussion"):
+            return
+        secret = self.game.secret_word.lower()
+        word_display = self.get_word_display(secret)
+        if not keep_votes:  # A resumed round keeps the votes already cast
+            self.game.votes = {}
         
         # await self.highrise.chat("💬 DISCUSSION & VOTING TIME!\n\nBERLIN 6\nREYKJAVIK 5\nNEW YORK 4\nLONDON 3\nMOSCOW 2\nPARIS 1")
         
-        # Wait for all players to vote
+        # Wait for all players to vote; every vote or departure re-checks straight away
         while True:
-            # Only count players who are actually IN the game players list
-            game_players = self.guess_face_game.get("players", [])
-            votes_count = len([p for p in game_players if p in self.guess_face_game["votes"] and p != self.guess_face_game.get("chosen_player") and p not in self.guess_face_game.get("excluded_players", set())])
-            
             # Eligible players are those in game, not chooser, and not eliminated
-            eligible_players_in_game = [p for p in game_players 
-                                     if p != self.guess_face_game.get("chosen_player") 
-                                     and p not in self.guess_face_game.get("excluded_players", set())]
+            eligible_players_in_game = self.game.eligible()
+            votes_count = len([p for p in eligible_players_in_game if p in self.game.votes])
             
             # When all players in the game have voted
             if votes_count >= len(eligible_players_in_game) and len(eligible_players_in_game) > 0:
@@ -1909,9 +3807,7 @@ Setup commands (owner only):
                 break
             
             # Safety check: players still in room AND in game
-            room_users_resp = await self.highrise.get_room_users()
-            room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-            active_in_game = [p for p in eligible_players_in_game if any(u.username == p for u, _ in room_users)]
+            active_in_game = [p for p in eligible_players_in_game if p in self.presence]
             
             if votes_count >= len(active_in_game) and len(active_in_game) > 0:
                 await self.highrise.chat("✅ جميع players the متandاجدين صandتandا! اNoنتقthe  لDanger zone...")
@@ -1920,14 +3816,16 @@ Setup commands (owner only):
                 await self.highrise.chat("⚠️ No active game players left to vote. Moving on...")
                 break
                 
-            await asyncio.sleep(2)
+            await self.game.wait_for_change(2)
 
         # Immediately pull to danger zone
         await self.pull_to_danger_zone()
 
+    @timed("bot_game_step_seconds", "step")
     async def pull_to_danger_zone(self):
         # Set phase to voting (for voting in danger zone)
-        self.guess_face_game["phase"] = "voting"
+        if not self.game.enter("voting"):
+            return
         
         # Priority and limits for pulling players
         priority_config = {
@@ -1940,18 +3838,15 @@ Setup commands (owner only):
         }
         
         # The word that should be used for pulling is the secret word chosen by the chooser
-        secret_word = self.guess_face_game.get("secret_word", "").lower().strip()
+        secret_word = (self.game.secret_word or "").lower().strip()
         if not secret_word:
             await self.highrise.chat("❌ No secret word set! Round ended.")
             await self.end_round()
             return
 
         # Get all current votes
-        votes = self.guess_face_game.get("votes", {})
-        eligible_players = [p for p in self.guess_face_game["players"] 
-                           if p != self.guess_face_game["chosen_player"] 
-                           and p not in self.guess_face_game.get("excluded_players", set())
-                           and p not in self.guess_face_game.get("frozen_players", set())]
+        votes = self.game.votes
+        eligible_players = self.game.eligible(include_frozen=False)
         
         # Only pull players who voted for the secret word
         voters_for_secret = [p for p in eligible_players if votes.get(p) == secret_word]
@@ -1975,7 +3870,7 @@ Setup commands (owner only):
         import random
         danger_players = random.sample(eligible_players, min(len(eligible_players), limit))
             
-        self.guess_face_game["danger_zone_players"] = danger_players
+        self.game.danger_zone_players = danger_players
         
         if danger_players:
             # await self.highrise.chat(f"🎲 TIME'S UP! The secret word was {secret_word.upper()}!")
@@ -1986,105 +3881,59 @@ Setup commands (owner only):
             await self.highrise.chat(f"⚠️ Selected: {player_names}!")
             
             # Teleport all selected players to danger zone
-            danger_pos = self.guess_face_game.get("danger_pos")
-            player_positions = self.guess_face_game.get("player_positions", {})
+            danger_pos = self.game.layout.danger_pos
+            player_positions = self.game.player_positions
             if danger_pos:
                 try:
-                    room_users_resp = await self.highrise.get_room_users()
-                    room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                    
                     # Store original positions for all danger players
                     danger_original_positions = {}
+                    moves = []
                     
-                    for danger_player in danger_players:
+                    for p_danger_idx, danger_player in enumerate(danger_players):
                         # Find and save original position
                         danger_original_pos = None
                         if danger_player in player_positions:
-                            player_idx = player_positions[danger_player]
-                            rows = self.guess_face_game.get("rows", {})
-                            blocks = self.guess_face_game.get("blocks", {})
-                            
-                            # Try to find original position in rows
-                            if rows:
-                                current_count = 0
-                                for row_key in sorted(rows.keys(), key=lambda x: int(x) if isinstance(x, str) else x):
-                                    row = rows[row_key]
-                                    num_blocks = row.get("num_blocks", len(row.get("blocks", [])))
-                                    
-                                    if current_count + num_blocks > player_idx:
-                                        # Found the row
-                                        pos_in_row = player_idx - current_count
-                                        if "blocks" in row and pos_in_row < len(row["blocks"]):
-                                            block = row["blocks"][pos_in_row]
-                                            danger_original_pos = {
-                                                "x": block['x'],
-                                                "y": block['y'],
-                                                "z": block['z'],
-                                                "facing": block['facing']
-                                            }
-                                        break
-                                    current_count += num_blocks
-                            
-                            # Fallback to blocks
-                            if not danger_original_pos and (str(player_idx) in blocks or player_idx in blocks):
-                                b = blocks.get(player_idx) or blocks.get(str(player_idx))
-                                danger_original_pos = b
+                            block = self.seat_map.get(player_positions[danger_player])
+                            if block:
+                                danger_original_pos = {
+                                    "x": block['x'],
+                                    "y": block['y'],
+                                    "z": block['z'],
+                                    "facing": block['facing']
+                                }
                         
                         danger_original_positions[danger_player] = danger_original_pos
                         
                         # Teleport player to danger zone
-                        for u, pos in room_users:
-                            if u.username == danger_player:
-                                # Support both new rows format and old format
-                                teleport_pos = None
+                        entry = self.presence.find(danger_player)
+                        if entry:
+                            u, pos = entry
+                            # Support both new rows format and old format
+                            teleport_pos = None
                                 
-                                if "rows" in danger_pos:
-                                    # New format: distribute players across rows
-                                    p_danger_idx = danger_players.index(danger_player)
-                                    rows_danger = danger_pos["rows"]
-                                    row_keys = sorted(rows_danger.keys(), key=lambda x: int(x) if isinstance(x, str) else x)
-                                    
-                                    if row_keys:
-                                        # Calculate which row and position in row
-                                        current_pos = 0
-                                        found_pos = False
-                                        for row_key in row_keys:
-                                            row_data = rows_danger[row_key]
-                                            num_blocks = row_data.get("num_blocks", len(row_data.get("blocks", [])))
-                                            
-                                            if current_pos + num_blocks > p_danger_idx:
-                                                # This player goes in this row
-                                                pos_in_row = p_danger_idx - current_pos
-                                                if "blocks" in row_data and pos_in_row < len(row_data["blocks"]):
-                                                    teleport_pos = row_data["blocks"][pos_in_row]
-                                                    found_pos = True
-                                                break
-                                            current_pos += num_blocks
-                                        
-                                        # If for some reason we didn't find a spot in the rows, use the first block of the first row
-                                        if not found_pos and row_keys:
-                                            first_row = rows_danger[row_keys[0]]
-                                            if "blocks" in first_row and first_row["blocks"]:
-                                                teleport_pos = first_row["blocks"][0]
+                            if "rows" in danger_pos:
+                                # New format: distribute players across rows
+                                # If for some reason there's no spot in the rows, use the first block
+                                teleport_pos = self.danger_seat_map.get(p_danger_idx) or self.danger_seat_map.first()
                                 
-                                # Fallback to old format
-                                if not teleport_pos:
-                                    if "blocks" in danger_pos and danger_pos["blocks"]:
-                                        teleport_pos = danger_pos["blocks"][0]
-                                    else:
-                                        teleport_pos = danger_pos
+                            # Fallback to old format
+                            if not teleport_pos:
+                                if "blocks" in danger_pos and danger_pos["blocks"]:
+                                    teleport_pos = danger_pos["blocks"][0]
+                                else:
+                                    teleport_pos = danger_pos
                                 
-                                await self.highrise.teleport(u.id, Position(  # type: ignore
-                                    teleport_pos['x'], 
-                                    teleport_pos['y'], 
-                                    teleport_pos['z'], 
-                                    teleport_pos['facing']
-                                ))
-                                await asyncio.sleep(0.3)
-                                break
+                            moves.append((u.id, Position(
+                                teleport_pos['x'], 
+                                teleport_pos['y'], 
+                                teleport_pos['z'], 
+                                teleport_pos['facing']
+                            )))
+                    
+                    await self.teleport_many(moves)
                     
                     # Store original positions for all danger players
-                    self.guess_face_game["danger_original_positions"] = danger_original_positions
+                    self.game.danger_original_positions = danger_original_positions
                     await self.highrise.chat(f"📍 All {len(danger_players)} players are in the danger zone!")
                     await asyncio.sleep(1)
                     
@@ -2092,7 +3941,7 @@ Setup commands (owner only):
                     # await self.highrise.chat("🗳️ Vote now!\n\nBERLIN 6\nREYKJAVIK 5\nNEW YORK 4\nLONDON 3\nMOSCOW 2\nPARIS 1")
                     
                 except Exception as e:
-                    print(f"Error teleporting players to danger zone: {e}")
+                    game_log.warning("Error teleporting players to danger zone: %s", e)
         else:
             await self.highrise.chat(f"🎲 TIME'S UP! The secret word was {secret_word.upper()}!")
             await self.highrise.chat("ℹ️ No one guessed the secret word correctly.")
@@ -2103,26 +3952,26 @@ Setup commands (owner only):
         username = user.username
 
         # Check if user is excluded (eliminated from game)
-        if username in self.guess_face_game.get("excluded_players", set()):
+        if username in self.game.excluded_players:
             await self.highrise.chat(f"{username} ❌ You have been eliminated from the game!")
             return
 
-        if not self.guess_face_game["active"] or self.guess_face_game["phase"] != "discussion":
+        if not self.game.active or self.game.phase != "discussion":
             await self.highrise.chat(f"{username} There is no active game right now")
             return
 
-        if not self.guess_face_game["secret_word"]:
+        if not self.game.secret_word:
             return
 
-        secret = self.guess_face_game["secret_word"].lower()
-        unreveal_letters = [l for l in secret if l not in self.guess_face_game["revealed_letters"] and l.isalpha()]
+        secret = self.game.secret_word.lower()
+        unreveal_letters = [l for l in secret if l not in self.game.revealed_letters and l.isalpha()]
 
         if not unreveal_letters:
             await self.highrise.chat(f"{username} All letters have been revealed!")
             return
 
         hint_letter = random.choice(unreveal_letters)
-        self.guess_face_game["revealed_letters"].add(hint_letter)
+        self.game.revealed_letters.add(hint_letter)
 
         word_display = self.get_word_display(secret)
         await self.highrise.chat(f"💡 Hint: {word_display}")
@@ -2130,7 +3979,7 @@ Setup commands (owner only):
     def get_word_display(self, word: str) -> str:
         display = ""
         for letter in word:
-            if letter in self.guess_face_game["revealed_letters"]:
+            if letter in self.game.revealed_letters:
                 display += letter + " "
             elif letter.isalpha():
                 display += "_ "
@@ -2142,24 +3991,24 @@ Setup commands (owner only):
         username = user.username
         
         # Allowed words for voting
-        allowed_words = ["berlin", "reykjavik", "new york", "london", "moscow", "paris"]
+        allowed_words = CITIES
 
         # Check if user is excluded (eliminated from game)
-        if username in self.guess_face_game.get("excluded_players", set()):
+        if username in self.game.excluded_players:
             await self.highrise.send_whisper(user.id, "❌ You have been eliminated from the game!")
             return
 
         # Check if user is the chooser (can't vote)
-        if username == self.guess_face_game["chosen_player"]:
+        if username == self.game.chosen_player:
             await self.highrise.send_whisper(user.id, "You can't vote - you chose the word! 🚫")
             return
 
         # Check if user already voted
-        if username in self.guess_face_game["votes"]:
+        if username in self.game.votes:
             await self.highrise.send_whisper(user.id, "You already voted! 🗳️")
             return
 
-        if not self.guess_face_game["active"] or (self.guess_face_game["phase"] != "discussion" and self.guess_face_game["phase"] != "voting"):
+        if not self.game.active or (self.game.phase != "discussion" and self.game.phase != "voting"):
             await self.highrise.send_whisper(user.id, "There is no active game right now!")
             return
 
@@ -2173,34 +4022,33 @@ Setup commands (owner only):
                 await self.highrise.send_whisper(user.id, "Invalid vote! Allowed words: BERLIN, REYKJAVIK, NEW YORK, LONDON, MOSCOW, PARIS")
                 return
 
-            self.guess_face_game["votes"][username] = vote
+            self.game.record_vote(username, vote)
             # Announce publicly that a player voted
             await self.highrise.chat(f"✅ {username} voted for {vote.upper()}")
         except Exception as e:
             await self.highrise.send_whisper(user.id, f"Error recording vote: {str(e)[:50]}")
 
+    @timed("bot_game_step_seconds", "step")
     async def end_round(self):
         # Mark game as ending to prevent new joins during cleanup
-        self.guess_face_game["game_ending"] = True
+        self.game.game_ending = True
         
-        secret = self.guess_face_game["secret_word"]
+        secret = self.game.secret_word
 
         if not secret:
-            self.guess_face_game["active"] = False
-            self.guess_face_game["players"] = []
-            self.guess_face_game["excluded_players"] = set()
-            self.guess_face_game["game_ending"] = False
+            self.game.end()
             return
 
         # Count votes
         correct_votes = 0
         total_votes = 0
         correct_voters = []
-        danger_players = self.guess_face_game.get("danger_zone_players", [])
+        danger_players = self.game.danger_zone_players
+        in_danger = set(danger_players)
 
-        for voter, vote in self.guess_face_game["votes"].items():
+        for voter, vote in self.game.votes.items():
             # Skip danger zone players from regular voting count (already handled)
-            if voter in danger_players:
+            if voter in in_danger:
                 continue
                 
             total_votes += 1
@@ -2208,22 +4056,20 @@ Setup commands (owner only):
                 correct_votes += 1
                 correct_voters.append(voter)
                 # Update stats
-                self.user_stats[voter]["games_won"] += 1
-                self.user_stats[voter]["games_played"] += 1
+                self.players.add_result(voter, won=1, played=1)
 
         # Handle danger zone players results BEFORE announcing the answer
         if danger_players:
             # Wait longer to let everyone see the players in danger zone
             await asyncio.sleep(8)
             
-            danger_original_positions = self.guess_face_game.get("danger_original_positions", {})
-            room_users_resp = await self.highrise.get_room_users()
-            room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-            exit_pos = self.guess_face_game.get("exit_pos")
+            danger_original_positions = self.game.danger_original_positions
+            exit_pos = self.game.layout.exit_pos
+            moves = []
             
             for danger_player in danger_players:
-                if danger_player in self.guess_face_game["votes"]:
-                    danger_vote = self.guess_face_game["votes"][danger_player]
+                if danger_player in self.game.votes:
+                    danger_vote = self.game.votes[danger_player]
                     
                     if danger_vote == secret.lower():
                         # Correct guess - return to original position
@@ -2232,54 +4078,51 @@ Setup commands (owner only):
                         correct_votes += 1
                         correct_voters.append(danger_player)
                         # Update stats for danger player
-                        self.user_stats[danger_player]["games_won"] += 1
-                        self.user_stats[danger_player]["games_played"] += 1
+                        self.players.add_result(danger_player, won=1, played=1)
                         
                         # Teleport back to original position
                         danger_original_pos = danger_original_positions.get(danger_player)
                         if danger_original_pos:
-                            for u, pos in room_users:
-                                if u.username == danger_player:
-                                    await self.highrise.teleport(u.id, Position(  # type: ignore
-                                        danger_original_pos['x'], 
-                                        danger_original_pos['y'], 
-                                        danger_original_pos['z'], 
-                                        danger_original_pos['facing']
-                                    ))
-                                    break
+                            entry = self.presence.find(danger_player)
+                            if entry:
+                                u, pos = entry
+                                moves.append((u.id, Position(
+                                    danger_original_pos['x'], 
+                                    danger_original_pos['y'], 
+                                    danger_original_pos['z'], 
+                                    danger_original_pos['facing']
+                                )))
                     else:
                         # Wrong guess - move to exit
                         await self.highrise.chat(f"❌ {danger_player} WRONG! Moving to exit...")
                         # Update stats for danger player
-                        self.user_stats[danger_player]["games_played"] += 1
-                        self.user_stats[danger_player]["games_lost"] += 1
+                        self.players.add_result(danger_player, played=1, lost=1)
                         
                         # Add to excluded players
-                        if "excluded_players" not in self.guess_face_game:
-                            self.guess_face_game["excluded_players"] = set()
-                        self.guess_face_game["excluded_players"].add(danger_player)
+                        self.game.excluded_players.add(danger_player)
                         
                         # Teleport to exit if set
                         if exit_pos:
-                            for u, pos in room_users:
-                                if u.username == danger_player:
-                                    await self.highrise.teleport(u.id, Position(  # type: ignore
-                                        exit_pos['x'], 
-                                        exit_pos['y'], 
-                                        exit_pos['z'], 
-                                        exit_pos['facing']
-                                    ))
-                                    break
-                    
-                    await asyncio.sleep(0.5)
+                            entry = self.presence.find(danger_player)
+                            if entry:
+                                u, pos = entry
+                                moves.append((u.id, Position(
+                                    exit_pos['x'], 
+                                    exit_pos['y'], 
+                                    exit_pos['z'], 
+                                    exit_pos['facing']
+                                )))
+            
+            # Everyone's verdict is announced; move them all at once
+            await self.teleport_many(moves)
 
-        for player in self.guess_face_game["players"]:
-            if player not in self.guess_face_game["votes"]:
-                if player not in danger_players and player in self.user_stats:
-                    self.user_stats[player]["games_played"] += 1
-                    self.user_stats[player]["games_lost"] += 1
+        for player in self.game.players:
+            if player not in self.game.votes:
+                if player not in in_danger:
+                    self.players.add_result(player, played=1, lost=1)
 
-        self.save_user_stats()
+        # One batched write for every result of this round
+        self.players.commit()
 
         await asyncio.sleep(1)
 
@@ -2289,8 +4132,7 @@ Setup commands (owner only):
         await asyncio.sleep(3)
 
         # Check how many players are left (not excluded)
-        remaining_players = [p for p in self.guess_face_game["players"] 
-                           if p not in self.guess_face_game.get("excluded_players", set())]
+        remaining_players = self.game.remaining()
         
         # Debug: Show remaining players count
         await self.highrise.chat(f"📊 Remaining players: {len(remaining_players)} ({', '.join(remaining_players) if remaining_players else 'none'})")
@@ -2300,7 +4142,7 @@ Setup commands (owner only):
             winner = remaining_players[0]
             
             # Check if the last remaining player is the chooser
-            if winner == self.guess_face_game.get("chosen_player"):
+            if winner == self.game.chosen_player:
                 await self.highrise.chat("🏆🏆🏆 Game Over!")
                 await asyncio.sleep(1)
                 await self.highrise.chat(f"👑 The Chooser {winner} has defeated everyone! 👑")
@@ -2312,69 +4154,56 @@ Setup commands (owner only):
             await asyncio.sleep(2)
             
             # Teleport winner to spawn position
-            spawn_pos = self.guess_face_game.get("spawn_pos")
+            spawn_pos = self.game.layout.spawn_pos
             if spawn_pos:
                 try:
-                    room_users_resp = await self.highrise.get_room_users()
-                    room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                    for u, pos in room_users:
-                        if u.username == winner:
-                            await self.highrise.teleport(u.id, Position(  # type: ignore
-                                spawn_pos['x'], 
-                                spawn_pos['y'], 
-                                spawn_pos['z'], 
-                                spawn_pos['facing']
-                            ))
-                            await self.highrise.chat(f"✅ {winner} teleported to entrance!")
-                            break
+                    entry = self.presence.find(winner)
+                    if entry:
+                        u, pos = entry
+                        await self.highrise.teleport(u.id, Position(  # type: ignore
+                            spawn_pos['x'], 
+                            spawn_pos['y'], 
+                            spawn_pos['z'], 
+                            spawn_pos['facing']
+                        ))
+                        await self.highrise.chat(f"✅ {winner} teleported to entrance!")
                 except Exception as e:
-                    print(f"Error teleporting winner: {e}")
+                    game_log.warning("Error teleporting winner: %s", e)
             
             # Mark winner in stats
-            if winner in self.user_stats:
-                self.user_stats[winner]["games_won"] += 1
-                # Auto distribute prize for final winner
-                if self.guess_face_game.get("prize_active") and self.guess_face_game.get("prize_amount", 0) > 0:
-                    amount = self.guess_face_game["prize_amount"]
-                    try:
-                        # Find winner user_id
-                        winner_id = None
-                        room_users_resp = await self.highrise.get_room_users()
-                        room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                        for u, pos in room_users:
-                            if u.username == winner:
-                                winner_id = u.id
-                                break
+            self.players.add_result(winner, won=1)
+            # Auto distribute prize for final winner
+            if self.game.prize_active and self.game.prize_amount > 0:
+                amount = self.game.prize_amount
+                try:
+                    # Find winner user_id
+                    winner_id = None
+                    entry = self.presence.find(winner)
+                    if entry:
+                        u, pos = entry
+                        winner_id = u.id
+                    
+                    if winner_id:
+                        # Try to tip the user
+                        # Tip amounts in Highrise are specific (1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+                        # We need to find the largest tip amount <= prize_amount
+                        possible_tips = [10000, 5000, 1000, 500, 100, 50, 10, 5, 1]
+                        remaining = amount
+                        for tip in possible_tips:
+                            while remaining >= tip:
+                                await self.highrise.tip_user(winner_id, f"gold_bar_{tip}")  # type: ignore
+                                remaining -= tip
                         
-                        if winner_id:
-                            # Try to tip the user
-                            # Tip amounts in Highrise are specific (1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
-                            # We need to find the largest tip amount <= prize_amount
-                            possible_tips = [10000, 5000, 1000, 500, 100, 50, 10, 5, 1]
-                            remaining = amount
-                            for tip in possible_tips:
-                                while remaining >= tip:
-                                    await self.highrise.tip_user(winner_id, f"gold_bar_{tip}")  # type: ignore
-                                    remaining -= tip
-                            
-                            await self.highrise.chat(f"🎁 Congratulations {winner}! Sent {amount} real gold as prize! 💰🏆")
-                        else:
-                            await self.highrise.chat(f"⚠️ Could not find {winner} to send the prize.")
-                    except Exception as e:
-                        print(f"Error tipping winner: {e}")
-                        await self.highrise.chat(f"❌ Error while trying to send gold to {winner}. Make sure the bot has enough balance.")
-            self.save_user_stats()
+                        await self.highrise.chat(f"🎁 Congratulations {winner}! Sent {amount} real gold as prize! 💰🏆")
+                    else:
+                        await self.highrise.chat(f"⚠️ Could not find {winner} to send the prize.")
+                except Exception as e:
+                    game_log.error("Error tipping winner: %s", e)
+                    await self.highrise.chat(f"❌ Error while trying to send gold to {winner}. Make sure the bot has enough balance.")
+            self.players.commit()
             
             # Reset game state
-            self.guess_face_game["active"] = False
-            self.guess_face_game["players"] = []
-            self.guess_face_game["chosen_player"] = None
-            self.guess_face_game["secret_word"] = None
-            self.guess_face_game["phase"] = None
-            self.guess_face_game["danger_zone_players"] = []
-            self.guess_face_game["excluded_players"] = set()
-            self.guess_face_game["left_during_waiting"] = set()
-            self.guess_face_game["game_ending"] = False
+            self.game.end()
             
             # Ask to continue
             await self.highrise.chat("🎮 New game? Type !join to start!")
@@ -2389,34 +4218,32 @@ Setup commands (owner only):
             
             # Reset for next round but keep players and excluded list
             # NOTE: Do NOT reset chosen_player here - start_new_round() needs it to return previous chooser to their block!
-            self.guess_face_game["secret_word"] = None
-            self.guess_face_game["revealed_letters"] = set()
-            self.guess_face_game["votes"] = {}
-            self.guess_face_game["phase"] = None
-            self.guess_face_game["danger_zone_players"] = []
+            self.game.secret_word = None
+            self.game.revealed_letters = set()
+            self.game.votes = {}
+            self.game.enter(None)
+            self.game.danger_zone_players = []
             
             # Start new round (will return previous chooser to original block, then select new chooser)
             await self.start_new_round()
             return
         
         # No players left at all (shouldn't happen but handle it)
-        self.guess_face_game["active"] = False
-        self.guess_face_game["players"] = []
-        self.guess_face_game["excluded_players"] = set()
-        self.guess_face_game["game_ending"] = False
+        self.game.end()
 
     async def handle_leave_command(self, user: User):
         username = user.username
 
-        if username not in self.guess_face_game["players"]:
+        if username not in self.game.players:
             await self.highrise.send_whisper(user.id, "❌ You are not in the game!")
             return
 
         # Check if this player is the current chooser
-        is_chooser = self.guess_face_game.get("chosen_player") == username
-        phase = self.guess_face_game.get("phase")
+        is_chooser = self.game.chosen_player == username
+        phase = self.game.phase
 
-        self.guess_face_game["players"].remove(username)
+        self.game.players.discard(username)
+        self.game.notify()
         
         # If game is in waiting phase (hasn't started), player can rejoin later
         if phase == "waiting":
@@ -2425,32 +4252,31 @@ Setup commands (owner only):
             await self.highrise.send_whisper(user.id, "✅ You left the game. Type !join to rejoin anytime before the game starts!")
         # If game has started (beyond waiting phase), exclude player from rejoining
         elif phase:
-            self.guess_face_game["excluded_players"].add(username)
+            self.game.excluded_players.add(username)
             await self.highrise.chat(f"{username} left the game. Cannot rejoin once game has started! 👋")
             await self.highrise.send_whisper(user.id, "✅ You left the game.")
             
             # CRITICAL: If chooser leaves during choosing phase, we need to pick a new one
             if is_chooser and phase == "choosing":
-                print(f"⚠️ Chooser {username} left during choosing phase! Selecting replacement...")
+                game_log.info("⚠️ Chooser %s left during choosing phase! Selecting replacement...", username)
                 await self.highrise.chat(f"⚠️ Chooser @{username} has left! Selecting a replacement...")
                 
-                # Cancel timeout task
-                if self.guess_face_game.get("chooser_timeout_task"):
-                    self.guess_face_game["chooser_timeout_task"].cancel()
+                # Release the round waiting on them
+                self.game.abandon_word_wait()
                 
                 # Reset word and chooser
-                self.guess_face_game["secret_word"] = None
-                self.guess_face_game["chosen_player"] = None
+                self.game.secret_word = None
+                self.game.chosen_player = None
                 
                 # Trigger a new chooser selection by calling start_new_round logic part
                 # Wait a bit before starting new round logic
-                asyncio.create_task(self._handle_chooser_replacement())
+                self.drive_game(self._handle_chooser_replacement())
         else:
             await self.highrise.chat(f"{username} left the game 👋")
             await self.highrise.send_whisper(user.id, "✅ You left the game.")
         
         # Teleport back to spawn/entrance if set
-        spawn_pos = self.guess_face_game.get("spawn_pos")
+        spawn_pos = self.game.layout.spawn_pos
         if spawn_pos:
             try:
                 await self.highrise.teleport(user.id, Position(spawn_pos['x'], spawn_pos['y'], spawn_pos['z'], spawn_pos['facing']))  # type: ignore
@@ -2458,63 +4284,47 @@ Setup commands (owner only):
                 pass  # Ignore if teleport fails
         
         # Clear player position tracking
-        if username in self.guess_face_game.get("player_positions", {}):
-            del self.guess_face_game["player_positions"][username]
+        if username in self.game.player_positions:
+            del self.game.player_positions[username]
 
         # Check if only 1 player remains - they win!
-        if len(self.guess_face_game["players"]) == 1:
-            winner = self.guess_face_game["players"][0]
+        if len(self.game.players) == 1:
+            winner = next(iter(self.game.players))
             await self.highrise.chat(f"🏆 {winner} is the winner! 🎉")
             
             # Update winner stats
-            if winner in self.user_stats:
-                self.user_stats[winner]["games_won"] += 1
-                self.user_stats[winner]["games_played"] += 1
-            self.save_user_stats()
+            self.players.add_result(winner, won=1, played=1)
+            self.players.commit()
             
             # Reset game
-            self.guess_face_game["active"] = False
-            self.guess_face_game["players"] = []
-            self.guess_face_game["excluded_players"] = set()
-            self.guess_face_game["phase"] = None
+            self.game.end()
             
             # Teleport winner to exit if set
             try:
-                room_users = (await self.highrise.get_room_users()).content  # type: ignore
-                for u, pos in room_users:
-                    if u.username == winner:
-                        exit_pos = self.guess_face_game.get("exit_pos")
-                        if exit_pos:
-                            await self.highrise.teleport(u.id, Position(exit_pos['x'], exit_pos['y'], exit_pos['z'], exit_pos['facing']))  # type: ignore
-                        break
+                entry = self.presence.find(winner)
+                if entry:
+                    u, pos = entry
+                    exit_pos = self.game.layout.exit_pos
+                    if exit_pos:
+                        await self.highrise.teleport(u.id, Position(exit_pos['x'], exit_pos['y'], exit_pos['z'], exit_pos['facing']))  # type: ignore
             except:
                 pass
-        elif len(self.guess_face_game["players"]) == 0:
-            self.guess_face_game["active"] = False
-            self.guess_face_game["phase"] = None
+        elif len(self.game.players) == 0:
+            self.game.end()
 
     async def _handle_chooser_replacement(self):
         """Helper to replace chooser if they leave during choosing phase"""
         await asyncio.sleep(2)
-        if self.guess_face_game["active"]:
+        if self.game.active:
             await self.start_new_round()
 
     async def handle_stats_command(self, user: User, conversation_id: str = None):  # type: ignore
         username = user.username
-        stats = self.user_stats.get(username, {
-            "games_played": 0,
-            "games_won": 0,
-            "games_lost": 0,
-            "total_wagered": 0,
-            "total_won": 0,
-            "biggest_win": 0,
-            "join_date": datetime.now().isoformat(),
-            "last_seen": datetime.now().isoformat()
-        })
+        stats = await self.players.get_stats(username) or new_player_stats()
 
         win_rate = (stats["games_won"] / stats["games_played"] * 100) if stats["games_played"] > 0 else 0
 
-        msg = """📊 Your Stats:
+        msg = f"""📊 Your Stats:
 Games played: {stats['games_played']}
 Wins: {stats['games_won']}
 Losses: {stats['games_lost']}
@@ -2525,17 +4335,20 @@ Win rate: {win_rate:.1f}%"""
         else:
             await self.highrise.send_whisper(user.id, msg)
 
-    async def handle_ranklist_command(self, user: User):
-        # Get top 5 players by wins
-        sorted_players = sorted(
-            self.user_stats.items(),
-            key=lambda x: x[1].get("games_won", 0),
-            reverse=True
-        )[:5]
+    async def handle_ranklist_command(self, user: User, args: str = ""):
+        # !ranklist, !ranklist daily, !ranklist weekly
+        window = args.lower() or None
+        if window and window not in LEADERBOARD_WINDOWS:
+            await self.highrise.send_whisper(user.id, "Usage: !ranklist [daily|weekly]")
+            return
+        top_players = await self.players.top_players(5, window)
+        my_rank = await self.players.rank(user.username, window)
 
-        msg = "🏆 Top 5 Players:\n"
-        for i, (username, stats) in enumerate(sorted_players, 1):
-            msg += f"{i}. {username}: {stats.get('games_won', 0)} wins\n"
+        msg = {"daily": "🏆 Today's Top 5:\n", "weekly": "🏆 This Week's Top 5:\n"}.get(window, "🏆 Top 5 Players:\n")
+        for i, (username, games_won) in enumerate(top_players, 1):
+            msg += f"{i}. {username}: {games_won} wins\n"
+        if my_rank:
+            msg += f"📍 You: #{my_rank[0]} with {my_rank[1]} wins"
 
         await self.highrise.send_whisper(user.id, msg)
 
@@ -2587,21 +4400,19 @@ Win rate: {win_rate:.1f}%"""
                         await self.highrise.send_message(target_conv, chunk)
                     except:
                         pass
-                    await asyncio.sleep(0.3)
                 
                 # Inform about the DM if triggered from public chat
                 if not conversation_id: 
                     await self.highrise.send_whisper(user.id, "📩 I've sent the commands to your DMs!")
-                print(f"✅ Commands sent to @{user.username} via DM")
+                room_log.debug("✅ Commands sent to @%s via DM", user.username)
             else:
                 # Fallback to whisper if no DM channel exists
                 chunks = split_message(commands_text, 200)
                 for chunk in chunks:
-                    await self.highrise.send_whisper(user.id, chunk)
-                    await asyncio.sleep(0.3)
+                    await self.highrise.send_whisper(user.id, chunk, lane="bulk")
                 await self.highrise.send_whisper(user.id, "💡 Note: DM me first for a cleaner commands list!")
         except Exception as e:
-            print(f"Error sending commands: {e}")
+            room_log.warning("Error sending commands: %s", e)
             await self.highrise.send_whisper(user.id, "⚠️ Error sending commands. Please try again.")
 
     async def handle_help_command(self, user: User, conversation_id: str = None):  # type: ignore
@@ -2657,29 +4468,24 @@ Good luck! 🍀"""
             if conversation_id:
                 await self.highrise.send_message(conversation_id, chunk)
             else:
-                await self.highrise.send_whisper(user.id, chunk)
-            await asyncio.sleep(0.3)
+                await self.highrise.send_whisper(user.id, chunk, lane="bulk")
 
-    async def equip_user(self, user: User, message: str):
+    async def equip_user(self, user: User, target_username: str):
         try:
-            parts = message.split(" ")
-            if len(parts) < 2:
+            if not target_username:
                 await self.highrise.send_whisper(user.id, "Usage: eq @username")
                 return
 
-            target_username = parts[1].replace("@", "")
             target_id = None
             target_outfit = None
 
             try:
-                room_users_resp = await self.highrise.get_room_users()
-                room_users = room_users_resp.content if hasattr(room_users_resp, 'content') else []  # type: ignore
-                for u, pos in room_users:
-                    if u.username.lower() == target_username.lower():
-                        target_id = u.id
-                        break
+                entry = self.presence.find(target_username)
+                if entry:
+                    u, pos = entry
+                    target_id = u.id
             except Exception as e:
-                print(f"Error searching room: {e}")
+                api_log.warning("Error searching room: %s", e)
 
             if target_id is None:
                 await self.highrise.chat(f"Searching for @{target_username}...")
@@ -2690,37 +4496,18 @@ Good luck! 🍀"""
                     return
 
             try:
-                api_url = f"https://webapi.highrise.game/users/{target_id}"
-                response = requests.get(api_url, timeout=10)
-
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("user") and data["user"].get("outfit"):
-                        api_outfit = data["user"]["outfit"]
-                        print(f"Found {len(api_outfit)} outfit items")
-                        target_outfit = []
-                        for item in api_outfit:
-                            item_id = item.get("item_id", item.get("id", ""))
-                            if item_id:
-                                target_outfit.append(Item(
-                                    type='clothing',
-                                    amount=1,
-                                    id=item_id,
-                                    account_bound=False,
-                                    active_palette=item.get("active_palette", -1)
-                                ))
-                        print(f"Converted {len(target_outfit)} items for outfit")
-                else:
-                    print(f"Web API error: {response.status_code}")
+                target_outfit = await self.outfits.get(target_id)
             except Exception as e:
-                print(f"Web API error: {e}")
+                api_log.warning("Web API error: %s", e)
 
             if not target_outfit:
                 try:
                     outfit_response = await self.highrise.get_user_outfit(target_id)
                     target_outfit = outfit_response.outfit if hasattr(outfit_response, 'outfit') else None  # type: ignore
+                    if target_outfit:
+                        self.outfits.put(target_id, target_outfit)
                 except Exception as e:
-                    print(f"get_user_outfit error: {e}")
+                    api_log.warning("get_user_outfit error: %s", e)
                     await self.highrise.chat("Could not get user's outfit")
                     return
 
@@ -2729,54 +4516,34 @@ Good luck! 🍀"""
                 return
 
             try:
-                print(f"Applying outfit with {len(target_outfit)} items...")
+                api_log.debug("Applying outfit with %d items...", len(target_outfit))
                 await self.highrise.set_outfit(target_outfit)
-                print("Outfit applied successfully!")
+                api_log.debug("Outfit applied successfully!")
                 await self.highrise.chat(f"Copied @{target_username}'s outfit!")
             except Exception as outfit_error:
                 error_msg = str(outfit_error)
-                print(f"Outfit apply error: {error_msg}")
+                api_log.warning("Outfit apply error: %s", error_msg)
                 if "not owned" in error_msg.lower() or "item" in error_msg.lower():
                     await self.highrise.chat(f"Bot doesn't own some items from @{target_username}'s outfit")
                 else:
                     await self.highrise.chat(f"Error applying outfit: {error_msg[:100]}")
 
         except Exception as e:
-            print(f"Equip error: {e}")
+            api_log.exception("Equip error: %s", e)
             await self.highrise.chat("Error executing command")
 
     async def get_user_id_by_username(self, username: str) -> str | None:  # type: ignore
-        try:
-            api_url = f"https://create.highrise.game/api/users?username={username}"
-            response = requests.get(api_url, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-                users_list = data.get("users", [])
-                if users_list and len(users_list) > 0:
-                    user_data = users_list[0]
-                    user_id = user_data.get("user_id")
-                    real_username = user_data.get("username", username)
-                    if user_id:
-                        print(f"API: Found {real_username} -> {user_id}")
-                        return user_id
-                else:
-                    print(f"API: User '{username}' not found")
-            else:
-                print(f"API error: {response.status_code}")
-        except Exception as e:
-            print(f"API request failed: {e}")
-
-        return None
+        return await self.resolver.resolve(username)
 
-    async def send_invite_to_room(self, user: User, conversation_id: str | None = None) -> None:  # type: ignore
-        """Send a room invite to the user via WebAPI using the native 'invite' message type"""
+    async def send_invite_to_room(self, user: User, conversation_id: str | None = None,
+                                  room_id: str | None = None) -> bool:  # type: ignore
+        """Send a room invite to the user via WebAPI using the native 'invite' message type; True once delivered"""
         try:
             if not user.id or not isinstance(user.id, str):
-                print(f"❌ Invalid user ID for {user.username}: {user.id}")
-                return
+                invite_log.warning("❌ Invalid user ID for %s: %s", user.username, user.id)
+                return False
 
-            room_id = self.room_id or os.getenv("HIGHRISE_ROOM_ID", "665339cebb0667c76e14c27d")
+            room_id = room_id or self.room_id or os.getenv("HIGHRISE_ROOM_ID", "665339cebb0667c76e14c27d")
             
             # Select conversation ID
             conv_id = conversation_id or self.user_conversations.get(user.id)
@@ -2790,18 +4557,21 @@ Good luck! 🍀"""
                         "invite",
                         room_id
                     )
-                    print(f"✅ Native invite sent to @{user.username}!")
+                    invite_log.debug("✅ Native invite sent to @%s!", user.username)
+                    return True
                 except Exception as e:
-                    print(f"⚠️ Native invite failed, falling back to link: {e}")
+                    invite_log.info("⚠️ Native invite failed, falling back to link: %s", e)
                     invite_link = f"https://webapi.highrise.game/rooms/{room_id}"
                     try:
                         await self.highrise.send_message(conv_id, f"💌 Join my room! 🎮\n{invite_link}")
+                        return True
                     except:
                         pass
             else:
-                print(f"❌ Could not send invite to @{user.username} - no conversation found")
+                invite_log.info("❌ Could not send invite to @%s - no conversation found", user.username)
         except Exception as e:
-            print(f"❌ Error in send_invite_to_room: {e}")
+            invite_log.exception("❌ Error in send_invite_to_room: %s", e)
+        return False
 
     async def is_owner(self, user: User) -> bool:
         if not user or not user.username:
@@ -2809,152 +4579,94 @@ Good luck! 🍀"""
         return user.username.lower() in [name.lower() for name in self.owner_usernames if name]
 
     async def save_data_periodically(self):
-        """Protected periodic save loop with error recovery"""
+        """Checkpoint driver - folds the journal into the JSON files once it grows or ages"""
         while True:
             try:
-                await asyncio.sleep(300)
-                self.save_all_data()
-            except Exception as e:
-                print(f"Save data error: {e}")
-                try:
+                await asyncio.sleep(5)
+                self.players.commit()
+                if self.journal.should_checkpoint():
                     self.save_all_data()
-                except:
-                    pass
+            except Exception as e:
+                persist_log.exception("Save data error: %s", e)
                 await asyncio.sleep(10)
 
     def save_all_data(self):
-        self.save_credits()
-        self.save_balances()
-        self.save_user_stats()
-        self.save_daily_rewards()
-        self.save_game_config()
-        self.save_allowed_whispers()
-        self.save_vips()
-        self.save_users_messaged_bot()
-        self.save_user_conversations()
-        self.save_room_id()
-        self.save_invited_users()
-
-    def save_balances(self):
-        with open("balances.json", "w") as f:
-            json.dump(self.balances, f)
-
-    def load_balances(self):
-        try:
-            with open("balances.json", "r") as f:
-                data = f.read().strip()
-                if not data:
-                    return {}
-                return json.loads(data)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
-
-    def save_credits(self):
-        with open("credits.json", "w") as f:
-            json.dump(self.credits, f)
-
-    def load_credits(self):
-        try:
-            with open("credits.json", "r") as f:
-                data = f.read().strip()
-                if not data:
-                    return {}
-                return json.loads(data)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
-
-    def save_user_stats(self):
-        with open("user_stats.json", "w") as f:
-            json.dump(self.user_stats, f)
-
-    def load_user_stats(self):
-        try:
-            with open("user_stats.json", "r") as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+        """Checkpoint every file with journaled changes"""
+        self.shared.save_all()
+
+    async def flush_data(self):
+        """Checkpoint and wait until every queued write is on disk"""
+        self.save_all_data()
+        await self.writer.flush()
+
+    def stop(self):
+        """Cancel this bot's background work; stores, caches and the game itself are kept"""
+        self.connected_since = None
+        self.game.stop_driver()
+        for task in [*self.background.values(), self.invite_campaign, self.block_lock_sweep]:
+            if task and not task.done():
+                task.cancel()
+
+    def prepare_reconnect(self):
+        """Warm restart: keep the loaded stores, caches and game, drop what belonged to the old connection.
+
+        The game goes through snapshot()/restore() into a fresh GuessFaceGame, so
+        its driver task, word future and change event - all bound to the old
+        event loop - are left behind; on_start resumes the round from its phase.
+        """
+        self.stop()
+        self.background = {}
+        self.invite_campaign = None
+        self.block_lock_sweep = None
+        state = self.game.snapshot()
+        self.game = GuessFaceGame(self.game.layout)
+        self.game.restore(state)
+
+    def close(self):
+        """Flush everything synchronously once the event loop has stopped"""
+        METRICS.unregister(("outbox", self.data_dir))
+        if self.owns_shared:
+            self.shared.close()
+
+
+    def _save_json(self, filename, data):
+        """Queue a full rewrite of one JSON file on the background writer, serialized now while data can't change"""
+        self.writer.submit(filename, write_json_text, filename, json.dumps(data))
 
     def save_daily_rewards(self):
-        with open("daily_rewards.json", "w") as f:
-            json.dump(self.daily_rewards, f)
+        self._save_json(self.data_path("daily_rewards.json"), self.daily_rewards)
 
     def load_daily_rewards(self):
-        try:
-            with open("daily_rewards.json", "r") as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
-
-    def save_allowed_whispers(self):
-        with open("allowed_whispers.json", "w") as f:
-            json.dump(list(self.allowed_whispers), f)
+        return read_json_file(self.data_path("daily_rewards.json"), {}) or {}
 
     def load_allowed_whispers(self):
-        try:
-            with open("allowed_whispers.json", "r") as f:
-                data = json.load(f)
-                return set(data) if data else set()
-        except (FileNotFoundError, json.JSONDecodeError):
-            return set()
-
-    def save_vips(self):
-        with open("vips.json", "w") as f:
-            json.dump(list(self.vips), f)
+        return set(read_json_file(self.data_path("allowed_whispers.json"), []) or [])
 
     def load_vips(self):
-        try:
-            with open("vips.json", "r") as f:
-                data = json.load(f)
-                return set(data) if data else set()
-        except (FileNotFoundError, json.JSONDecodeError):
-            return set()
-    
-    def save_users_messaged_bot(self):
-        with open("users_messaged_bot.json", "w") as f:
-            json.dump(list(self.users_messaged_bot), f)
+        return set(read_json_file(self.data_path("vips.json"), []) or [])
     
     def load_users_messaged_bot(self):
-        try:
-            with open("users_messaged_bot.json", "r") as f:
-                data = json.load(f)
-                return set(data) if data else set()
-        except (FileNotFoundError, json.JSONDecodeError):
-            return set()
-    
-    def save_user_conversations(self):
-        with open("user_conversations.json", "w") as f:
-            json.dump(self.user_conversations, f)
+        return set(read_json_file(self.data_path("users_messaged_bot.json"), []) or [])
     
     def load_user_conversations(self):
-        try:
-            with open("user_conversations.json", "r") as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+        return read_json_file(self.data_path("user_conversations.json"), {}) or {}
     
     def save_room_id(self):
-        with open("room_id.json", "w") as f:
-            json.dump({"room_id": self.current_room_id}, f)
+        self._save_json(self.data_path("room_id.json"), {"room_id": self.current_room_id})
     
     def load_room_id(self):
-        try:
-            with open("room_id.json", "r") as f:
-                data = json.load(f)
-                return data.get("room_id", os.getenv("HIGHRISE_ROOM_ID", "665339cebb0667c76e14c27d"))
-        except (FileNotFoundError, json.JSONDecodeError):
-            return os.getenv("HIGHRISE_ROOM_ID", "665339cebb0667c76e14c27d")
+        data = read_json_file(self.data_path("room_id.json"), {}) or {}
+        return data.get("room_id", os.getenv("HIGHRISE_ROOM_ID", "665339cebb0667c76e14c27d"))
     
     def save_invited_users(self):
-        with open("invited_users.json", "w") as f:
-            json.dump(list(self.invited_users), f)
+        self._save_json(self.data_path("invited_users.json"), self.invited_users)
     
     def load_invited_users(self):
-        try:
-            with open("invited_users.json", "r") as f:
-                data = json.load(f)
-                return set(data) if data else set()
-        except (FileNotFoundError, json.JSONDecodeError):
-            return set()
+        data = read_json_file(self.data_path("invited_users.json"), {}) or {}
+        if isinstance(data, list):
+            # Old format: bare list of user ids, room and outcome unknown
+            return {user_id: {"room": None, "status": "sent", "at": 0} for user_id in data}
+        return data
     
     async def is_vip(self, user: User) -> bool:
         # Check if the user is a room moderator
@@ -2965,21 +4677,86 @@ Good luck! 🍀"""
                 return False
             return user.username in self.vips or await self.is_owner(user)
         except Exception as e:
-            print(f"Error in is_vip for {getattr(user, 'username', 'unknown')}: {e}")
+            room_log.warning("Error in is_vip for %s: %s", getattr(user, "username", "unknown"), e)
             return False
 
 
-class WebServer():
-    def __init__(self):
-        self.app = Flask(__name__)
-        @self.app.route('/')
-        def index() -> str:
-            return "Guess Face Game Bot is running!"
-    def run(self) -> None:
-        self.app.run(host='0.0.0.0', port=3000)
-    def keep_alive(self):
-        t = Thread(target=self.run)
-        t.start()
+def _json_default(value):
+    """json.dumps fallback for the status views: sets, Rosters, SDK positions, datetimes"""
+    if isinstance(value, (set, Roster)):
+        return list(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if attrs.has(type(value)):
+        return attrs.asdict(value)
+    return str(value)
+
+class StatusServer:
+    """Keep-alive page, /health, /metrics and read-only /game and /presence views.
+
+    Served by aiohttp from the bots' own event loop, so it needs no thread of
+    its own. Every view is built synchronously from state the handlers already
+    keep - no await in the middle - so it is consistent without any lock
+    shared with the game.
+    """
+
+    def __init__(self, bots, host="0.0.0.0", port=STATUS_PORT):
+        self.bots = bots  # room name -> Mybot
+        self.host = host
+        self.port = port
+        self.started = time.time()
+        self._runner = None
+        self.app = web.Application()
+        self.app.router.add_get("/", self.index)
+        self.app.router.add_get("/health", self.health)
+        self.app.router.add_get("/metrics", self.metrics)
+        self.app.router.add_get("/game", self.game)
+        self.app.router.add_get("/presence", self.presence)
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            # The bot runs fine without its status page
+            runtime_log.warning("⚠️ Status server could not listen on port %d: %s", self.port, e)
+            await self.stop()
+            return
+        runtime_log.info("🌐 Status server listening on port %d", self.port)
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @staticmethod
+    def _json(data, status=200):
+        return web.json_response(data, status=status, dumps=partial(json.dumps, default=_json_default))
+
+    async def index(self, request):
+        return web.Response(text="Guess Face Game Bot is running!")
+
+    async def health(self, request):
+        now = time.time()
+        rooms = {name: bot.health(now) for name, bot in self.bots.items()}
+        healthy = all(room["connected"] for room in rooms.values())
+        return self._json({
+            "status": "ok" if healthy else "degraded",
+            "uptime": round(now - self.started, 1),
+            "loop_lag": {{0.5: "p50", 0.9: "p90", 0.99: "p99", 1: "max"}[q]: round(lag, 4)
+                         for q, lag in WATCHDOG.summary().items()},
+            "rooms": rooms,
+        }, status=200 if healthy else 503)
+
+    async def metrics(self, request):
+        return web.Response(text=METRICS.render(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    async def game(self, request):
+        return self._json({name: bot.game_view() for name, bot in self.bots.items()})
+
+    async def presence(self, request):
+        return self._json({name: bot.presence_view() for name, bot in self.bots.items()})
 
 
 class RunBot():
@@ -2992,28 +4769,53 @@ class RunBot():
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = 999999  # Infinite retries
         self.reconnect_delay = 5
-        self.definitions = [
-            BotDefinition(  # type: ignore
-                getattr(import_module(self.bot_file), self.bot_class)(),
-                self.room_id, self.bot_token)
-        ]
+
+    def bot_factory(self):
+        """The configured bot class. Run as a script this file is __main__, and importing bot_file would load a
+        second copy with its own METRICS, WATCHDOG and classes that the status server never sees; reuse this one"""
+        if self.bot_file == os.path.splitext(os.path.basename(__file__))[0]:
+            return getattr(sys.modules[__name__], self.bot_class)
+        return getattr(import_module(self.bot_file), self.bot_class)
+
+    async def serve(self, definitions, bot_instance) -> None:
+        status = StatusServer({self.room_id: bot_instance})
+        await status.start()
+        try:
+            await main(definitions)  # type: ignore
+        finally:
+            bot_instance.connected_since = None
+            await status.stop()
+            # Pooled HTTP connections belong to this loop; close them before it goes away
+            await bot_instance.http.close()
 
     def run_loop(self) -> None:
         """Main bot loop with auto-recovery and reconnection handling"""
+        rooms = load_rooms()
+        if rooms:
+            self.run_rooms(rooms)
+            return
+        bot_instance = None
         while True:
             try:
                 self.reconnect_attempts = 0
-                print("[BOT] Starting bot connection...")
-                # Use a fresh bot instance on each connection attempt to reset state
-                bot_instance = getattr(import_module(self.bot_file), self.bot_class)()
+                runtime_log.info("[BOT] Starting bot connection...")
+                if bot_instance is None:
+                    bot_instance = self.bot_factory()(room_id=self.room_id)
+                else:
+                    # Warm restart: same stores, caches and game, new event loop
+                    bot_instance.shared.reset_loop()
+                    bot_instance.prepare_reconnect()
                 definitions = [BotDefinition(bot_instance, self.room_id, self.bot_token)]  # type: ignore
-                arun(main(definitions))  # type: ignore
+                try:
+                    arun(self.serve(definitions, bot_instance))  # type: ignore
+                finally:
+                    # Writes queued on the old event loop must land before the next one starts
+                    bot_instance.save_all_data()
+            except LedgerLocked:
+                raise
             except Exception as e:
                 self.reconnect_attempts += 1
-                import traceback
-                print(f"[BOT] Connection lost (attempt {self.reconnect_attempts}):")
-                print(f"[BOT] Error: {e}")
-                traceback.print_exc()
+                runtime_log.exception("[BOT] Connection lost (attempt %d): %s", self.reconnect_attempts, e)
 
                 # Reset counter to avoid overflow after 1000 attempts
                 if self.reconnect_attempts > 1000:
@@ -3021,13 +4823,71 @@ class RunBot():
 
                 # Progressive backoff: start at 5s, max 30s
                 delay = min(self.reconnect_delay * (2 ** min(self.reconnect_attempts - 1, 3)), 30)
-                print(f"[BOT] Reconnecting in {delay}s...")
+                runtime_log.info("[BOT] Reconnecting in %ss...", delay)
                 time.sleep(delay)
             except KeyboardInterrupt:
-                print("[BOT] Bot stopped by user")
+                runtime_log.info("[BOT] Bot stopped by user")
                 break
+        if bot_instance is not None:
+            bot_instance.close()
+
+
+    def run_rooms(self, rooms) -> None:
+        """Run every room from the rooms config in one event loop, sharing the ledger, caches and HTTP pool"""
+        shared = SharedServices()
+        # Build every room before replaying the journal - it holds records for all of them
+        bot_class = self.bot_factory()
+        bots = [bot_class(shared, room["data_dir"], room["room_id"]) for room in rooms]
+        shared.open()
+        runtime_log.info("[BOT] Starting %d rooms: %s", len(rooms), ", ".join(room["name"] for room in rooms))
+        try:
+            arun(self.serve_rooms(shared, rooms, bots))  # type: ignore
+        except KeyboardInterrupt:
+            runtime_log.info("[BOT] Bot stopped by user")
+        finally:
+            for bot in bots:
+                bot.close()
+            shared.close()
+
+    async def serve_rooms(self, shared, rooms, bots) -> None:
+        status = StatusServer({room["name"]: bot for room, bot in zip(rooms, bots)})
+        await status.start()
+        try:
+            await asyncio.gather(*(self.serve_room(shared, room, bot, i) for i, (room, bot) in enumerate(zip(rooms, bots))))
+        finally:
+            await status.stop()
+            await shared.http.close()
+
+    async def serve_room(self, shared, room, bot, index) -> None:
+        """Keep one room connected; a failure reconnects only that room, keeping its bot's state"""
+        await asyncio.sleep(index)  # Stagger the connections, as the SDK does
+        attempts = 0
+        while True:
+            try:
+                runtime_log.info("[BOT] %s: starting bot connection...", room["name"])
+                await main([BotDefinition(bot, room["room_id"], room["token"])])  # type: ignore
+            except Exception as e:
+                attempts = attempts + 1 if attempts < 1000 else 1
+                runtime_log.warning("[BOT] %s: connection lost (attempt %d): %s", room["name"], attempts, e)
+            bot.stop()  # No game flow may run while the room is offline
+            delay = min(self.reconnect_delay * (2 ** min(max(attempts, 1) - 1, 3)), 30)
+            runtime_log.info("[BOT] %s: reconnecting in %ss...", room["name"], delay)
+            await asyncio.sleep(delay)
+            bot.prepare_reconnect()
 
 
 if __name__ == "__main__":
-    WebServer().keep_alive()
-    RunBot().run_loop()
\ No newline at end of file
+    setup_logging()
+    if sys.argv[1:2] == ["migrate-players"]:
+        # One-shot: python main.py migrate-players [players.db]
+        db_path = sys.argv[2] if len(sys.argv) > 2 else os.getenv("PLAYER_DB", "players.db")
+        conn = sqlite3.connect(db_path)
+        conn.executescript(PLAYERS_SCHEMA)
+        migrate_json_players(conn)
+        conn.close()
+        sys.exit(0)
+    try:
+        RunBot().run_loop()
+    except LedgerLocked as e:
+        runtime_log.error("❌ %s", e)
+        sys.exit(1)
\ No newline at end of file
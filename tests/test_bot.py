@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+from highrise.models import RoomInfo, SessionMetadata
+from highrise.webapi import WebAPI
+
+from main import Mybot, read_json_file
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bot = Mybot()
+    yield bot
+    bot.close()
+
+
+def test_the_sdk_can_hand_the_bot_its_webapi_client(bot):
+    # What highrise.__main__.bot_runner does on every connect
+    webapi = WebAPI()
+    bot.webapi = webapi
+
+    assert bot.webapi is webapi
+
+
+def test_the_webapi_client_is_created_on_first_use(bot):
+    assert isinstance(bot.webapi, WebAPI)
+    assert bot.webapi is bot.webapi
+
+
+class FakeHighrise:
+    def __init__(self):
+        self.said = []
+
+    async def chat(self, message):
+        self.said.append(message)
+
+    async def get_room_users(self):
+        return None
+
+
+def test_on_start_keeps_the_room_the_bot_connected_to(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("HIGHRISE_ROOM_ID", "env-room")
+    bot = Mybot(data_dir="rooms/a", room_id="room-a")
+    bot.highrise = FakeHighrise()
+    # The SDK's RoomInfo names the room but carries no room ID
+    metadata = SessionMetadata(user_id="bot-id", room_info=RoomInfo(owner_id="owner-id", room_name="A"),
+                               rate_limits={}, connection_id="conn", sdk_version=None)
+
+    async def connect():
+        await bot.on_start(metadata)
+        bot.stop()
+
+    asyncio.run(connect())
+    bot.close()
+
+    assert bot.room_id == bot.current_room_id == "room-a"
+    assert read_json_file("rooms/a/room_id.json") == {"room_id": "room-a"}
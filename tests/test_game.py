@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from main import GuessFaceGame
+
+
+def test_a_round_walks_through_every_phase():
+    game = GuessFaceGame()
+    for phase in ("waiting", "choosing", "discussion", "voting"):
+        assert game.enter(phase)
+        assert game.phase == phase
+    assert game.enter(None)
+    assert game.phase is None
+
+
+@pytest.mark.parametrize("current, refused", [
+    (None, "discussion"),
+    ("waiting", "voting"),
+    ("choosing", "voting"),
+    ("discussion", "discussion"),
+    ("voting", "discussion"),
+    ("voting", "waiting"),
+])
+def test_out_of_order_phase_changes_are_refused(current, refused):
+    game = GuessFaceGame()
+    game.phase = current
+
+    assert not game.can_enter(refused)
+    assert not game.enter(refused)
+    assert game.phase == current
+
+
+def test_the_chooser_can_time_out_back_to_waiting():
+    game = GuessFaceGame()
+    game.phase = "choosing"
+
+    assert game.enter("waiting")
+    assert game.enter("choosing")
+
+
+def test_a_new_round_abandons_the_old_word_wait():
+    async def run():
+        game = GuessFaceGame()
+        stale = game.await_word()
+        fresh = game.await_word()
+        assert stale.cancelled()
+        assert game.choose_word("apple")
+        assert await fresh == "apple"
+        assert not game.choose_word("pear")  # Nobody is waiting any more
+        assert game.secret_word == "pear"
+
+    asyncio.run(run())
+
+
+def test_end_clears_the_session_but_keeps_the_settings():
+    game = GuessFaceGame()
+    game.active = True
+    game.prize_active = True
+    game.frozen_players = {"amy"}
+    game.players.add("amy")
+    game.players.add("bob")
+    game.enter("waiting")
+    game.record_vote("bob", "paris")
+
+    game.end()
+
+    assert game.phase is None and not game.active
+    assert len(game.players) == 0 and game.votes == {}
+    assert game.prize_active and game.frozen_players == {"amy"}
+
+
+def test_restore_carries_the_session_into_a_fresh_game():
+    game = GuessFaceGame()
+    game.active = True
+    game.round = 3
+    game.players.add("amy")
+    game.enter("waiting")
+    game.enter("choosing")
+    game.votes = {"amy": "london"}
+
+    restored = GuessFaceGame(game.layout)
+    restored.restore(game.snapshot())
+    game.votes["amy"] = "paris"
+
+    assert restored.phase == "choosing" and restored.round == 3
+    assert list(restored.players) == ["amy"]
+    assert restored.votes == {"amy": "london"}
+    assert restored.driver is None and restored.word_chosen is None
+    assert restored.enter("discussion")
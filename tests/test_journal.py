@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+import pytest
+
+from main import DataJournal, FileWriter, read_json_file
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    writer = FileWriter()
+    yield DataJournal(writer)
+    writer.close()
+
+
+def test_replay_applies_records_and_folds_them_into_the_files(journal):
+    stats, users = {"bob": {"wins": 1}}, set()
+    journal.register("stats.json", lambda: stats)
+    journal.register("users.json", lambda: users)
+    journal.set("stats.json", "amy", {"wins": 2})
+    journal.delete("stats.json", "bob")
+    journal.add("users.json", "u1")
+    journal.add("users.json", "u2")
+    journal.discard("users.json", "u1")
+    journal.writer.close()  # Crash before any checkpoint: only the journal is on disk
+
+    stats, users = {"bob": {"wins": 1}}, set()
+    restarted = DataJournal(FileWriter())
+    restarted.register("stats.json", lambda: stats)
+    restarted.register("users.json", lambda: users)
+
+    assert restarted.replay() == 5
+    assert stats == {"amy": {"wins": 2}}
+    assert users == {"u2"}
+    assert read_json_file("stats.json") == {"amy": {"wins": 2}}
+    assert read_json_file("users.json") == ["u2"]
+    assert open("data_journal.jsonl").read() == ""
+
+
+def test_replay_skips_a_torn_last_record(journal):
+    stats = {}
+    journal.register("stats.json", lambda: stats)
+    with open("data_journal.jsonl", "w") as f:
+        f.write(json.dumps({"f": "stats.json", "op": "set", "k": "amy", "v": 3}) + "\n")
+        f.write('{"f": "stats.json", "op": "set", "k": "bo')
+
+    assert journal.replay() == 1
+    assert stats == {"amy": 3}
+
+
+def test_checkpoint_snapshots_the_data_when_it_is_taken(journal):
+    stats = {"bob": {"wins": 1}}
+    journal.register("stats.json", lambda: stats)
+
+    async def run():
+        journal.set("stats.json", "bob", stats["bob"])
+        journal.checkpoint()
+        # The loop keeps changing the nested dict before the writer thread gets to it
+        stats["bob"]["wins"] = 99
+        stats["amy"] = {"wins": 5}
+        await journal.writer.flush()
+
+    asyncio.run(run())
+    assert read_json_file("stats.json") == {"bob": {"wins": 1}}
+
+
+def test_records_made_after_a_checkpoint_stay_in_the_journal(journal):
+    stats = {}
+    journal.register("stats.json", lambda: stats)
+
+    async def run():
+        stats["amy"] = 1
+        journal.set("stats.json", "amy", 1)
+        journal.checkpoint()
+        stats["bob"] = 2
+        journal.set("stats.json", "bob", 2)
+        await journal.writer.flush()
+
+    asyncio.run(run())
+    assert read_json_file("stats.json") == {"amy": 1}
+    records = [json.loads(line) for line in open("data_journal.jsonl")]
+    assert records == [{"f": "stats.json", "op": "set", "k": "bob", "v": 2}]
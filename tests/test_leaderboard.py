@@ -0,0 +1,62 @@
+import random
+
+from main import Leaderboard
+
+
+def test_rank_counts_the_players_ahead():
+    board = Leaderboard({"amy": 5, "bob": 3, "cat": 5, "dan": 0})
+
+    assert board.rank("amy") == (1, 5)
+    assert board.rank("cat") == (1, 5)
+    assert board.rank("bob") == (3, 3)
+    assert board.rank("dan") == (4, 0)
+    assert board.rank("eve") is None
+
+
+def test_top_keeps_ties_in_the_order_they_were_reached():
+    board = Leaderboard()
+    board.add("amy", 2)
+    board.add("bob", 1)
+    board.add("bob", 1)
+    board.add("cat", 3)
+
+    assert board.top(10) == [("cat", 3), ("amy", 2), ("bob", 2)]
+    assert board.top(2) == [("cat", 3), ("amy", 2)]
+    assert board.top(0) == []
+
+
+def test_set_moves_a_player_down_as_well_as_up():
+    board = Leaderboard({"amy": 4, "bob": 2})
+    board.set("amy", 1)
+
+    assert board.top(5) == [("bob", 2), ("amy", 1)]
+    assert board.rank("amy") == (2, 1)
+    assert len(board) == 2
+
+
+def test_win_totals_past_the_initial_tree_size():
+    board = Leaderboard({"amy": 10})
+    board.set("bob", 1000)
+    board.add("cat", 64)
+
+    assert board.top(3) == [("bob", 1000), ("cat", 64), ("amy", 10)]
+    assert board.rank("amy") == (3, 10)
+
+
+def test_matches_sorting_after_random_updates():
+    rng = random.Random(7)
+    board, wins = Leaderboard(), {}
+    for _ in range(2000):
+        username = f"p{rng.randrange(200)}"
+        if rng.random() < 0.2:
+            wins[username] = rng.randrange(150)
+            board.set(username, wins[username])
+        else:
+            won = rng.randrange(1, 4)
+            wins[username] = wins.get(username, 0) + won
+            board.add(username, won)
+
+    expected = sorted(wins.values(), reverse=True)
+    assert [count for _, count in board.top(50)] == expected[:50]
+    for username, count in wins.items():
+        assert board.rank(username) == (sum(1 for other in wins.values() if other > count) + 1, count)
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+from highrise import ResponseError
+from highrise.models import Error
+
+from main import METRICS, OutboundScheduler, ScheduledHighrise
+
+
+class FakeHighrise:
+    def __init__(self, *results):
+        self.results = list(results)
+
+    async def send_whisper(self, user_id, message):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def whispers_sent():
+    return METRICS.counters.get(("bot_whispers_total", ()), 0)
+
+
+def whisper(highrise):
+    async def run():
+        client = ScheduledHighrise(highrise, OutboundScheduler(retries=0))
+        return await client.send_whisper("user-id", "hi")
+
+    return asyncio.run(run())
+
+
+def test_a_delivered_whisper_is_counted():
+    before = whispers_sent()
+    whisper(FakeHighrise(None))
+    assert whispers_sent() == before + 1
+
+
+def test_failed_whispers_are_not_counted_as_sent():
+    before = whispers_sent()
+    with pytest.raises(ResponseError):
+        whisper(FakeHighrise(ResponseError("Rate limited")))
+    assert isinstance(whisper(FakeHighrise(Error("User not in room"))), Error)
+    assert whispers_sent() == before
@@ -0,0 +1,29 @@
+import asyncio
+
+from main import OutfitCache
+
+
+class FakeHttp:
+    def __init__(self):
+        self.fetched = []
+
+    async def get_json(self, url, headers=None):
+        self.fetched.append(url.rsplit("/", 1)[-1])
+        await asyncio.sleep(0.01)
+        return 200, {"user": {"outfit": []}}, {}
+
+
+def test_rejoining_users_are_prefetched_once():
+    http = FakeHttp()
+    cache = OutfitCache(http, prefetch_concurrency=1)
+
+    async def run():
+        # amy holds the only slot while bob joins, leaves and joins again
+        cache.prefetch("amy")
+        for _ in range(3):
+            cache.prefetch("bob")
+        while cache._prefetching:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert sorted(http.fetched) == ["amy", "bob"]
@@ -0,0 +1,68 @@
+from functools import partial
+
+import pytest
+
+from main import CITIES, CommandRouter, Mybot
+
+
+@pytest.fixture
+def router():
+    router = CommandRouter()
+    router.add("!vote", "vote")
+    router.add("!vote", "whisper vote", channels=("whisper",))
+    router.add("set danger", "danger")
+    router.add("set danger1", "danger1")
+    router.add("save", "save", exact=True)
+    router.add("new york", "new york")
+    return router
+
+
+def dispatch(router, message, channel="chat"):
+    found = router.match(message, channel)
+    return found and (found[0].handler, found[1])
+
+
+def test_arguments_follow_the_phrase_with_their_case_kept(router):
+    assert dispatch(router, "!vote Paris") == ("vote", "Paris")
+    assert dispatch(router, "  !VOTE  paris ") == ("vote", "paris")
+
+
+def test_the_channel_picks_the_command(router):
+    assert dispatch(router, "!vote paris", "whisper") == ("whisper vote", "paris")
+    assert dispatch(router, "!vote paris", "dm") is None
+
+
+def test_the_longest_phrase_wins(router):
+    assert dispatch(router, "set danger1 5") == ("danger1", "5")
+    assert dispatch(router, "set danger 2 5") == ("danger", "2 5")
+
+
+def test_exact_commands_take_no_arguments(router):
+    assert dispatch(router, "save") == ("save", "")
+    assert dispatch(router, "save me") is None
+
+
+def test_a_prefix_only_matches_up_to_a_word_boundary(router):
+    assert dispatch(router, "new york") == ("new york", "")
+    assert dispatch(router, "New York!") == ("new york", "!")
+    assert dispatch(router, "new yorker") is None
+    assert dispatch(router, "!voter") is None
+    assert dispatch(router, "set dangerous") is None
+
+
+def test_ordinary_chat_is_not_a_command(router):
+    assert dispatch(router, "hello there") is None
+    assert dispatch(router, "   ") is None
+
+
+def test_the_bot_routes_city_votes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bot = Mybot()
+    try:
+        for city in CITIES:
+            command, args = bot.commands.match(city.title(), "chat")
+            assert isinstance(command.handler, partial) and command.handler.args == (city,)
+        assert bot.commands.match("new yorker", "chat") is None
+        assert bot.commands.match("parisian cafe", "chat") is None
+    finally:
+        bot.close()
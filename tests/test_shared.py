@@ -0,0 +1,22 @@
+import pytest
+
+from main import LedgerLocked, SharedServices
+
+
+@pytest.mark.parametrize("store", ["json", "sqlite"])
+def test_one_process_owns_a_directorys_journal_and_caches(tmp_path, monkeypatch, store):
+    monkeypatch.setenv("PLAYER_STORE", store)
+    monkeypatch.setenv("PLAYER_DB", str(tmp_path / "players.db"))
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    monkeypatch.chdir(tmp_path / "a")
+    first = SharedServices()
+
+    with pytest.raises(LedgerLocked):
+        SharedServices()
+
+    # Another directory has its own journal and caches (and, with SQLite, the same ledger)
+    monkeypatch.chdir(tmp_path / "b")
+    second = SharedServices()
+    second.close()
+    first.close()